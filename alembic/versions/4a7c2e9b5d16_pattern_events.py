@@ -0,0 +1,104 @@
+"""pattern events
+
+Revision ID: 4a7c2e9b5d16
+Revises: c6e1a9d47b25
+Create Date: 2026-10-19 10:12:37.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a7c2e9b5d16'
+down_revision: Union[str, None] = 'c6e1a9d47b25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MINED_FIELDS = "completed_at, scheduled_at, due_at, estimated_duration, context_tags, actual_minutes"
+
+
+def _mined_values(row: str) -> str:
+    # Same fields as PatternAccumulator.add(); a non-numeric actual_minutes is ignored rather than failing the write
+    return (
+        f"{row}.completed_at, {row}.scheduled_at, {row}.due_at, {row}.estimated_duration, {row}.context_tags, "
+        f"CASE WHEN jsonb_typeof({row}.extra_data -> 'actual_minutes') = 'number' "
+        f"THEN ({row}.extra_data ->> 'actual_minutes')::float END"
+    )
+
+
+def upgrade() -> None:
+    op.create_table('pattern_events',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('sign', sa.SmallInteger(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('scheduled_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('due_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('estimated_duration', sa.Interval(), nullable=True),
+    sa.Column('context_tags', postgresql.ARRAY(sa.String()), nullable=True),
+    sa.Column('actual_minutes', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_pattern_events_user_id', 'pattern_events', ['user_id', 'id'], unique=False)
+
+    # Every change to what pattern mining counts is queued in the writing transaction,
+    # so it reaches the miner whenever it commits: no watermark to fall behind
+    op.execute(f"""
+        CREATE FUNCTION record_pattern_event() RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            was_counted boolean := TG_OP <> 'INSERT' AND OLD.status = 'completed' AND OLD.completed_at IS NOT NULL;
+            is_counted boolean := TG_OP <> 'DELETE' AND NEW.status = 'completed' AND NEW.completed_at IS NOT NULL;
+        BEGIN
+            IF was_counted AND is_counted
+               AND (OLD.user_id, {_mined_values('OLD')}) IS NOT DISTINCT FROM (NEW.user_id, {_mined_values('NEW')}) THEN
+                RETURN NULL;
+            END IF;
+            IF was_counted THEN
+                -- Retract what was counted; nothing to retract once the user itself is deleted
+                INSERT INTO pattern_events (user_id, sign, {MINED_FIELDS})
+                SELECT OLD.user_id, -1, {_mined_values('OLD')}
+                WHERE EXISTS (SELECT 1 FROM users WHERE id = OLD.user_id);
+            END IF;
+            IF is_counted THEN
+                INSERT INTO pattern_events (user_id, sign, {MINED_FIELDS})
+                VALUES (NEW.user_id, 1, {_mined_values('NEW')});
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute(
+        "CREATE TRIGGER entities_pattern_events AFTER INSERT OR UPDATE OR DELETE ON entities "
+        "FOR EACH ROW EXECUTE FUNCTION record_pattern_event()"
+    )
+
+    # Patterns restart from the queue: every current completion, and no stored statistics
+    op.execute(f"""
+        INSERT INTO pattern_events (user_id, sign, {MINED_FIELDS})
+        SELECT entities.user_id, 1, {_mined_values('entities')}
+        FROM entities
+        WHERE status = 'completed' AND completed_at IS NOT NULL
+        ORDER BY user_id, completed_at, id
+    """)
+    op.execute("UPDATE user_patterns SET pattern_data = pattern_data - 'stats'")
+
+    op.drop_column('user_patterns', 'watermark_entity_id')
+    op.drop_column('user_patterns', 'watermark_completed_at')
+
+
+def downgrade() -> None:
+    op.add_column('user_patterns', sa.Column('watermark_completed_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('user_patterns', sa.Column('watermark_entity_id', sa.UUID(), nullable=True))
+    # Without watermarks the next run rescans all history; drop the statistics it would add to
+    op.execute("UPDATE user_patterns SET pattern_data = pattern_data - 'stats'")
+
+    op.execute("DROP TRIGGER entities_pattern_events ON entities")
+    op.execute("DROP FUNCTION record_pattern_event()")
+    op.drop_index('ix_pattern_events_user_id', table_name='pattern_events')
+    op.drop_table('pattern_events')
@@ -0,0 +1,53 @@
+"""keyset pagination indexes and missing user foreign keys
+
+Revision ID: 7d3e9a1c4b52
+Revises: 51158dcad7bc
+Create Date: 2026-10-18 10:12:31.284913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3e9a1c4b52'
+down_revision: Union[str, None] = '51158dcad7bc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The models declare these FKs (User relationships need them) but the
+    # initial schema never created them
+    op.create_foreign_key(
+        'context_windows_user_id_fkey', 'context_windows', 'users',
+        ['user_id'], ['id'], ondelete='CASCADE'
+    )
+    op.create_foreign_key(
+        'user_patterns_user_id_fkey', 'user_patterns', 'users',
+        ['user_id'], ['id'], ondelete='CASCADE'
+    )
+
+    # CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_entities_user_priority_created', 'entities',
+            ['user_id', 'priority', 'created_at', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_messages_user_created', 'messages',
+            ['user_id', 'created_at', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_messages_user_created', table_name='messages', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_entities_user_priority_created', table_name='entities', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_constraint('user_patterns_user_id_fkey', 'user_patterns', type_='foreignkey')
+    op.drop_constraint('context_windows_user_id_fkey', 'context_windows', type_='foreignkey')
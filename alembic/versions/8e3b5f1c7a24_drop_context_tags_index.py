@@ -0,0 +1,33 @@
+"""drop context tags index
+
+Revision ID: 8e3b5f1c7a24
+Revises: 4a7c2e9b5d16
+Create Date: 2026-10-19 11:48:02.631907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e3b5f1c7a24'
+down_revision: Union[str, None] = '4a7c2e9b5d16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Tag filters are always per user: the planner walks one of the (user_id, ...)
+    # indexes and filters the user's rows, so the GIN over all users only costs writes
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_entities_context_tags', table_name='entities', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_entities_context_tags', 'entities', ['context_tags'],
+            unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True
+        )
@@ -0,0 +1,34 @@
+"""collection versions
+
+Revision ID: 9f4b2d7e1c63
+Revises: 3c8d1f6a2b70
+Create Date: 2026-10-18 19:05:42.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f4b2d7e1c63'
+down_revision: Union[str, None] = '3c8d1f6a2b70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Per-user listing versions behind the ETags; a missing row reads as version 0
+    op.create_table('collection_versions',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('collection', sa.String(length=30), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'collection')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('collection_versions')
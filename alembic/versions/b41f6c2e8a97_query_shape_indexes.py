@@ -0,0 +1,69 @@
+"""query shape indexes
+
+Revision ID: b41f6c2e8a97
+Revises: 7d3e9a1c4b52
+Create Date: 2026-10-18 11:03:47.915240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41f6c2e8a97'
+down_revision: Union[str, None] = '7d3e9a1c4b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        # Entity listings filtered by status / entity_type, ordered by priority, created_at
+        op.create_index(
+            'ix_entities_user_status_priority_created', 'entities',
+            ['user_id', 'status', 'priority', 'created_at', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_entities_user_type_priority_created', 'entities',
+            ['user_id', 'entity_type', 'priority', 'created_at', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        # context_tags @> ARRAY[...]
+        op.create_index(
+            'ix_entities_context_tags', 'entities', ['context_tags'],
+            unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True
+        )
+        # Relations are looked up by parent_id OR child_id
+        op.create_index(
+            'ix_entity_relations_parent_id', 'entity_relations', ['parent_id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_entity_relations_child_id', 'entity_relations', ['child_id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+
+        # Prefixes of the (user_id, ...) composites; only cost writes now
+        op.drop_index('ix_entities_user_id', table_name='entities', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_messages_user_id', table_name='messages', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_user_id', 'messages', ['user_id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_entities_user_id', 'entities', ['user_id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index('ix_entity_relations_child_id', table_name='entity_relations', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_entity_relations_parent_id', table_name='entity_relations', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_entities_context_tags', table_name='entities', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_entities_user_type_priority_created', table_name='entities', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_entities_user_status_priority_created', table_name='entities', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,49 @@
+"""conversation summaries
+
+Revision ID: c6e1a9d47b25
+Revises: 9f4b2d7e1c63
+Create Date: 2026-10-18 22:41:09.552610
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e1a9d47b25'
+down_revision: Union[str, None] = '9f4b2d7e1c63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('conversation_summaries',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('covered_until', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('covered_message_id', sa.UUID(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Move the latest summary marker of each user out of messages.extra_data
+    op.execute("""
+        INSERT INTO conversation_summaries (user_id, summary, covered_until, covered_message_id)
+        SELECT DISTINCT ON (user_id) user_id, extra_data->>'summary', created_at, id
+        FROM messages
+        WHERE extra_data ? 'summary'
+        ORDER BY user_id, created_at DESC, id DESC
+    """)
+    op.execute("UPDATE messages SET extra_data = extra_data - 'summary' WHERE extra_data ? 'summary'")
+
+
+def downgrade() -> None:
+    op.execute("""
+        UPDATE messages m
+        SET extra_data = coalesce(m.extra_data, '{}'::jsonb) || jsonb_build_object('summary', s.summary)
+        FROM conversation_summaries s
+        WHERE m.id = s.covered_message_id
+    """)
+    op.drop_table('conversation_summaries')
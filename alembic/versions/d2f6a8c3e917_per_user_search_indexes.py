@@ -0,0 +1,58 @@
+"""per user search indexes
+
+Revision ID: d2f6a8c3e917
+Revises: 8e3b5f1c7a24
+Create Date: 2026-10-19 13:05:44.170382
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f6a8c3e917'
+down_revision: Union[str, None] = '8e3b5f1c7a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # GIN operator classes for scalar types, so user_id can lead a GIN index
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+
+    # CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        # Searches are always per user: one GIN scan matches both user_id and the query.
+        # Without a pending list, searches don't rescan recent writes and the planner
+        # costs the index by its real size.
+        op.create_index(
+            'ix_entities_user_search_vector', 'entities', ['user_id', 'search_vector'],
+            unique=False, postgresql_using='gin', postgresql_with={'fastupdate': 'off'},
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_messages_user_search_vector', 'messages', ['user_id', 'search_vector'],
+            unique=False, postgresql_using='gin', postgresql_with={'fastupdate': 'off'},
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+        # Superseded by the (user_id, search_vector) composites
+        op.drop_index('ix_entities_search_vector', table_name='entities', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_messages_search_vector', table_name='messages', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_search_vector', 'messages', ['search_vector'],
+            unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_entities_search_vector', 'entities', ['search_vector'],
+            unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index('ix_messages_user_search_vector', table_name='messages', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_entities_user_search_vector', table_name='entities', postgresql_concurrently=True, if_exists=True)
+    # btree_gin is left installed; other objects may depend on it
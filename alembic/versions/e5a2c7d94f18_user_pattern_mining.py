@@ -0,0 +1,54 @@
+"""user pattern mining
+
+Revision ID: e5a2c7d94f18
+Revises: b41f6c2e8a97
+Create Date: 2026-10-18 15:20:11.482310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a2c7d94f18'
+down_revision: Union[str, None] = 'b41f6c2e8a97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # High-water mark of the completions folded into each pattern
+    op.add_column('user_patterns', sa.Column('watermark_completed_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('user_patterns', sa.Column('watermark_entity_id', sa.UUID(), nullable=True))
+
+    # CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        # Upsert target: one row per (user, pattern type)
+        op.create_index(
+            'ux_user_patterns_user_type', 'user_patterns', ['user_id', 'pattern_type'],
+            unique=True, postgresql_concurrently=True, if_not_exists=True
+        )
+        # Completions after a watermark, per user
+        op.create_index(
+            'ix_entities_user_completed', 'entities', ['user_id', 'completed_at', 'id'],
+            unique=False, postgresql_where=sa.text('completed_at IS NOT NULL'),
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+        # Prefix of ux_user_patterns_user_type
+        op.drop_index('ix_user_patterns_user_id', table_name='user_patterns', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_patterns_user_id', 'user_patterns', ['user_id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index('ix_entities_user_completed', table_name='entities', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ux_user_patterns_user_type', table_name='user_patterns', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_column('user_patterns', 'watermark_entity_id')
+    op.drop_column('user_patterns', 'watermark_completed_at')
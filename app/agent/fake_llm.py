@@ -0,0 +1,143 @@
+import asyncio
+import json
+import time
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from app.agent.memory import count_tokens
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for ChatOpenAI (llm_provider="fake"), for load
+    tests and local runs without an API key.
+
+    Replies depend only on the prompt. When tools are bound and the last
+    message is the user's, a tool call is emitted for tool_call_ratio of
+    prompts (picked by a checksum of the text); the turn after a tool
+    result, or any other prompt, gets a plain text reply. Every call
+    sleeps for latency seconds, with +/- jitter, to stand in for the
+    provider's response time, and reports usage_metadata like the real
+    client does.
+    """
+
+    model: str = "fake"
+    latency: float = 0.5
+    jitter: float = 0.2  # Fraction of latency
+    tool_call_ratio: float = 0.5
+    tool_names: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "latency": self.latency, "tool_call_ratio": self.tool_call_ratio}
+
+    def _get_ls_params(self, stop: Optional[List[str]] = None, **kwargs: Any):
+        params = super()._get_ls_params(stop=stop, **kwargs)
+        params["ls_model_name"] = self.model
+        return params
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "FakeChatModel":
+        return self.model_copy(update={"tool_names": [getattr(t, "name", str(t)) for t in tools]})
+
+    def _delay(self, checksum: int) -> float:
+        spread = ((checksum % 1000) / 500 - 1) * self.jitter
+        return max(0.0, self.latency * (1 + spread))
+
+    def _reply(self, messages: List[BaseMessage]) -> tuple:
+        """(AIMessage, delay) for a prompt"""
+        last = messages[-1] if messages else None
+        prompt = str(last.content) if last is not None else ""
+        checksum = zlib.crc32(prompt.encode())
+        input_tokens = sum(count_tokens(str(m.content)) for m in messages)
+
+        wants_tool = (
+            self.tool_names
+            and isinstance(last, HumanMessage)
+            and (checksum % 1000) < self.tool_call_ratio * 1000
+        )
+        if wants_tool:
+            name = self.tool_names[checksum % len(self.tool_names)]
+            message = AIMessage(
+                content="",
+                tool_calls=[{"name": name, "args": self._tool_args(name, prompt, checksum), "id": f"call_{checksum:08x}", "type": "tool_call"}],
+            )
+        else:
+            if isinstance(last, ToolMessage):
+                content = f"Here is what I found: {str(last.content)[:200]}"
+            else:
+                content = f"Sounds good. Let's work on that together ({checksum % 97})."
+            message = AIMessage(content=content)
+
+        output_tokens = count_tokens(message.content or json.dumps(message.tool_calls, default=str))
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return message, self._delay(checksum)
+
+    @staticmethod
+    def _tool_args(name: str, prompt: str, checksum: int) -> dict:
+        if name == "add_entity":
+            return {"title": f"Follow up {checksum % 10000}", "entity_type": "task", "context_tags": ["home"]}
+        if name == "search":
+            return {"query": " ".join(prompt.split()[:2]) or "task"}
+        return {}
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message, delay = self._reply(messages)
+        time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message, delay = self._reply(messages)
+        await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        message, delay = self._reply(messages)
+        time.sleep(delay)
+        for chunk in self._chunks(message):
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        message, delay = self._reply(messages)
+        # Time to first token is most of a real call; the chunks follow quickly
+        await asyncio.sleep(delay)
+        for chunk in self._chunks(message):
+            yield chunk
+
+    @staticmethod
+    def _chunks(message: AIMessage) -> List[ChatGenerationChunk]:
+        if message.tool_calls:
+            call = message.tool_calls[0]
+            tool_chunk = {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": 0}
+            return [ChatGenerationChunk(message=AIMessageChunk(
+                content="", tool_call_chunks=[tool_chunk], usage_metadata=message.usage_metadata
+            ))]
+        words = message.content.split(" ")
+        chunks = [
+            ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            for i, word in enumerate(words)
+        ]
+        chunks[-1].message.usage_metadata = message.usage_metadata
+        return chunks
@@ -0,0 +1,248 @@
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterable, List, Optional
+from uuid import UUID
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage
+from app.config import settings
+from app.models import ConversationSummary, Message
+from app.services.vector_index import vector_store
+from app.services.message_writer import message_writer
+
+logger = logging.getLogger(__name__)
+
+# Rough per-message framing overhead in chat prompts
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Recalled items are cut to this many characters
+RECALL_MAX_CHARS = 300
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and their personal mentor.
+Keep facts, commitments, preferences and open questions. Be concise.
+
+Current summary:
+{summary}
+
+New conversation turns:
+{turns}
+
+Updated summary:"""
+
+
+@lru_cache()
+def _encoding():
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(settings.llm_model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # No tokenizer available (e.g. offline): fall back to estimates
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text, estimating ~4 characters per token without tiktoken"""
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def _message_tokens(msg: Message) -> int:
+    return count_tokens(msg.content) + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class MemoryStats:
+    """Per-turn prompt size, used for logging and metrics"""
+    history_messages: int = 0
+    history_tokens: int = 0
+    summary_tokens: int = 0
+    folded_messages: int = 0
+
+    @property
+    def prompt_tokens(self) -> int:
+        return self.history_tokens + self.summary_tokens
+
+
+@dataclass
+class ConversationContext:
+    summary: Optional[str] = None
+    messages: List[Message] = field(default_factory=list)
+    stats: MemoryStats = field(default_factory=MemoryStats)
+
+    def to_langchain(self) -> List[BaseMessage]:
+        history: List[BaseMessage] = []
+        if self.summary:
+            history.append(SystemMessage(content=f"Summary of the earlier conversation:\n{self.summary}"))
+        for msg in self.messages:
+            if msg.role == "user":
+                history.append(HumanMessage(content=msg.content))
+            else:
+                history.append(AIMessage(content=msg.content))
+        return history
+
+
+async def _summarize(previous: Optional[str], turns: List[Message]) -> str:
+    """Fold new turns into the previous summary with one LLM call"""
+    # Imported lazily: the registry lives with the mentor agent
+    from app.agent.mentor import mentor_registry
+
+    llm = mentor_registry.get_llm(temperature=0)
+    text = "\n".join(f"{m.role}: {m.content}" for m in turns)
+    response = await llm.ainvoke(SUMMARY_PROMPT.format(summary=previous or "(none)", turns=text))
+    return response.content
+
+
+async def load_conversation(
+    db: AsyncSession,
+    user_id: UUID,
+    exclude_latest: Optional[str] = None
+) -> ConversationContext:
+    """
+    Assemble conversation history under settings.memory_token_budget.
+
+    Messages after the summary are kept verbatim newest-first while they
+    fit. When the budget is exceeded, or more than memory_max_messages
+    are unsummarised, everything older than what is kept is folded into
+    the rolling summary (older pages first, memory_max_messages per LLM
+    call), down to memory_target_ratio of the budget so the summariser
+    doesn't run on every turn. The summary lives in
+    conversation_summaries with the last message it covers, so only new
+    turns are ever summarised and message history is left untouched.
+
+    Args:
+        exclude_latest: Content of the just-stored user message, which the
+            caller appends itself
+    """
+    # Messages still queued by this worker's writer would be missing otherwise
+    await message_writer.wait_user(user_id)
+
+    marker = await db.get(ConversationSummary, user_id)
+    summary = marker.summary if marker else None
+
+    def since_marker():
+        query = select(Message).where(Message.user_id == user_id)
+        if marker:
+            query = query.where(
+                tuple_(Message.created_at, Message.id) > tuple_(marker.covered_until, marker.covered_message_id)
+            )
+        return query
+
+    # Newest page since the marker, plus one row to tell whether older ones exist
+    page_size = settings.memory_max_messages
+    recent = list((await db.scalars(
+        since_marker().order_by(Message.created_at.desc(), Message.id.desc()).limit(page_size + 1)
+    )).all())
+    has_older = len(recent) > page_size
+    recent = recent[:page_size]
+    page_oldest = recent[-1] if recent else None
+
+    if exclude_latest is not None and recent and recent[0].role == "user" and recent[0].content == exclude_latest:
+        recent = recent[1:]
+
+    budget = settings.memory_token_budget
+    summary_tokens = count_tokens(summary) if summary else 0
+    tokens = [_message_tokens(m) for m in recent]
+
+    folded: List[Message] = []
+    if has_older or summary_tokens + sum(tokens) > budget:
+        # Keep the newest messages that fit in the target, fold the rest
+        target = budget * settings.memory_target_ratio - summary_tokens
+        kept, used = 0, 0
+        for t in tokens:
+            if used + t > target:
+                break
+            used += t
+            kept += 1
+
+        folded = list(reversed(recent[kept:]))
+        recent, tokens = recent[:kept], tokens[:kept]
+
+    folded_count = 0
+    if has_older:
+        # Messages older than the loaded page, oldest first, one page per summarisation
+        after = None
+        while True:
+            query = since_marker().where(
+                tuple_(Message.created_at, Message.id) < tuple_(page_oldest.created_at, page_oldest.id)
+            )
+            if after is not None:
+                query = query.where(tuple_(Message.created_at, Message.id) > tuple_(after.created_at, after.id))
+            older = list((await db.scalars(
+                query.order_by(Message.created_at, Message.id).limit(page_size)
+            )).all())
+            if not older:
+                break
+            summary = await _summarize(summary, older)
+            folded_count += len(older)
+            after = older[-1]
+
+    if folded:
+        summary = await _summarize(summary, folded)
+        folded_count += len(folded)
+    if folded_count:
+        summary_tokens = count_tokens(summary)
+        last = folded[-1] if folded else after
+        await db.execute(
+            insert(ConversationSummary)
+            .values(user_id=user_id, summary=summary, covered_until=last.created_at, covered_message_id=last.id)
+            .on_conflict_do_update(
+                index_elements=[ConversationSummary.user_id],
+                set_={"summary": summary, "covered_until": last.created_at,
+                      "covered_message_id": last.id, "updated_at": func.now()},
+            )
+        )
+        await db.commit()
+
+    messages = list(reversed(recent))
+    stats = MemoryStats(
+        history_messages=len(messages),
+        history_tokens=sum(tokens),
+        summary_tokens=summary_tokens,
+        folded_messages=folded_count,
+    )
+    logger.info(
+        "conversation memory user=%s messages=%d history_tokens=%d summary_tokens=%d folded=%d",
+        user_id, stats.history_messages, stats.history_tokens, stats.summary_tokens, stats.folded_messages
+    )
+    return ConversationContext(summary=summary, messages=messages, stats=stats)
+
+
+async def recall(
+    db: AsyncSession,
+    user_id: UUID,
+    text: str,
+    exclude_message_ids: Iterable[UUID] = ()
+) -> Optional[str]:
+    """
+    Render the user's entities and older messages most similar to text
+    as a prompt block, or None if nothing scores above
+    settings.recall_min_score.
+
+    Args:
+        exclude_message_ids: Messages already in the prompt verbatim
+    """
+    exclude = {("message", message_id) for message_id in exclude_message_ids}
+    hits = await vector_store.asearch(db, user_id, text, k=settings.recall_top_k, exclude=exclude)
+
+    lines = []
+    for hit in hits:
+        # The just-stored user message matches itself
+        if hit["score"] < settings.recall_min_score or (hit["kind"] == "message" and hit["text"] == text):
+            continue
+        snippet = hit["text"][:RECALL_MAX_CHARS]
+        if hit["kind"] == "entity":
+            lines.append(f"- {hit['entity_type']} ({hit['status']}): {snippet}")
+        else:
+            lines.append(f"- {hit['role']} on {hit['created_at']:%Y-%m-%d}: {snippet}")
+
+    logger.info("recall user=%s hits=%d injected=%d", user_id, len(hits), len(lines))
+    if not lines:
+        return None
+    return "Possibly relevant items from the user's records and earlier conversations:\n" + "\n".join(lines)
@@ -1,10 +1,15 @@
+import logging
+from typing import AsyncIterator
 from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.prebuilt import ToolNode
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from app.agent.tools import tools, set_agent_context
-from app.config import settings
-from app.models import Message
+from langchain_core.messages import SystemMessage, HumanMessage
+from app.agent.tools import tools, agent_config
+from app.agent.memory import load_conversation, recall
+from app.agent.registry import AgentRegistry
+
+logger = logging.getLogger(__name__)
 
 # System prompt - defines mentor personality for new entity system
 SYSTEM_PROMPT = """You are a caring, intelligent personal mentor and life coach.
@@ -18,6 +23,8 @@ You help users manage their life using an entity system where everything
 You have tools:
 - add_entity(title, entity_type, context_tags, ...) - Add tasks/events
 - get_entities_overview() - See what user has
+- get_ready_tasks() - See what user can do right now (nothing blocking it)
+- search(query) - Find specific entities or past conversation by text
 
 WORKFLOW:
 1. When user mentions something to do, determine:
@@ -38,27 +45,24 @@ Current date: {current_datetime}
 User timezone: {user_timezone}
 """
 
-def create_mentor_agent():
+# Returned when the agent produces no text
+DEFAULT_REPLY = "I'm here to help! What would you like to do?"
+
+def create_mentor_agent(llm: ChatOpenAI):
     """Create the mentor agent using LangGraph"""
     
-    # Initialize LLM
-    llm = ChatOpenAI(
-        model="gpt-4o-mini",
-        api_key=settings.openai_api_key,
-        temperature=0.7
-    )
-    
     # Bind tools to LLM
     llm_with_tools = llm.bind_tools(tools)
     
     # Define agent node
-    def call_model(state: MessagesState):
+    async def call_model(state: MessagesState, config: RunnableConfig):
         messages = state["messages"]
         # Add system prompt if not present
         if not any(isinstance(m, SystemMessage) for m in messages):
             messages = [SystemMessage(content=SYSTEM_PROMPT)] + messages
         
-        response = llm_with_tools.invoke(messages)
+        # Pass config through so streaming callbacks see LLM tokens
+        response = await llm_with_tools.ainvoke(messages, config)
         return {"messages": [response]}
     
     # Should continue to tools or end?
@@ -86,53 +90,108 @@ def create_mentor_agent():
     # Compile
     return workflow.compile()
 
-def chat_with_mentor(user_message: str, db, user_id) -> str:
+# Compiled once per (model, temperature) and shared by all requests
+mentor_registry = AgentRegistry(create_mentor_agent)
+
+async def _build_messages(user_message: str, db, user_id) -> list:
+    """Build the prompt: system prompt, recalled context, token-budgeted history and the new message"""
+    conversation = await load_conversation(db, user_id, exclude_latest=user_message)
+    
+    messages = [SystemMessage(content=SYSTEM_PROMPT)]
+    
+    # Older messages and records similar to this turn, minus what history already carries
+    recalled = await recall(db, user_id, user_message, exclude_message_ids={m.id for m in conversation.messages})
+    if recalled:
+        messages.append(SystemMessage(content=recalled))
+    messages.extend(conversation.to_langchain())
+    
+    # Add current user message
+    messages.append(HumanMessage(content=user_message))
+    return messages
+
+def _log_usage(user_id, response_messages: list):
+    """Log prompt/completion tokens reported by the LLM for this turn"""
+    prompt_tokens = completion_tokens = 0
+    for msg in response_messages:
+        usage = getattr(msg, "usage_metadata", None)
+        if usage:
+            prompt_tokens += usage.get("input_tokens", 0)
+            completion_tokens += usage.get("output_tokens", 0)
+    logger.info(
+        "mentor turn user=%s prompt_tokens=%d completion_tokens=%d",
+        user_id, prompt_tokens, completion_tokens
+    )
+
+async def chat_with_mentor(user_message: str, db, user_id) -> str:
     """
     Process a chat message with the mentor agent.
-    Includes conversation history for context.
+    Includes token-budgeted conversation history for context.
     
     Args:
         user_message: The user's message
-        db: Database session
+        db: Async database session
         user_id: Current user ID
     
     Returns:
         Agent's response
     """
-    # Set context for tools
-    set_agent_context(db, user_id)
+    messages = await _build_messages(user_message, db, user_id)
     
-    # Load recent conversation history (last 20 messages)
-    recent_messages = db.query(Message).filter(
-        Message.user_id == user_id
-    ).order_by(Message.created_at.desc()).limit(20).all()
-    
-    # Build message history
-    messages = [SystemMessage(content=SYSTEM_PROMPT)]
+    # Run the shared agent
+    agent = mentor_registry.get()
     
-    # Add conversation history (reverse to get chronological order)
-    for msg in reversed(recent_messages):
-        if msg.role == "user":
-            messages.append(HumanMessage(content=msg.content))
-        else:
-            messages.append(AIMessage(content=msg.content))
-    
-    # Add current user message
-    messages.append(HumanMessage(content=user_message))
-    
-    # Create and run agent
-    agent = create_mentor_agent()
-    
-    result = agent.invoke({
-        "messages": messages
-    })
+    # Tools read db/user_id from the run config
+    result = await agent.ainvoke(
+        {"messages": messages},
+        agent_config(db, user_id)
+    )
     
     # Extract final response
     response_messages = result.get("messages", [])
+    _log_usage(user_id, response_messages[len(messages):])
     if response_messages:
         # Get last non-tool message
         for msg in reversed(response_messages):
             if hasattr(msg, 'content') and msg.content and (not hasattr(msg, 'tool_calls') or not msg.tool_calls):
                 return msg.content
     
-    return "I'm here to help! What would you like to do?"
\ No newline at end of file
+    return DEFAULT_REPLY
+
+async def stream_mentor(user_message: str, db, user_id) -> AsyncIterator[dict]:
+    """
+    Stream a chat turn with the mentor agent.
+    
+    Yields events as dicts with an "event" key:
+        token: {"content"} - a chunk of LLM output
+        tool_start: {"name", "input"} - a tool call began
+        tool_end: {"name", "output"} - a tool call finished
+        message: {"content"} - the final assistant reply (always last)
+    """
+    messages = await _build_messages(user_message, db, user_id)
+    agent = mentor_registry.get()
+    
+    final_content = None
+    async for event in agent.astream_events(
+        {"messages": messages}, agent_config(db, user_id), version="v2"
+    ):
+        kind = event["event"]
+        
+        if kind == "on_chat_model_stream":
+            content = event["data"]["chunk"].content
+            if content:
+                yield {"event": "token", "content": content}
+        
+        elif kind == "on_chat_model_end":
+            # Keep the last model output that is a reply rather than a tool request
+            output = event["data"].get("output")
+            if output is not None and output.content and not getattr(output, "tool_calls", None):
+                final_content = output.content
+        
+        elif kind == "on_tool_start":
+            yield {"event": "tool_start", "name": event["name"], "input": event["data"].get("input")}
+        
+        elif kind == "on_tool_end":
+            output = event["data"].get("output")
+            yield {"event": "tool_end", "name": event["name"], "output": str(getattr(output, "content", output))}
+    
+    yield {"event": "message", "content": final_content or DEFAULT_REPLY}
@@ -0,0 +1,131 @@
+import logging
+import threading
+from typing import Callable, Dict, Optional, Tuple
+import httpx
+from langchain_openai import ChatOpenAI
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Agents are keyed by (model, temperature)
+AgentKey = Tuple[str, float]
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.llm_max_connections,
+        max_keepalive_connections=settings.llm_max_keepalive_connections,
+        keepalive_expiry=settings.llm_keepalive_expiry,
+    )
+
+
+class AgentRegistry:
+    """
+    Process-wide cache of compiled agent graphs.
+
+    The LLM client, its pooled keep-alive HTTP clients and the compiled
+    LangGraph are created once per (model, temperature) and reused by every
+    chat turn instead of being rebuilt per request.
+    """
+
+    def __init__(self, builder: Callable[[ChatOpenAI], object]):
+        self._builder = builder
+        self._agents: Dict[AgentKey, object] = {}
+        self._llms: Dict[AgentKey, ChatOpenAI] = {}
+        self._lock = threading.Lock()
+        self._http_client: Optional[httpx.Client] = None
+        self._http_async_client: Optional[httpx.AsyncClient] = None
+
+    def _create_llm(self, model: str, temperature: float) -> ChatOpenAI:
+        if settings.llm_provider == "fake":
+            # Imported lazily: only load tests and offline runs use it
+            from app.agent.fake_llm import FakeChatModel
+            return FakeChatModel(
+                model=f"fake-{model}",
+                latency=settings.fake_llm_latency,
+                tool_call_ratio=settings.fake_llm_tool_call_ratio,
+            )
+
+        # Shared connection pools so TLS sessions survive between turns
+        if self._http_client is None:
+            self._http_client = httpx.Client(
+                limits=_http_limits(), timeout=settings.llm_timeout
+            )
+        if self._http_async_client is None:
+            self._http_async_client = httpx.AsyncClient(
+                limits=_http_limits(), timeout=settings.llm_timeout
+            )
+
+        return ChatOpenAI(
+            model=model,
+            api_key=settings.openai_api_key,
+            temperature=temperature,
+            http_client=self._http_client,
+            http_async_client=self._http_async_client,
+        )
+
+    @staticmethod
+    def _key(model: Optional[str], temperature: Optional[float]) -> AgentKey:
+        return (
+            model or settings.llm_model,
+            settings.llm_temperature if temperature is None else temperature,
+        )
+
+    def get_llm(self, model: Optional[str] = None, temperature: Optional[float] = None) -> ChatOpenAI:
+        """Return the shared LLM client for model/temperature (no tools bound)"""
+        key = self._key(model, temperature)
+
+        llm = self._llms.get(key)
+        if llm is not None:
+            return llm
+
+        with self._lock:
+            llm = self._llms.get(key)
+            if llm is None:
+                llm = self._create_llm(*key)
+                self._llms[key] = llm
+        return llm
+
+    def get(self, model: Optional[str] = None, temperature: Optional[float] = None):
+        """Return the compiled agent for model/temperature, building it on first use"""
+        key = self._key(model, temperature)
+
+        agent = self._agents.get(key)
+        if agent is not None:
+            return agent
+
+        llm = self.get_llm(*key)
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is None:
+                agent = self._builder(llm)
+                self._agents[key] = agent
+        return agent
+
+    def warm_up(self):
+        """
+        Build the default agent ahead of the first request.
+
+        Never fails startup: without an API key (or on any other error) the
+        agent is built on first use instead, and only chat requests fail.
+        """
+        if settings.llm_provider != "fake" and not settings.openai_api_key:
+            logger.warning("OPENAI_API_KEY is not set; skipping agent warm-up")
+            return
+        try:
+            self.get()
+        except Exception:
+            logger.warning("agent warm-up failed; it will be built on first use", exc_info=True)
+
+    async def aclose(self):
+        """Drop cached agents and close pooled HTTP connections"""
+        with self._lock:
+            self._agents.clear()
+            self._llms.clear()
+            http_client, self._http_client = self._http_client, None
+            async_client, self._http_async_client = self._http_async_client, None
+
+        if http_client is not None:
+            http_client.close()
+        if async_client is not None:
+            await async_client.aclose()
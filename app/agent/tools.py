@@ -1,21 +1,37 @@
+import asyncio
+from contextlib import asynccontextmanager, nullcontext
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
 from typing import Optional
-from uuid import UUID
 from app.services.entity_service import EntityService
+from app.services.dependency_graph import dependency_index
+from app.services.search_service import SearchService
 from app.schemas.entity import EntityCreate
+from app.config import settings
+from app.metrics import llm_metrics
 
-# Global context
-_context = {}
+def agent_config(db, user_id) -> RunnableConfig:
+    """Per-run config carrying the session and user the tools act on (and the metrics callback)"""
+    callbacks = [llm_metrics] if settings.metrics_enabled else []
+    # ToolNode runs the tool calls of one AI message concurrently; db_lock
+    # serializes their use of the run's session, which allows one operation at a time
+    configurable = {"db": db, "user_id": user_id, "db_lock": asyncio.Lock()}
+    return {"configurable": configurable, "callbacks": callbacks}
 
-def set_agent_context(db, user_id: UUID):
-    _context["db"] = db
-    _context["user_id"] = user_id
+@asynccontextmanager
+async def _get_context(config: RunnableConfig):
+    # Each agent run gets its own config, so concurrent runs never share state;
+    # tool calls within a run take turns on its session
+    configurable = config.get("configurable", {})
+    async with configurable.get("db_lock") or nullcontext():
+        yield configurable.get("db"), configurable.get("user_id")
 
 @tool
-def add_entity(
+async def add_entity(
     title: str, 
     entity_type: str,
     context_tags: list[str],
+    config: RunnableConfig,
     description: Optional[str] = None,
     due_at: Optional[str] = None
 ) -> str:
@@ -29,12 +45,6 @@ def add_entity(
         description: Optional details
         due_at: Optional deadline
     """
-    db = _context.get("db")
-    user_id = _context.get("user_id")
-    
-    if not db or not user_id:
-        return "Error: Context not set"
-    
     entity_data = EntityCreate(
         entity_type=entity_type,
         title=title,
@@ -43,40 +53,89 @@ def add_entity(
         context_tags=context_tags
     )
     
-    entity = EntityService.create_entity(db, user_id, entity_data)
+    async with _get_context(config) as (db, user_id):
+        if not db or not user_id:
+            return "Error: Context not set"
+        
+        entity = await EntityService.acreate_entity(db, user_id, entity_data)
     
     tags_str = ", ".join(context_tags)
     return f"✓ Added '{title}' ({entity_type}) with context: {tags_str}"
 
 @tool
-def get_entities_overview() -> str:
+async def get_entities_overview(config: RunnableConfig) -> str:
     """Get overview of all entities"""
-    db = _context.get("db")
-    user_id = _context.get("user_id")
+    async with _get_context(config) as (db, user_id):
+        if not db or not user_id:
+            return "Error: Context not set"
+        
+        overview = await EntityService.aget_entities_overview(
+            db, user_id, status="pending", per_tag=settings.entities_overview_per_tag
+        )
     
-    if not db or not user_id:
-        return "Error: Context not set"
+    if not overview:
+        return "You have no pending entities yet."
+    
+    output = []
+    for group in overview:
+        output.append(f"\n**{group['tag'].upper()}** ({group['count']} items):")
+        for title in group["titles"]:
+            output.append(f"  - {title}")
     
-    entities = EntityService.get_user_entities(db, user_id, status="pending")
+    return "\n".join(output)
+
+@tool
+async def get_ready_tasks(config: RunnableConfig) -> str:
+    """Get what the user can work on right now: pending items whose prerequisites are all done"""
+    async with _get_context(config) as (db, user_id):
+        if not db or not user_id:
+            return "Error: Context not set"
+        
+        entities = await EntityService.aget_ready_entities(db, user_id, limit=10)
+        # The graph is loaded by the call above
+        graph = await dependency_index.aget(db, user_id)
     
     if not entities:
-        return "You have no pending entities yet."
+        return "Nothing is ready right now - everything pending is waiting on something else."
     
-    # Group by context
-    by_context = {}
+    output = ["Ready now:"]
     for e in entities:
-        for tag in e.context_tags or ['untagged']:
-            if tag not in by_context:
-                by_context[tag] = []
-            by_context[tag].append(e)
+        due = f" (due {e.due_at:%Y-%m-%d})" if e.due_at else ""
+        output.append(f"  - {e.title}{due}")
+    
+    with graph.lock:
+        _, cyclic = graph.topological_order()
+    if cyclic:
+        output.append(f"\n{len(cyclic)} items wait on each other in a cycle and can never start; suggest fixing their dependencies.")
+    
+    return "\n".join(output)
+
+@tool
+async def search(query: str, config: RunnableConfig) -> str:
+    """
+    Search the user's entities and past conversations by text
+    
+    Args:
+        query: Words to look for, e.g. 'dentist' or '"tax return"'
+    """
+    async with _get_context(config) as (db, user_id):
+        if not db or not user_id:
+            return "Error: Context not set"
+        
+        hits, _ = await SearchService.asearch(db, user_id, query, limit=8)
+    
+    if not hits:
+        return f"Nothing found for '{query}'."
     
     output = []
-    for context, ents in by_context.items():
-        output.append(f"\n**{context.upper()}** ({len(ents)} items):")
-        for e in ents[:5]:
-            output.append(f"  - {e.title}")
+    for hit in hits:
+        headline = hit["headline"].replace("<b>", "").replace("</b>", "")
+        if hit["kind"] == "entity":
+            output.append(f"- {hit['title']} ({hit['entity_type']}, {hit['status']}, id {hit['id']})")
+        else:
+            output.append(f"- {hit['role']} said on {hit['created_at']:%Y-%m-%d}: {headline}")
     
     return "\n".join(output)
 
 # Export
-tools = [add_entity, get_entities_overview]
\ No newline at end of file
+tools = [add_entity, get_entities_overview, get_ready_tasks, search]
\ No newline at end of file
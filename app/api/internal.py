@@ -0,0 +1,19 @@
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from app.config import settings
+from app.db_pool import pool_stats
+
+def require_internal_token(x_internal_token: Optional[str] = Header(None)):
+    """Guard for operator endpoints; they don't exist (404) until an internal_token is configured"""
+    if not settings.internal_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not hmac.compare_digest(x_internal_token or "", settings.internal_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid internal token")
+
+router = APIRouter(prefix="/internal", tags=["internal"], dependencies=[Depends(require_internal_token)])
+
+@router.get("/pool")
+def get_pool_stats():
+    """Connection pool state, checkout wait histogram and liveness counters per engine"""
+    return pool_stats()
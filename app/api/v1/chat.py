@@ -1,63 +1,132 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User, Message
+import json
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, delete, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db, AsyncSessionLocal
+from app.models import User, Message, ConversationSummary
 from app.auth import get_current_user
 from app.schemas.chat import ChatMessage, ChatResponse
-from app.agent.mentor import chat_with_mentor
+from app.schemas.message import ChatHistoryResponse, MessageResponse
+from app.pagination import encode_cursor, decode_cursor
+from app.serialization import ORJSONResponse, response_columns, result_dicts
+from app.agent.mentor import chat_with_mentor, stream_mentor
+from app.services.vector_index import vector_store
+from app.services.collection_version import CollectionVersionService, MESSAGES
+from app.services.message_writer import message_writer
+from app.config import settings
+from app.etag import collection_etag, etag_matches, etag_headers, not_modified
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 @router.post("", response_model=ChatResponse)
-def send_message(
+async def send_message(
     chat_msg: ChatMessage,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Send a message to the mentor agent"""
-    
+
     # Store user message
-    user_message = Message(
-        user_id=current_user.id,
-        role="user",
-        content=chat_msg.message
+    await message_writer.write(
+        db, current_user.id, "user", chat_msg.message, durability=settings.user_message_durability
     )
-    db.add(user_message)
-    db.commit()
-    
+
     # Get response from agent
-    response = chat_with_mentor(chat_msg.message, db, current_user.id)
-    
+    response = await chat_with_mentor(chat_msg.message, db, current_user.id)
+
     # Store assistant message
-    assistant_message = Message(
-        user_id=current_user.id,
-        role="assistant",
-        content=response
-    )
-    db.add(assistant_message)
-    db.commit()
-    
+    await message_writer.write(db, current_user.id, "assistant", response, durability=settings.message_durability)
+
     return {"response": response}
 
-@router.get("/history")
-def get_chat_history(
-    limit: int = 50,
+def _sse(event: dict) -> str:
+    """Format an agent event as a Server-Sent Event"""
+    name = event.pop("event")
+    return f"event: {name}\ndata: {json.dumps(event, default=str)}\n\n"
+
+@router.post("/stream")
+async def stream_message(
+    chat_msg: ChatMessage,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get conversation history"""
-    messages = db.query(Message).filter(
-        Message.user_id == current_user.id
-    ).order_by(Message.created_at.desc()).limit(limit).all()
-    
-    return {"messages": list(reversed(messages))}
+    """Send a message to the mentor agent and stream the reply as SSE"""
+    user_id = current_user.id
+
+    # Store user message
+    await message_writer.write(db, user_id, "user", chat_msg.message, durability=settings.user_message_durability)
+
+    async def event_stream():
+        # The request session is closed once the handler returns, so the
+        # stream gets its own
+        async with AsyncSessionLocal() as stream_db:
+            async for event in stream_mentor(chat_msg.message, stream_db, user_id):
+                if event["event"] == "message":
+                    # Persist the reply before telling the client we're done
+                    await message_writer.write(
+                        stream_db, user_id, "assistant", event["content"], durability=settings.message_durability
+                    )
+                yield _sse(event)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/history", response_model=ChatHistoryResponse)
+async def get_chat_history(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get conversation history, newest page first; next_cursor pages back in time"""
+    await message_writer.wait_user(current_user.id)
+
+    # Read the version before the page: a write in between only makes the body newer than its ETag
+    version = await CollectionVersionService.aget_version(db, current_user.id, MESSAGES)
+    etag = collection_etag(request, current_user.id, MESSAGES, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    query = select(*response_columns(Message, MessageResponse)).where(Message.user_id == current_user.id)
+
+    # Keyset: continue with messages older than the previous page
+    if cursor:
+        try:
+            created_at, message_id = decode_cursor(cursor, datetime, UUID)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        query = query.where(tuple_(Message.created_at, Message.id) < tuple_(created_at, message_id))
+
+    messages = result_dicts(await db.execute(
+        query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1)
+    ))
+
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1]["created_at"], messages[-1]["id"])
+
+    return ORJSONResponse({"messages": messages[::-1], "next_cursor": next_cursor}, headers=etag_headers(etag))
 
 @router.delete("/history")
-def clear_chat_history(
+async def clear_chat_history(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Clear conversation history (but keep entities)"""
-    db.query(Message).filter(Message.user_id == current_user.id).delete()
-    db.commit()
-    return {"message": "Chat history cleared"}
\ No newline at end of file
+    # Queued messages would otherwise land after the delete
+    await message_writer.wait_user(current_user.id)
+    await db.execute(delete(Message).where(Message.user_id == current_user.id))
+    await db.execute(delete(ConversationSummary).where(ConversationSummary.user_id == current_user.id))
+    await CollectionVersionService.abump(db, current_user.id, MESSAGES)
+    await db.commit()
+    vector_store.invalidate(current_user.id)
+    return {"message": "Chat history cleared"}
@@ -1,122 +1,233 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User
 from app.auth import get_current_user
 from app.schemas.entity import (
-    EntityCreate, EntityUpdate, EntityResponse,
+    EntityCreate, EntityUpdate, EntityResponse, EntityPage,
+    EntityBulkCreate, EntityBulkUpdate, EntityBulkDeleteResponse,
     EntityRelationCreate, EntityRelationResponse,
-    ContextWindowCreate, ContextWindowResponse
+    EntityGraphResponse, ContextWindowCreate, ContextWindowResponse
 )
 from app.services.entity_service import EntityService
+from app.services.dependency_graph import InvalidDependency
+from app.serialization import ORJSONResponse
+from app.services.collection_version import CollectionVersionService, ENTITIES, CONTEXT_WINDOWS
+from app.etag import collection_etag, etag_matches, etag_headers, not_modified
 
 router = APIRouter(prefix="/entities", tags=["entities"])
 
 # Entity endpoints
 @router.post("", response_model=EntityResponse, status_code=status.HTTP_201_CREATED)
-def create_entity(
+async def create_entity(
     entity_data: EntityCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new entity"""
-    entity = EntityService.create_entity(db, current_user.id, entity_data)
+    try:
+        entity = await EntityService.acreate_entity(db, current_user.id, entity_data)
+    except InvalidDependency as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     return entity
 
-@router.get("", response_model=List[EntityResponse])
-def get_entities(
+@router.get("", response_model=EntityPage)
+async def get_entities(
+    request: Request,
     entity_type: Optional[str] = Query(None),
     context_tag: Optional[str] = Query(None),
-    status: Optional[str] = Query(None),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a page of entities for current user with optional filters"""
+    # Read the version before the page: a write in between only makes the body newer than its ETag
+    version = await CollectionVersionService.aget_version(db, current_user.id, ENTITIES)
+    etag = collection_etag(request, current_user.id, ENTITIES, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    try:
+        entities, next_cursor = await EntityService.aget_user_entity_rows_page(
+            db, current_user.id, entity_type, context_tag, status_filter, limit, cursor, version=version
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return ORJSONResponse({"entities": entities, "next_cursor": next_cursor}, headers=etag_headers(etag))
+
+# Bulk, ready and context window endpoints (declared before /{entity_id} so they aren't parsed as an id)
+@router.post("/bulk", response_model=List[EntityResponse], status_code=status.HTTP_201_CREATED)
+async def bulk_create_entities(
+    bulk_data: EntityBulkCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create many entities in a single transaction"""
+    try:
+        return await EntityService.abulk_create_entities(db, current_user.id, bulk_data.entities)
+    except InvalidDependency as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.patch("/bulk", response_model=List[EntityResponse])
+async def bulk_update_entities(
+    bulk_data: EntityBulkUpdate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Apply the same changes to many entities; returns the ones updated"""
+    try:
+        return await EntityService.abulk_update_entities(db, current_user.id, bulk_data.ids, bulk_data.changes)
+    except InvalidDependency as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.delete("/bulk", response_model=EntityBulkDeleteResponse)
+async def bulk_delete_entities(
+    ids: Optional[List[UUID]] = Query(None),
+    entity_type: Optional[str] = Query(None),
+    context_tag: Optional[str] = Query(None),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete every entity matching the filters (at least one is required)"""
+    try:
+        deleted = await EntityService.abulk_delete_entities(
+            db, current_user.id, ids, entity_type, context_tag, status_filter
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"deleted": deleted}
+
+@router.get("/ready", response_model=List[EntityResponse])
+async def get_ready_entities(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get pending entities that are actionable now: every prerequisite is completed or cancelled"""
+    return await EntityService.aget_ready_entities(db, current_user.id, limit)
+
+@router.post("/context-windows", response_model=ContextWindowResponse, status_code=status.HTTP_201_CREATED)
+async def create_context_window(
+    window_data: ContextWindowCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all entities for current user with optional filters"""
-    entities = EntityService.get_user_entities(db, current_user.id, entity_type, context_tag, status)
-    return entities
+    """Create a context window"""
+    window = await EntityService.acreate_context_window(db, current_user.id, window_data)
+    return window
+
+@router.get("/context-windows", response_model=List[ContextWindowResponse])
+async def get_context_windows(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all context windows"""
+    version = await CollectionVersionService.aget_version(db, current_user.id, CONTEXT_WINDOWS)
+    etag = collection_etag(request, current_user.id, CONTEXT_WINDOWS, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    windows = await EntityService.aget_user_context_window_rows(db, current_user.id)
+    return ORJSONResponse(windows, headers=etag_headers(etag))
 
 @router.get("/{entity_id}", response_model=EntityResponse)
-def get_entity(
+async def get_entity(
     entity_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific entity"""
-    entity = EntityService.get_entity_by_id(db, entity_id, current_user.id)
+    entity = await EntityService.aget_entity_by_id(db, entity_id, current_user.id)
     if not entity:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entity not found")
     return entity
 
 @router.put("/{entity_id}", response_model=EntityResponse)
-def update_entity(
+async def update_entity(
     entity_id: UUID,
     entity_data: EntityUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update an entity"""
     try:
-        entity = EntityService.update_entity(db, entity_id, current_user.id, entity_data)
+        entity = await EntityService.aupdate_entity(db, entity_id, current_user.id, entity_data)
         return entity
+    except InvalidDependency as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 @router.delete("/{entity_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_entity(
+async def delete_entity(
     entity_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete an entity"""
-    success = EntityService.delete_entity(db, entity_id, current_user.id)
+    success = await EntityService.adelete_entity(db, entity_id, current_user.id)
     if not success:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entity not found")
     return None
 
 # Relation endpoints
 @router.post("/relations", response_model=EntityRelationResponse, status_code=status.HTTP_201_CREATED)
-def create_relation(
+async def create_relation(
     relation_data: EntityRelationCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a relationship between entities"""
-    relation = EntityService.create_relation(
-        db, 
-        relation_data.parent_id, 
-        relation_data.child_id, 
-        relation_data.relation_type
-    )
+    # Both ends must belong to the current user
+    for entity_id in (relation_data.parent_id, relation_data.child_id):
+        if not await EntityService.aget_entity_by_id(db, entity_id, current_user.id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entity not found")
+    
+    try:
+        relation = await EntityService.acreate_relation(
+            db, 
+            current_user.id,
+            relation_data.parent_id, 
+            relation_data.child_id, 
+            relation_data.relation_type
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     return relation
 
 @router.get("/{entity_id}/relations", response_model=List[EntityRelationResponse])
-def get_entity_relations(
+async def get_entity_relations(
     entity_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all relationships for an entity"""
-    relations = EntityService.get_entity_relations(db, entity_id)
-    return relations
+    if not await EntityService.aget_entity_by_id(db, entity_id, current_user.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entity not found")
 
-# Context window endpoints
-@router.post("/context-windows", response_model=ContextWindowResponse, status_code=status.HTTP_201_CREATED)
-def create_context_window(
-    window_data: ContextWindowCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Create a context window"""
-    window = EntityService.create_context_window(db, current_user.id, window_data)
-    return window
+    relations = await EntityService.aget_entity_relation_rows(db, entity_id)
+    return ORJSONResponse(relations)
 
-@router.get("/context-windows", response_model=List[ContextWindowResponse])
-def get_context_windows(
+@router.get("/{entity_id}/graph", response_model=EntityGraphResponse)
+async def get_entity_graph(
+    entity_id: UUID,
+    depth: int = Query(3, ge=1, le=20),
+    types: Optional[str] = Query(None, description="Comma-separated relation types, e.g. subtask,prerequisite"),
+    direction: str = Query("descendants", pattern="^(descendants|ancestors|both)$"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all context windows"""
-    windows = EntityService.get_user_context_windows(db, current_user.id)
-    return windows
\ No newline at end of file
+    """Get the entity's descendant and/or ancestor subgraph (nodes + edges) in one call"""
+    relation_types = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    graph = await EntityService.aget_entity_subgraph(
+        db, entity_id, current_user.id, depth, relation_types, direction
+    )
+    if not graph:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entity not found")
+    return graph
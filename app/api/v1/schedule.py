@@ -0,0 +1,28 @@
+from datetime import timedelta
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.models import User
+from app.auth import get_current_user
+from app.schemas.schedule import SchedulePlanRequest, SchedulePlanResponse
+from app.services.scheduler import ScheduleService
+
+router = APIRouter(prefix="/schedule", tags=["schedule"])
+
+@router.post("/plan", response_model=SchedulePlanResponse)
+async def plan_schedule(
+    plan_request: SchedulePlanRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Plan pending entities into context-window time over the coming days (nothing is saved)"""
+    return await ScheduleService.aplan(
+        db,
+        current_user.id,
+        current_user.timezone,
+        plan_request.start,
+        plan_request.days,
+        plan_request.entity_types,
+        timedelta(minutes=plan_request.default_duration_minutes),
+        plan_request.ready_only
+    )
@@ -0,0 +1,30 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.models import User
+from app.auth import get_current_user
+from app.schemas.search import SearchResponse
+from app.services.search_service import SearchService, SEARCH_KINDS
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+@router.get("", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=500, description='Web-search syntax: words, "phrases", -excluded, or'),
+    types: Optional[str] = Query(None, description="Comma-separated: entities, messages (default both)"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Full-text search over the current user's entities and chat history"""
+    kinds = [t.strip() for t in types.split(",") if t.strip()] if types else list(SEARCH_KINDS)
+    if not kinds or any(k not in SEARCH_KINDS for k in kinds):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="types must be entities and/or messages")
+
+    try:
+        hits, next_cursor = await SearchService.asearch(db, current_user.id, q, kinds, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"hits": hits, "next_cursor": next_cursor}
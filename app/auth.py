@@ -1,27 +1,61 @@
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import TTLCache
 from app.config import settings
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# hash_password/verify_password are re-exported for sync callers
+from app.passwords import (
+    hash_password, verify_password, password_pool, PasswordPoolFull
+)
 
 # JWT token bearer
 security = HTTPBearer()
 
-def hash_password(password: str) -> str:
-    """Hash a password"""
-    return pwd_context.hash(password)
+# Already-verified tokens (token -> payload) and authenticated users (id -> detached User)
+token_cache = TTLCache(settings.token_cache_size, settings.token_cache_ttl)
+user_cache = TTLCache(settings.user_cache_size, settings.user_cache_ttl)
+
+def invalidate_user(user_id) -> None:
+    """Drop a user from the cache; call after changing or deleting them"""
+    user_cache.pop(str(user_id))
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    invalidate_user(target.id)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+def _password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+async def ahash_password(password: str) -> str:
+    """Hash a password in the bcrypt worker pool (503 when saturated)"""
+    try:
+        return await password_pool.hash(password)
+    except PasswordPoolFull:
+        raise _password_pool_busy()
+
+async def averify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password in the bcrypt worker pool (503 when saturated).
+    
+    Returns (valid, new_hash); new_hash is set when the stored hash uses
+    outdated parameters and should be replaced.
+    """
+    try:
+        return await password_pool.verify_and_update(plain_password, hashed_password)
+    except PasswordPoolFull:
+        raise _password_pool_busy()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
@@ -36,10 +70,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 def decode_token(token: str) -> dict:
-    """Decode and verify JWT token"""
+    """Decode and verify JWT token, reusing earlier verifications until expiry"""
+    payload = token_cache.get(token)
+    if payload is not None:
+        if payload.get("exp", float("inf")) > time.time():
+            return payload
+        token_cache.pop(token)
+
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -47,9 +86,17 @@ def decode_token(token: str) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def get_current_user(
+    # Never cache a token past its own expiry
+    ttl = settings.token_cache_ttl
+    if "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(token, payload, ttl)
+    return payload
+
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Get current authenticated user from token"""
     token = credentials.credentials
@@ -62,11 +109,18 @@ def get_current_user(
             detail="Could not validate credentials"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    
+    user = (await db.scalars(select(User).where(User.id == user_id))).first()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
+    # Detach so the cached copy can be handed to other requests' sessions
+    db.expunge(user)
+    user_cache.set(user_id, user)
     return user
\ No newline at end of file
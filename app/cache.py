@@ -0,0 +1,190 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache with per-entry expiry.
+
+    maxsize bounds the number of entries, or with weigh, the total weight
+    of the values (e.g. their bytes). Thread-safe; keeps hit/miss counters
+    for metrics.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, weigh: Optional[Callable[[Any], int]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.weight = 0
+        self._weighted = weigh is not None
+        self._weigh = weigh or (lambda value: 1)
+        # key -> (value, expires_at, weight)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _drop(self, key: Hashable) -> None:
+        self.weight -= self._data.pop(key)[2]
+
+    def _evict(self) -> None:
+        while self.weight > self.maxsize and self._data:
+            self.weight -= self._data.popitem(last=False)[1][2]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[1] <= now:
+                if entry is not _MISSING:
+                    self._drop(key)
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        weight = self._weigh(value)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, expires_at, weight)
+            self.weight += weight
+            self._evict()
+
+    def reweigh(self, key: Hashable) -> None:
+        """Recompute the weight of a value that changed in place, evicting if over budget"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return
+            weight = self._weigh(entry[0])
+            self._data[key] = (entry[0], entry[1], weight)
+            self.weight += weight - entry[2]
+            self._evict()
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        stats = {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+        if self._weighted:
+            stats["weight"] = self.weight
+        return stats
+
+
+class CacheBackend:
+    """
+    Shared cache tier (bytes values and integer counters) that every worker
+    sees. Async methods run the sync ones off the event loop unless
+    overridden.
+    """
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def get_counter(self, key: str) -> int:
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: bytes, ttl: float) -> None:
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    async def aget_counter(self, key: str) -> int:
+        return await asyncio.to_thread(self.get_counter, key)
+
+    async def aincr(self, key: str) -> int:
+        return await asyncio.to_thread(self.incr, key)
+
+
+class LocalCacheBackend(CacheBackend):
+    """In-process stand-in for a shared backend, for tests and single-worker setups"""
+
+    def __init__(self, maxsize: int = 100000):
+        self._values = TTLCache(maxsize, ttl=0)
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._values.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._values.set(key, value, ttl)
+
+    def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    # Nothing blocks, so run inline
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: bytes, ttl: float) -> None:
+        self.set(key, value, ttl)
+
+    async def aget_counter(self, key: str) -> int:
+        return self.get_counter(key)
+
+    async def aincr(self, key: str) -> int:
+        return self.incr(key)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis as the shared tier. Counters are stored without expiry; run Redis
+    with a volatile-* eviction policy so they are never evicted.
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._client.set(key, value, px=max(1, int(ttl * 1000)))
+
+    def get_counter(self, key: str) -> int:
+        return int(self._client.get(key) or 0)
+
+    def incr(self, key: str) -> int:
+        return self._client.incr(key)
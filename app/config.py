@@ -5,14 +5,92 @@ class Settings(BaseSettings):
     # Database
     database_url: str
     
+    # Connection pools (per engine, per worker)
+    db_pool_class: str = "queue"  # 'queue', or 'null' to open a connection per checkout (behind PgBouncer)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0  # Seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # Replace connections older than this (seconds; -1 = never)
+    db_pool_pre_ping: bool = False  # Ping on every checkout; the liveness check below is cheaper
+    db_liveness_interval: float = 30.0  # Ping idle connections in the background (0 = off)
+    db_pgbouncer: bool = False  # Transaction pooling: no server-side prepared statement caching
+    
+    # Internal endpoints (/internal/*, /metrics) require X-Internal-Token; they answer 404 while unset
+    internal_token: str = ""
+    metrics_enabled: bool = True  # Prometheus /metrics and the per-request middleware
+    
+    # SQL profiler (debugging): per-request statement log, X-SQL-Profile header, N+1 warnings
+    sql_profiler_enabled: bool = False
+    sql_profiler_repeat_threshold: int = 5  # Same statement shape this many times in one request is flagged
+    
     # JWT Auth
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 10080
+
+    # Password hashing
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2  # Processes per app worker
+    password_hash_max_pending: int = 64  # Beyond this, auth returns 503
+
+    # Auth caches (per worker)
+    token_cache_size: int = 10000
+    token_cache_ttl: float = 300.0
+    user_cache_size: int = 10000
+    user_cache_ttl: float = 60.0
     
     openai_api_key: str = ""
     anthropic_api_key: str = ""
-    
+
+    # LLM
+    llm_provider: str = "openai"  # 'openai', or 'fake' (deterministic stub for load tests)
+    llm_model: str = "gpt-4o-mini"
+    llm_temperature: float = 0.7
+    llm_timeout: float = 60.0
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry: float = 30.0
+    fake_llm_latency: float = 0.5  # Seconds per call (+/- 20%)
+    fake_llm_tool_call_ratio: float = 0.5  # Share of user turns answered with a tool call
+
+    # Conversation memory
+    memory_token_budget: int = 2000  # History + summary tokens per prompt
+    memory_target_ratio: float = 0.5  # Fold down to this share of the budget
+    memory_max_messages: int = 200  # Unsummarised messages loaded per page (and summarised per LLM call)
+
+    # Agent tools
+    entities_overview_per_tag: int = 5  # Titles listed per context tag
+
+    # Read-through cache for entity listings
+    entity_cache_enabled: bool = True
+    entity_cache_size: int = 5000  # Cached listings per worker
+    entity_cache_ttl: float = 30.0  # Bounds staleness across workers without a shared backend
+    entity_cache_backend: str = ""  # Shared tier: '' (none), 'local' (in-process stand-in) or 'redis'
+    entity_cache_redis_url: str = "redis://localhost:6379/0"
+
+    # Chat message persistence (see app/services/message_writer.py)
+    message_durability: str = "group"  # 'sync', 'group' (batched, awaited) or 'async' (write-behind)
+    user_message_durability: str = "group"  # 'sync' commits the user message before the LLM call
+    message_batch_size: int = 200  # Messages per multi-row INSERT
+    message_flush_interval: float = 0.01  # Wait this long for more messages before writing a batch
+    message_queue_size: int = 10000  # Writers wait when this many messages are queued
+
+    # Dependency graphs for "ready" entities (per worker)
+    dependency_graph_cache_size: int = 10000
+    dependency_graph_ttl: float = 300.0  # Reload to pick up other workers' writes
+
+    # Semantic recall
+    embedding_backend: str = "hashing"  # 'hashing' (local, deterministic) or 'openai'
+    embedding_model: str = "text-embedding-3-small"
+    embedding_dim: int = 256
+    vector_index_max_bytes: int = 256 * 1024 * 1024  # Vector memory across users' indexes (per worker); LRU evicted
+    vector_index_ttl: float = 600.0
+    vector_index_max_messages: int = 5000  # Newest messages indexed per user
+    vector_index_ann_threshold: int = 20000  # Switch from exact to IVF search
+    vector_index_nprobe: int = 8
+    recall_top_k: int = 5  # Items injected into the prompt
+    recall_min_score: float = 0.2
+
     # Environment
     environment: str = "development"
     
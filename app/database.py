@@ -1,25 +1,44 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.db_pool import engine_options, instrument
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,  # Verify connections before using
-    echo=settings.environment == "development"  # Log SQL in dev
+# Create SQLAlchemy engine (pool sizing and PgBouncer mode come from settings)
+engine = create_engine(settings.database_url, **engine_options(is_async=False))
+
+# Async engine for request handlers (same database, asyncpg driver)
+async_engine = create_async_engine(
+    make_url(settings.database_url).set(drivername="postgresql+asyncpg"),
+    **engine_options(is_async=True)
 )
 
-# Session factory
+instrument("sync", engine)
+instrument("async", async_engine)
+
+# Session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False  # Objects stay readable after commit without lazy IO
+)
 
 # Base class for models
 Base = declarative_base()
 
-# Dependency for FastAPI routes
+# Dependency for scripts and sync code
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency for FastAPI routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,258 @@
+import asyncio
+import bisect
+import logging
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import Pool, QueuePool, AsyncAdaptedQueuePool, NullPool
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the checkout wait buckets; the last bucket is open-ended
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class WaitHistogram:
+    """Per-bucket (not cumulative) counts of checkout waits; thread-safe"""
+
+    def __init__(self, bounds=WAIT_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            count = sum(self.counts)
+            return {
+                "buckets": {
+                    **{f"le_{b}ms": n for b, n in zip(self.bounds, self.counts)},
+                    "inf": self.counts[-1],
+                },
+                "count": count,
+                "avg_ms": self.total_ms / count if count else 0.0,
+                "max_ms": self.max_ms,
+            }
+
+
+class PoolMetrics:
+    """Counters for one engine's pool, fed by the timed pool classes and pool events"""
+
+    def __init__(self):
+        self.wait = WaitHistogram()
+        self.timeouts = 0
+        self.errors = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.liveness_runs = 0
+        self.liveness_failures = 0
+        self.last_liveness_at: Optional[float] = None
+
+
+class _TimedPool:
+    """Times every checkout (the wait for a free or new connection) into metrics"""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        if self.metrics is None:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        except Exception:
+            self.metrics.errors += 1
+            raise
+        finally:
+            self.metrics.wait.observe((time.perf_counter() - started) * 1000)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(_TimedPool, NullPool):
+    pass
+
+
+def engine_options(is_async: bool) -> dict:
+    """create_engine keyword arguments for the configured pool and PgBouncer settings"""
+    options = {
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "echo": settings.environment == "development",
+    }
+    if settings.db_pool_class == "null":
+        options["poolclass"] = TimedNullPool
+    else:
+        options.update(
+            poolclass=TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+
+    if settings.db_pgbouncer and is_async:
+        # PgBouncer in transaction mode may hand each transaction a different
+        # server connection, so named prepared statements can't be reused
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return options
+
+
+_metrics: Dict[str, PoolMetrics] = {}
+_engines: Dict[str, object] = {}
+
+
+def instrument(name: str, engine) -> None:
+    """Attach metrics to an engine's pool; name labels it in pool_stats()"""
+    sync_engine: Engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    pool: Pool = sync_engine.pool
+    metrics = PoolMetrics()
+    pool.metrics = metrics
+    _metrics[name] = metrics
+    _engines[name] = engine
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+
+def pool_stats() -> Dict[str, dict]:
+    """Current state and counters of every instrumented pool"""
+    stats = {}
+    for name, engine in _engines.items():
+        pool = (engine.sync_engine if isinstance(engine, AsyncEngine) else engine).pool
+        metrics = _metrics[name]
+        state = {"pool_class": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            state.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(0, pool.overflow()),
+                max_overflow=pool._max_overflow,
+                timeout=pool.timeout(),
+            )
+        stats[name] = {
+            **state,
+            "connects": metrics.connects,
+            "invalidations": metrics.invalidations,
+            "timeouts": metrics.timeouts,
+            "errors": metrics.errors,
+            "checkout_wait": metrics.wait.snapshot(),
+            "liveness_runs": metrics.liveness_runs,
+            "liveness_failures": metrics.liveness_failures,
+            "last_liveness_at": metrics.last_liveness_at,
+        }
+    return stats
+
+
+class LivenessChecker:
+    """
+    Pings idle pooled connections in the background instead of on every
+    checkout.
+
+    Each run checks out, pings and returns as many connections as are idle
+    in each pool; QueuePool hands them out in FIFO order, so that covers
+    the idle ones. A failed ping is a disconnect error, which makes
+    SQLAlchemy invalidate the whole pool, so requests get fresh
+    connections instead of dead ones.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="db-liveness")
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            for name, engine in list(_engines.items()):
+                try:
+                    if isinstance(engine, AsyncEngine):
+                        await self._check_async(name, engine)
+                    else:
+                        await asyncio.to_thread(self._check_sync, name, engine)
+                except Exception:
+                    logger.exception("liveness check of pool %s failed", name)
+
+    @staticmethod
+    def _idle(engine) -> int:
+        pool = (engine.sync_engine if isinstance(engine, AsyncEngine) else engine).pool
+        return pool.checkedin() if isinstance(pool, QueuePool) else 0
+
+    def _record(self, name: str, failures: int) -> None:
+        metrics = _metrics[name]
+        metrics.liveness_runs += 1
+        metrics.liveness_failures += failures
+        metrics.last_liveness_at = time.time()
+
+    async def _check_async(self, name: str, engine: AsyncEngine) -> None:
+        failures = 0
+        for _ in range(self._idle(engine)):
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            except Exception as e:
+                failures += 1
+                logger.warning("pool %s: dead connection replaced: %s", name, e)
+        self._record(name, failures)
+
+    def _check_sync(self, name: str, engine: Engine) -> None:
+        failures = 0
+        for _ in range(self._idle(engine)):
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+            except Exception as e:
+                failures += 1
+                logger.warning("pool %s: dead connection replaced: %s", name, e)
+        self._record(name, failures)
+
+
+liveness_checker = LivenessChecker(settings.db_liveness_interval)
@@ -0,0 +1,94 @@
+import asyncio
+import re
+import zlib
+from functools import lru_cache
+from typing import List, Sequence
+import numpy as np
+from app.config import settings
+
+_WORD = re.compile(r"\w+")
+
+# HashingEmbedder batches up to this size are embedded on the event loop
+INLINE_BATCH = 32
+
+
+class Embedder:
+    """
+    Turns texts into L2-normalised float32 vectors of size dim.
+
+    Subclasses implement embed(); aembed() runs it off the event loop
+    unless overridden.
+    """
+
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    async def aembed(self, texts: Sequence[str]) -> np.ndarray:
+        return await asyncio.to_thread(self.embed, texts)
+
+
+class HashingEmbedder(Embedder):
+    """
+    Deterministic local embedder: signed feature hashing of words, word
+    bigrams and character trigrams. No model or network, same vectors in
+    every process, so it suits offline runs and tests. It captures lexical
+    overlap (including word-form variants through trigrams), not meaning.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[tuple]:
+        words = _WORD.findall(text.lower())
+        features = [(w, 1.0) for w in words]
+        features += [(f"{a} {b}", 0.5) for a, b in zip(words, words[1:])]
+        features += [(f"#{w[i:i + 3]}", 0.25) for w in words if len(w) > 3 for i in range(len(w) - 2)]
+        return features
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        rows, cols, weights = [], [], []
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text or ""):
+                h = zlib.crc32(feature.encode())
+                rows.append(row)
+                cols.append(h % self.dim)
+                # A second hash bit picks the sign so collisions cancel out on average
+                weights.append(weight if (h >> 31) & 1 else -weight)
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (rows, cols), weights)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    async def aembed(self, texts: Sequence[str]) -> np.ndarray:
+        # A query or a few queued writes embed in microseconds; index builds
+        # (thousands of texts, ~1s) must not block the event loop
+        if len(texts) <= INLINE_BATCH:
+            return self.embed(texts)
+        return await super().aembed(texts)
+
+
+class OpenAIEmbedder(Embedder):
+    """Embeddings from the OpenAI API via langchain-openai"""
+
+    def __init__(self, model: str, dim: int):
+        from langchain_openai import OpenAIEmbeddings
+
+        self.dim = dim
+        self._client = OpenAIEmbeddings(model=model, dimensions=dim, api_key=settings.openai_api_key)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return np.asarray(self._client.embed_documents(list(texts)), dtype=np.float32)
+
+    async def aembed(self, texts: Sequence[str]) -> np.ndarray:
+        return np.asarray(await self._client.aembed_documents(list(texts)), dtype=np.float32)
+
+
+@lru_cache()
+def get_embedder() -> Embedder:
+    """The embedder selected by settings.embedding_backend ('hashing' or 'openai')"""
+    if settings.embedding_backend == "openai":
+        return OpenAIEmbedder(settings.embedding_model, settings.embedding_dim)
+    return HashingEmbedder(settings.embedding_dim)
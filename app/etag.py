@@ -0,0 +1,36 @@
+import hashlib
+from uuid import UUID
+from fastapi import Request, Response
+
+# Clients may keep the body but must revalidate it; shared caches must not store it
+CACHE_CONTROL = "private, no-cache"
+
+
+def collection_etag(request: Request, user_id: UUID, collection: str, version: int) -> str:
+    """
+    Strong ETag for a listing of a versioned collection.
+
+    The same version and the same query (filters, limit, cursor) always
+    produce the same body, so together they identify the representation.
+    """
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    key = f"{user_id}|{collection}|{version}|{request.url.path}|{query}"
+    return '"' + hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names etag (weak comparison, as RFC 9110 requires for it)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def etag_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
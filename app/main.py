@@ -1,12 +1,36 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.v1 import auth, entities, chat  # ✅ Changed tasks → entities
+from app.api.v1 import auth, entities, chat, schedule, search  # ✅ Changed tasks → entities
+from app.api import internal
+from app.api.internal import require_internal_token
+from app.agent.mentor import mentor_registry
 from app.config import settings
+from app.database import engine, async_engine
+from app.db_pool import liveness_checker
+from app.metrics import MetricsMiddleware, instrument_engine, metrics_response
+from app import sql_profiler
+from app.passwords import password_pool
+from app.services.message_writer import message_writer
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up: compile the agent graph and LLM client before taking traffic
+    mentor_registry.warm_up()
+    message_writer.start()
+    liveness_checker.start()
+    yield
+    await liveness_checker.aclose()
+    # Drain queued messages before the connections they need go away
+    await message_writer.aclose()
+    await mentor_registry.aclose()
+    password_pool.shutdown()
 
 app = FastAPI(
     title="AI Personal Mentor API",
     version="2.0.0", 
-    description="Backend for AI Personal Mentor application"
+    description="Backend for AI Personal Mentor application",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -17,10 +41,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Inert unless sql_profiler_enabled or a test's assert_max_queries() is active
+app.add_middleware(sql_profiler.SQLProfilerMiddleware)
+if settings.sql_profiler_enabled:
+    sql_profiler.install(engine, async_engine)
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine("sync", engine)
+    instrument_engine("async", async_engine)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(entities.router, prefix="/api/v1")  # ✅ Changed
 app.include_router(chat.router, prefix="/api/v1")
+app.include_router(schedule.router, prefix="/api/v1")
+app.include_router(search.router, prefix="/api/v1")
+app.include_router(internal.router)
 
 @app.get("/")
 def root():
@@ -32,4 +69,10 @@ def root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+if settings.metrics_enabled:
+    # Scrapers send X-Internal-Token (404 while no internal_token is configured)
+    @app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_internal_token)])
+    def metrics():
+        return metrics_response()
\ No newline at end of file
@@ -0,0 +1,200 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Label for requests no route matched, so scanners can't blow up label cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", ["method"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency, until the last body chunk is sent",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_SQL_QUERIES = Histogram(
+    "http_request_sql_queries", "SQL statements executed per HTTP request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250),
+)
+HTTP_REQUEST_SQL_DURATION = Histogram(
+    "http_request_sql_duration_seconds", "Time spent in SQL statements per HTTP request", ["route"],
+)
+SQL_QUERY_DURATION = Histogram(
+    "sql_query_duration_seconds", "SQL statement latency", ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+LLM_CALL_DURATION = Histogram(
+    "llm_call_duration_seconds", "Chat model call latency", ["model"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+)
+LLM_CALL_ERRORS = Counter("llm_call_errors_total", "Failed chat model calls", ["model"])
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by the chat model", ["model", "kind"])
+LLM_TOOL_CALLS = Counter("llm_tool_calls_total", "Agent tool executions", ["tool", "outcome"])
+LLM_TOOL_DURATION = Histogram(
+    "llm_tool_duration_seconds", "Agent tool execution latency", ["tool"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+class _RequestSQL:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# Set per request by MetricsMiddleware; the engine hooks add to it. Async
+# sessions run statements in a greenlet that shares the task's context, and
+# sync routes run in a thread with a copy of it, so both see the same object
+_request_sql: ContextVar[Optional[_RequestSQL]] = ContextVar("request_sql", default=None)
+
+
+def instrument_engine(name: str, engine) -> None:
+    """Time every statement of an engine into the SQL histograms"""
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    observe = SQL_QUERY_DURATION.labels(name).observe
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        observe(elapsed)
+        stats = _request_sql.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, in-flight count and SQL work per
+    route (the route template, e.g. /api/v1/entities/{entity_id}).
+
+    Written against raw ASGI rather than BaseHTTPMiddleware so streaming
+    responses pass through untouched and the per-request cost stays at a
+    few label lookups.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        stats = _RequestSQL()
+        token = _request_sql.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            _request_sql.reset(token)
+            route = scope.get("route")
+            route = getattr(route, "path", None) or UNMATCHED_ROUTE
+            HTTP_REQUEST_DURATION.labels(method, route, str(status_code)).observe(elapsed)
+            HTTP_REQUEST_SQL_QUERIES.labels(route).observe(stats.queries)
+            HTTP_REQUEST_SQL_DURATION.labels(route).observe(stats.seconds)
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """
+    LangChain callback feeding the LLM and tool metrics.
+
+    Passed in the agent's run config, so it sees every chat model call and
+    tool run of the graph. run_inline keeps it on the event loop instead of
+    a thread pool hop per callback; each callback only touches a dict and
+    a few counters.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._llm_runs: Dict[UUID, tuple] = {}
+        self._tool_runs: Dict[UUID, tuple] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        model = (metadata or {}).get("ls_model_name") or "unknown"
+        self._llm_runs[run_id] = (model, time.perf_counter())
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._llm_runs.pop(run_id, None)
+        if run is None:
+            return
+        model, started = run
+        LLM_CALL_DURATION.labels(model).observe(time.perf_counter() - started)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    LLM_TOKENS.labels(model, "prompt").inc(usage.get("input_tokens", 0))
+                    LLM_TOKENS.labels(model, "completion").inc(usage.get("output_tokens", 0))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._llm_runs.pop(run_id, None)
+        if run is not None:
+            LLM_CALL_ERRORS.labels(run[0]).inc()
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs: Any) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "unknown"
+        self._tool_runs[run_id] = (name, time.perf_counter())
+
+    def _tool_done(self, run_id: UUID, outcome: str) -> None:
+        run = self._tool_runs.pop(run_id, None)
+        if run is not None:
+            name, started = run
+            LLM_TOOL_CALLS.labels(name, outcome).inc()
+            LLM_TOOL_DURATION.labels(name).observe(time.perf_counter() - started)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._tool_done(run_id, "ok")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._tool_done(run_id, "error")
+
+
+llm_metrics = LLMMetricsHandler()
+
+
+def _registry() -> CollectorRegistry:
+    # Under several worker processes each one writes its samples to
+    # PROMETHEUS_MULTIPROC_DIR and a scrape aggregates them
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_response() -> Response:
+    """Prometheus text exposition of every metric"""
+    return Response(generate_latest(_registry()), media_type=CONTENT_TYPE_LATEST)
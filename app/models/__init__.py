@@ -4,7 +4,11 @@ from app.models.entity_relation import EntityRelation
 from app.models.context_window import ContextWindow
 from app.models.user_pattern import UserPattern
 from app.models.message import Message
+from app.models.collection_version import CollectionVersion
+from app.models.conversation_summary import ConversationSummary
+from app.models.pattern_event import PatternEvent
 
 __all__ = [
-    "User", "Entity", "EntityRelation", "ContextWindow", "UserPattern", "Message"  
+    "User", "Entity", "EntityRelation", "ContextWindow", "UserPattern", "Message",
+    "CollectionVersion", "ConversationSummary", "PatternEvent"
 ]
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, BigInteger, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.database import Base
+
+class CollectionVersion(Base):
+    __tablename__ = "collection_versions"
+    
+    # One counter per user and collection ('entities', 'context_windows', 'messages'),
+    # bumped in the same transaction as every write to that collection
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    collection = Column(String(30), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
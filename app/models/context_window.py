@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Time, Integer, ARRAY
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Column, String, Time, Integer, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from sqlalchemy import DateTime
@@ -10,7 +10,7 @@ class ContextWindow(Base):
     __tablename__ = "context_windows"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     
     window_type = Column(String(50), nullable=False)
     # Values: 'work_hours', 'morning_routine', 'evening_wind_down', 'weekend', 'focus_block'
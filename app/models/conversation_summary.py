@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Text, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ConversationSummary(Base):
+    __tablename__ = "conversation_summaries"
+    
+    # Rolling summary of a user's chat up to and including one message, in
+    # (created_at, id) order; kept apart from messages so history responses
+    # and their ETags never see it
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    summary = Column(Text, nullable=False)
+    covered_until = Column(DateTime(timezone=True), nullable=False)
+    covered_message_id = Column(UUID(as_uuid=True), nullable=False)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
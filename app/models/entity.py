@@ -1,15 +1,33 @@
-from sqlalchemy import Column, ForeignKey, String, Text, Integer, DateTime, Date, Interval, ARRAY
-from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, ForeignKey, String, Text, Integer, DateTime, Date, Interval, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY, TSVECTOR
+from sqlalchemy.sql import func, text
+from sqlalchemy.orm import relationship, deferred
 import uuid
 from app.database import Base
 
 class Entity(Base):
     __tablename__ = "entities"
+    __table_args__ = (
+        # Keyset pagination of a user's entities (priority, created_at, id);
+        # also serves plain user_id lookups
+        Index("ix_entities_user_priority_created", "user_id", "priority", "created_at", "id"),
+        # Listings filtered by status / entity_type, same ordering
+        Index("ix_entities_user_status_priority_created", "user_id", "status", "priority", "created_at", "id"),
+        Index("ix_entities_user_type_priority_created", "user_id", "entity_type", "priority", "created_at", "id"),
+        # A user's completions, scanned when pattern mining rebuilds from scratch
+        Index(
+            "ix_entities_user_completed", "user_id", "completed_at", "id",
+            postgresql_where=text("completed_at IS NOT NULL")
+        ),
+        # Full-text search within a user's rows (btree_gin for user_id)
+        Index(
+            "ix_entities_user_search_vector", "user_id", "search_vector",
+            postgresql_using="gin", postgresql_with={"fastupdate": "off"}
+        ),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     
     # Classification
     entity_type = Column(String(50), nullable=False, index=True)
@@ -43,6 +61,17 @@ class Entity(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Full-text search, maintained by Postgres; title ranks above description.
+    # Deferred so regular entity loads don't fetch it
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+            persisted=True
+        )
+    ))
     
     # Relationships
 
@@ -52,11 +81,13 @@ class Entity(Base):
         "EntityRelation",
         foreign_keys="EntityRelation.child_id",
         back_populates="child",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True  # DB cascades; avoids lazy loads on delete
     )
     child_relations = relationship(
         "EntityRelation",
         foreign_keys="EntityRelation.parent_id",
         back_populates="parent",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
\ No newline at end of file
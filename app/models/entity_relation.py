@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -7,6 +7,11 @@ from app.database import Base
 
 class EntityRelation(Base):
     __tablename__ = "entity_relations"
+    __table_args__ = (
+        # Relations are looked up by either end
+        Index("ix_entity_relations_parent_id", "parent_id"),
+        Index("ix_entity_relations_child_id", "child_id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     parent_id = Column(UUID(as_uuid=True), ForeignKey("entities.id", ondelete="CASCADE"), nullable=False)
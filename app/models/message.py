@@ -1,15 +1,25 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Column, Computed, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 import uuid
 from app.database import Base
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Keyset pagination of a user's history (created_at, id); also
+        # serves plain user_id lookups
+        Index("ix_messages_user_created", "user_id", "created_at", "id"),
+        # Full-text search within a user's rows (btree_gin for user_id)
+        Index(
+            "ix_messages_user_search_vector", "user_id", "search_vector",
+            postgresql_using="gin", postgresql_with={"fastupdate": "off"}
+        ),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     
     role = Column(String(20), nullable=False)  # 'user' or 'assistant'
     content = Column(Text, nullable=False)
@@ -18,6 +28,12 @@ class Message(Base):
     extra_data = Column(JSONB, default={})
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    # Full-text search, maintained by Postgres; deferred so history loads skip it
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed("to_tsvector('english', content)", persisted=True)
+    ))
     
     # Relationship
     user = relationship("User", back_populates="messages")
\ No newline at end of file
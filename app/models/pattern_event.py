@@ -0,0 +1,24 @@
+from sqlalchemy import Column, BigInteger, SmallInteger, Float, String, DateTime, Interval, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from app.database import Base
+
+class PatternEvent(Base):
+    __tablename__ = "pattern_events"
+    __table_args__ = (
+        # Queue per user, consumed by the pattern-mining job
+        Index("ix_pattern_events_user_id", "user_id", "id"),
+    )
+
+    # Written by the entities_pattern_events trigger: +1 with the mined fields
+    # when an entity becomes completed, -1 with the old fields when a completed
+    # entity is edited, un-completed or deleted
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    sign = Column(SmallInteger, nullable=False)
+
+    completed_at = Column(DateTime(timezone=True), nullable=False)
+    scheduled_at = Column(DateTime(timezone=True))
+    due_at = Column(DateTime(timezone=True))
+    estimated_duration = Column(Interval)
+    context_tags = Column(ARRAY(String))
+    actual_minutes = Column(Float)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, DateTime
+from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -7,9 +7,13 @@ from app.database import Base
 
 class UserPattern(Base):
     __tablename__ = "user_patterns"
+    __table_args__ = (
+        # One row per pattern type; upsert target for the mining job
+        Index("ux_user_patterns_user_type", "user_id", "pattern_type", unique=True),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     
     pattern_type = Column(String(50), nullable=False)
     # Values: 'completion_time', 'procrastination_trigger', 'energy_pattern', 
@@ -1,7 +1,26 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict, Any
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, time, timedelta
 from uuid import UUID
+import re
+
+# Seconds per unit for human-readable durations
+_DURATION_UNITS = {
+    "s": 1, "sec": 1, "secs": 1, "second": 1, "seconds": 1,
+    "m": 60, "min": 60, "mins": 60, "minute": 60, "minutes": 60,
+    "h": 3600, "hr": 3600, "hrs": 3600, "hour": 3600, "hours": 3600,
+    "d": 86400, "day": 86400, "days": 86400,
+}
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)\s*([a-z]+)")
+
+def parse_duration(value: Any) -> Any:
+    """Parse "2 hours", "30 minutes" or "1h 30m" into a timedelta; anything else is left to pydantic"""
+    if not isinstance(value, str):
+        return value
+    parts = _DURATION_PART.findall(value.lower())
+    if not parts or any(unit not in _DURATION_UNITS for _, unit in parts):
+        return value
+    return timedelta(seconds=sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts))
 
 class EntityCreate(BaseModel):
     entity_type: str = Field(..., description="task, event, goal, milestone, health_log, note")
@@ -17,15 +36,18 @@ class EntityCreate(BaseModel):
     # Context
     context_tags: List[str] = []
     location: Optional[str] = None
-    estimated_duration: Optional[str] = None  # "2 hours", "30 minutes"
+    estimated_duration: Optional[timedelta] = None  # "2 hours", "30 minutes"
     
     # State
     status: str = "pending"
+    blocked_by: List[UUID] = []  # Entities that must be completed first
     priority: int = 0
     
     # Metadata
     extra_data: Dict[str, Any] = {}
 
+    _parse_duration = field_validator("estimated_duration", mode="before")(parse_duration)
+
 class EntityUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -34,6 +56,7 @@ class EntityUpdate(BaseModel):
     context_tags: Optional[List[str]] = None
     location: Optional[str] = None
     status: Optional[str] = None
+    blocked_by: Optional[List[UUID]] = None
     priority: Optional[int] = None
     completed_at: Optional[datetime] = None
     extra_data: Optional[Dict[str, Any]] = None
@@ -67,10 +90,35 @@ class EntityResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class EntityPage(BaseModel):
+    entities: List[EntityResponse]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
+
+# Upper bound on items per bulk request
+BULK_MAX_ITEMS = 1000
+
+class EntityBulkCreate(BaseModel):
+    entities: List[EntityCreate] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class EntityBulkUpdate(BaseModel):
+    ids: List[UUID] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+    changes: EntityUpdate  # Applied to every entity in ids
+
+    @field_validator("changes")
+    @classmethod
+    def _changes_not_empty(cls, changes: EntityUpdate) -> EntityUpdate:
+        # An empty update would still rewrite every row and bump the collection version
+        if not changes.model_dump(exclude_unset=True):
+            raise ValueError("changes must set at least one field")
+        return changes
+
+class EntityBulkDeleteResponse(BaseModel):
+    deleted: int
+
 class EntityRelationCreate(BaseModel):
     parent_id: UUID
     child_id: UUID
-    relation_type: str  # 'subtask', 'prerequisite', 'milestone_of', 'related_to', 'combine_with'
+    relation_type: str  # 'subtask', 'prerequisite', 'milestone_of', 'related_to', 'combine_with', 'blocks'
 
 class EntityRelationResponse(BaseModel):
     id: UUID
@@ -82,10 +130,15 @@ class EntityRelationResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class EntityGraphResponse(BaseModel):
+    root_id: UUID
+    nodes: List[EntityResponse]  # Includes the root
+    edges: List[EntityRelationResponse]
+
 class ContextWindowCreate(BaseModel):
     window_type: str
-    start_time: Optional[str] = None  # "09:00:00"
-    end_time: Optional[str] = None
+    start_time: Optional[time] = None  # "09:00:00"
+    end_time: Optional[time] = None
     days_of_week: List[int] = []  # [1,2,3,4,5]
     energy_level: Optional[str] = None
     preferred_activities: List[str] = []
@@ -95,8 +148,8 @@ class ContextWindowResponse(BaseModel):
     id: UUID
     user_id: UUID
     window_type: str
-    start_time: Optional[str]
-    end_time: Optional[str]
+    start_time: Optional[time]
+    end_time: Optional[time]
     days_of_week: List[int]
     energy_level: Optional[str]
     preferred_activities: List[str]
@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
 from uuid import UUID
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 class MessageResponse(BaseModel):
     id: UUID
@@ -12,4 +12,8 @@ class MessageResponse(BaseModel):
     created_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ChatHistoryResponse(BaseModel):
+    messages: List[MessageResponse]  # Chronological
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for older messages
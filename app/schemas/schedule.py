@@ -0,0 +1,31 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+from uuid import UUID
+
+class SchedulePlanRequest(BaseModel):
+    start: Optional[datetime] = None  # Defaults to now; naive times are in the user's timezone
+    days: int = Field(7, ge=1, le=31)
+    entity_types: List[str] = ["task"]
+    default_duration_minutes: int = Field(30, ge=1, le=1440)  # For entities without estimated_duration
+    ready_only: bool = False  # Skip entities still waiting on prerequisites
+
+class ScheduledItem(BaseModel):
+    entity_id: UUID
+    title: str
+    window_id: UUID
+    window_type: str
+    start: datetime
+    end: datetime
+    score: float
+
+class UnscheduledItem(BaseModel):
+    entity_id: UUID
+    title: str
+    reason: str  # 'no_matching_window', 'too_long', 'deadline', 'no_capacity'
+
+class SchedulePlanResponse(BaseModel):
+    start: datetime
+    end: datetime
+    scheduled: List[ScheduledItem]  # Chronological
+    unscheduled: List[UnscheduledItem]
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from uuid import UUID
+
+class SearchHit(BaseModel):
+    kind: str  # 'entity' or 'message'
+    id: UUID
+    title: Optional[str]  # Entities only
+    entity_type: Optional[str]  # Entities only
+    status: Optional[str]  # Entities only
+    role: Optional[str]  # Messages only
+    headline: str  # Matched terms wrapped in <b></b>
+    rank: float
+    created_at: datetime
+
+class SearchResponse(BaseModel):
+    hits: List[SearchHit]  # Best match first
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
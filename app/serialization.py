@@ -0,0 +1,59 @@
+from functools import lru_cache
+from typing import Any, Callable, List, Type
+from uuid import UUID
+import orjson
+from pydantic import BaseModel, TypeAdapter
+from fastapi.responses import JSONResponse
+from sqlalchemy.engine import Result
+
+# UTC datetimes end in "Z", as pydantic renders them
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+@lru_cache(maxsize=None)
+def type_adapter(tp: Any) -> TypeAdapter:
+    """Build a TypeAdapter once per type; construction is far costlier than use"""
+    return TypeAdapter(tp)
+
+
+@lru_cache(maxsize=None)
+def _serializer(tp: type) -> Callable[[Any], Any]:
+    # asyncpg returns its own uuid.UUID subclass, which orjson does not recognise
+    if issubclass(tp, UUID):
+        return str
+    # Anything else orjson lacks (timedelta, Decimal, ...) takes pydantic's JSON
+    # form, so the output matches what response_model would have produced
+    adapter = type_adapter(tp)
+    return lambda value: adapter.dump_python(value, mode="json")
+
+
+def _default(value: Any) -> Any:
+    return _serializer(type(value))(value)
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+
+    Returning it from a route skips response_model validation and
+    jsonable_encoder, so content must already have the response shape:
+    build it from rows selected with response_columns().
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def response_columns(model, schema: Type[BaseModel]) -> list:
+    """The model's columns for every field of the response schema, in schema order"""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def result_dicts(result: Result) -> List[dict]:
+    """Plain dicts from a Core result; cheaper than ORM objects or Row._asdict()"""
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result]
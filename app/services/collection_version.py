@@ -0,0 +1,66 @@
+from sqlalchemy import select, func, Select, Insert
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable
+from uuid import UUID
+from app.models import CollectionVersion
+
+# Collections with a version; each names what its listing endpoint returns
+ENTITIES = "entities"
+CONTEXT_WINDOWS = "context_windows"
+MESSAGES = "messages"
+
+
+class CollectionVersionService:
+    """
+    Per-user version counters for listing endpoints, the basis of their ETags.
+
+    Writers call bump() before committing, so the new version becomes
+    visible atomically with the data it describes. Reading a version is a
+    primary-key lookup, far cheaper than the listing it stands for.
+    """
+
+    @staticmethod
+    def _bump_statement(user_ids: Iterable[UUID], collection: str) -> Insert:
+        # A fixed row order keeps concurrent multi-user bumps from deadlocking
+        stmt = insert(CollectionVersion).values([
+            {"user_id": user_id, "collection": collection, "version": 1}
+            for user_id in sorted(set(user_ids), key=str)
+        ])
+        return stmt.on_conflict_do_update(
+            index_elements=[CollectionVersion.user_id, CollectionVersion.collection],
+            set_={"version": CollectionVersion.version + 1, "updated_at": func.now()},
+        )
+
+    @staticmethod
+    def _version_query(user_id: UUID, collection: str) -> Select:
+        return select(CollectionVersion.version).where(
+            CollectionVersion.user_id == user_id,
+            CollectionVersion.collection == collection
+        )
+
+    @staticmethod
+    def bump(db: Session, user_id: UUID, collection: str) -> None:
+        """Increment the version inside the caller's transaction (the caller commits)"""
+        db.execute(CollectionVersionService._bump_statement([user_id], collection))
+
+    @staticmethod
+    def get_version(db: Session, user_id: UUID, collection: str) -> int:
+        """Current version; 0 if the collection was never written"""
+        return db.scalar(CollectionVersionService._version_query(user_id, collection)) or 0
+
+    @staticmethod
+    async def abump(db: AsyncSession, user_id: UUID, collection: str) -> None:
+        """Increment the version inside the caller's transaction (the caller commits)"""
+        await db.execute(CollectionVersionService._bump_statement([user_id], collection))
+
+    @staticmethod
+    async def abump_many(db: AsyncSession, user_ids: Iterable[UUID], collection: str) -> None:
+        """Increment the version for several users in one statement (the caller commits)"""
+        await db.execute(CollectionVersionService._bump_statement(user_ids, collection))
+
+    @staticmethod
+    async def aget_version(db: AsyncSession, user_id: UUID, collection: str) -> int:
+        """Current version; 0 if the collection was never written"""
+        return await db.scalar(CollectionVersionService._version_query(user_id, collection)) or 0
@@ -0,0 +1,294 @@
+import threading
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+from sqlalchemy import select, Select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import TTLCache
+from app.config import settings
+from app.models import Entity, EntityRelation
+
+# Relation types that order work: the child can't start until the parent is done
+DEPENDENCY_RELATIONS = ("prerequisite", "blocks")
+
+# A prerequisite in one of these states no longer holds anything up
+DONE_STATUSES = ("completed", "cancelled")
+
+
+class InvalidDependency(ValueError):
+    """A dependency (blocked_by or relation) on an unknown entity, or one that closes a cycle"""
+
+
+class DependencyGraph:
+    """
+    One user's dependency DAG over entities.
+
+    Edges run prerequisite -> dependent and come from Entity.blocked_by and
+    prerequisite/blocks relations. Each node keeps a count of unfinished
+    prerequisites, so a status change or a new edge only touches the node
+    and its direct dependents, and the set of ready (pending, unblocked)
+    entities is always current without a full recomputation.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ready: Set[UUID] = set()
+        self._status: Dict[UUID, str] = {}
+        self._unmet: Dict[UUID, int] = {}
+        self._blocked_by: Dict[UUID, Set[UUID]] = {}
+        # Edge multiplicities: the same pair can come from blocked_by and a relation
+        self._prerequisites: Dict[UUID, Counter] = defaultdict(Counter)
+        self._dependents: Dict[UUID, Counter] = defaultdict(Counter)
+
+    def __len__(self) -> int:
+        return len(self._status)
+
+    def _done(self, node: UUID) -> bool:
+        return self._status.get(node) in DONE_STATUSES
+
+    def _refresh(self, node: UUID) -> None:
+        if self._status.get(node) == "pending" and self._unmet[node] == 0:
+            self.ready.add(node)
+        else:
+            self.ready.discard(node)
+
+    def add_edge(self, prerequisite: UUID, dependent: UUID) -> None:
+        # Unknown ends (deleted or another user's entity) don't block anything
+        if prerequisite not in self._status or dependent not in self._status:
+            return
+
+        if not self._prerequisites[dependent][prerequisite] and not self._done(prerequisite):
+            self._unmet[dependent] += 1
+            self._refresh(dependent)
+        self._prerequisites[dependent][prerequisite] += 1
+        self._dependents[prerequisite][dependent] += 1
+
+    def remove_edge(self, prerequisite: UUID, dependent: UUID) -> None:
+        if not self._prerequisites[dependent][prerequisite]:
+            return
+
+        self._prerequisites[dependent][prerequisite] -= 1
+        self._dependents[prerequisite][dependent] -= 1
+        if not self._prerequisites[dependent][prerequisite]:
+            del self._prerequisites[dependent][prerequisite]
+            del self._dependents[prerequisite][dependent]
+            if not self._done(prerequisite):
+                self._unmet[dependent] -= 1
+                self._refresh(dependent)
+
+    def set_entity(self, node: UUID, status: str, blocked_by: Optional[Iterable[UUID]] = None) -> None:
+        """Add or update a node; blocked_by=None leaves its blocked_by edges as they are"""
+        if node not in self._status:
+            self._status[node] = status
+            self._unmet[node] = 0
+            self._blocked_by[node] = set()
+        else:
+            was_done = self._done(node)
+            self._status[node] = status
+            if self._done(node) != was_done:
+                delta = 1 if was_done else -1
+                for dependent in self._dependents[node]:
+                    self._unmet[dependent] += delta
+                    self._refresh(dependent)
+        self._refresh(node)
+
+        if blocked_by is not None:
+            old, new = self._blocked_by[node], set(blocked_by)
+            for prerequisite in old - new:
+                self.remove_edge(prerequisite, node)
+            for prerequisite in new - old:
+                self.add_edge(prerequisite, node)
+            self._blocked_by[node] = new
+
+    def remove_entity(self, node: UUID) -> None:
+        if node not in self._status:
+            return
+
+        for dependent in list(self._dependents.pop(node, ())):
+            del self._prerequisites[dependent][node]
+            if not self._done(node):
+                self._unmet[dependent] -= 1
+                self._refresh(dependent)
+        for prerequisite in self._prerequisites.pop(node, ()):
+            del self._dependents[prerequisite][node]
+
+        del self._status[node], self._unmet[node], self._blocked_by[node]
+        self.ready.discard(node)
+
+    def would_cycle(self, prerequisite: UUID, dependent: UUID) -> bool:
+        """Whether adding prerequisite -> dependent closes a cycle"""
+        return self.would_cycle_any([prerequisite], [dependent])
+
+    def would_cycle_any(self, prerequisites: Iterable[UUID], dependents: Iterable[UUID]) -> bool:
+        """Whether adding an edge from every prerequisite to every dependent closes a cycle"""
+        targets, seen = set(prerequisites), set(dependents)
+        if targets & seen:
+            return True
+
+        # Only the part of the graph downstream of the dependents is visited
+        stack = list(seen)
+        while stack:
+            for node in self._dependents.get(stack.pop(), ()):
+                if node in targets:
+                    return True
+                if node not in seen:
+                    seen.add(node)
+                    stack.append(node)
+        return False
+
+    def topological_order(self) -> Tuple[List[UUID], List[UUID]]:
+        """
+        Unfinished entities in an order that respects their prerequisites,
+        and the ones left over because they sit on (or behind) a cycle.
+        """
+        unmet = {n: self._unmet[n] for n in self._status if not self._done(n)}
+        queue = deque(n for n, count in unmet.items() if count == 0)
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for dependent in self._dependents.get(node, ()):
+                unmet[dependent] -= 1
+                if unmet[dependent] == 0:
+                    queue.append(dependent)
+        return order, [n for n, count in unmet.items() if count > 0]
+
+
+@dataclass(eq=False)
+class _Build:
+    """A graph load in progress; stale once a write lands before it is cached"""
+    stale: bool = False
+
+
+class DependencyIndex:
+    """
+    Per-worker cache of DependencyGraphs, loaded on first use and patched
+    by EntityService after each committed write.
+
+    A write that commits while a graph is being loaded may be missing from
+    the rows read, and there is no cached graph yet to patch: the load is
+    then marked stale and its graph serves only the request that built it.
+    Graphs expire after the TTL so writes made by other workers are picked
+    up on the next load.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._graphs = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._building: Dict[UUID, List[_Build]] = {}
+        self._building_lock = threading.Lock()
+
+    @staticmethod
+    def _entities_query(user_id: UUID) -> Select:
+        return select(Entity.id, Entity.status, Entity.blocked_by).where(Entity.user_id == user_id)
+
+    @staticmethod
+    def _relations_query(user_id: UUID) -> Select:
+        return (
+            select(EntityRelation.parent_id, EntityRelation.child_id)
+            .join(Entity, Entity.id == EntityRelation.child_id)
+            .where(Entity.user_id == user_id, EntityRelation.relation_type.in_(DEPENDENCY_RELATIONS))
+        )
+
+    def _start_build(self, user_id: UUID) -> _Build:
+        build = _Build()
+        with self._building_lock:
+            self._building.setdefault(user_id, []).append(build)
+        return build
+
+    def _end_build(self, user_id: UUID, build: _Build) -> None:
+        with self._building_lock:
+            building = self._building.get(user_id, [])
+            if build in building:
+                building.remove(build)
+            if not building:
+                self._building.pop(user_id, None)
+
+    def _mark_stale(self, user_id: UUID) -> None:
+        with self._building_lock:
+            for build in self._building.get(user_id, ()):
+                build.stale = True
+
+    def _build(self, user_id: UUID, build: _Build, entity_rows, relation_rows) -> DependencyGraph:
+        graph = DependencyGraph()
+        for row in entity_rows:
+            graph.set_entity(row.id, row.status)
+        for row in entity_rows:
+            graph.set_entity(row.id, row.status, row.blocked_by or ())
+        for row in relation_rows:
+            graph.add_edge(row.parent_id, row.child_id)
+
+        # Under the lock the write hooks take first: a write either marked this
+        # build stale already or finds the cached graph afterwards and patches it
+        with self._building_lock:
+            # Keep a graph another request loaded (and may have patched) meanwhile
+            existing = self._graphs.get(user_id)
+            if existing is not None:
+                return existing
+            if not build.stale:
+                self._graphs.set(user_id, graph)
+        return graph
+
+    def get(self, db: Session, user_id: UUID) -> DependencyGraph:
+        graph = self._graphs.get(user_id)
+        if graph is None:
+            build = self._start_build(user_id)
+            try:
+                entity_rows = db.execute(self._entities_query(user_id)).all()
+                relation_rows = db.execute(self._relations_query(user_id)).all()
+                graph = self._build(user_id, build, entity_rows, relation_rows)
+            finally:
+                self._end_build(user_id, build)
+        return graph
+
+    async def aget(self, db: AsyncSession, user_id: UUID) -> DependencyGraph:
+        graph = self._graphs.get(user_id)
+        if graph is None:
+            build = self._start_build(user_id)
+            try:
+                entity_rows = (await db.execute(self._entities_query(user_id))).all()
+                relation_rows = (await db.execute(self._relations_query(user_id))).all()
+                graph = self._build(user_id, build, entity_rows, relation_rows)
+            finally:
+                self._end_build(user_id, build)
+        return graph
+
+    # Write hooks: graphs in memory are patched, loads in progress are marked stale
+
+    def entities_saved(self, user_id: UUID, entities: Iterable[Entity]) -> None:
+        self._mark_stale(user_id)
+        graph = self._graphs.get(user_id)
+        if graph is not None:
+            with graph.lock:
+                for entity in entities:
+                    graph.set_entity(entity.id, entity.status, entity.blocked_by or ())
+
+    def entities_deleted(self, user_id: UUID, entity_ids: Iterable[UUID]) -> None:
+        self._mark_stale(user_id)
+        graph = self._graphs.get(user_id)
+        if graph is not None:
+            with graph.lock:
+                for entity_id in entity_ids:
+                    graph.remove_entity(entity_id)
+
+    def relation_added(self, user_id: UUID, relation: EntityRelation) -> None:
+        if relation.relation_type in DEPENDENCY_RELATIONS:
+            self._mark_stale(user_id)
+        graph = self._graphs.get(user_id)
+        if graph is not None and relation.relation_type in DEPENDENCY_RELATIONS:
+            with graph.lock:
+                graph.add_edge(relation.parent_id, relation.child_id)
+
+    def invalidate(self, user_id: UUID) -> None:
+        self._graphs.pop(user_id)
+        self._mark_stale(user_id)
+
+    def stats(self) -> dict:
+        return self._graphs.stats()
+
+
+dependency_index = DependencyIndex(
+    maxsize=settings.dependency_graph_cache_size,
+    ttl=settings.dependency_graph_ttl,
+)
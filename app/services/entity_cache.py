@@ -0,0 +1,187 @@
+import itertools
+import threading
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+from uuid import UUID
+import orjson
+from app.cache import TTLCache, CacheBackend, LocalCacheBackend, RedisCacheBackend
+from app.config import settings
+from app.serialization import dumps
+
+_MISSING = object()
+
+
+class EntityCache:
+    """
+    Read-through cache for EntityService listings, keyed by user and filters.
+
+    Two tiers: a per-worker LRU (values shared by reference, so callers must
+    treat them as read-only) and an optional shared backend holding values
+    as JSON, never pickle, so write access to the backend can't run code in
+    the workers. Values read back from it carry UUIDs, datetimes and
+    durations as JSON strings, which ORJSONResponse renders to the same
+    bytes. Every key embeds the user's generation; a write bumps the
+    generation, which orphans all of the user's entries at once (they age
+    out through the LRU and TTL).
+
+    A generation is always read before the database, so a listing loaded
+    concurrently with a write is stored under the old generation and never
+    served after it. Without a shared backend, generations are per worker:
+    other workers' writes show up once their entries expire. Callers that
+    need more (listings sent under an ETag) put the collection version they
+    read into the key, which no worker can reuse after a write.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, backend: Optional[CacheBackend] = None, enabled: bool = True):
+        self.ttl = ttl
+        self.enabled = enabled
+        self.backend = backend
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Per-worker generations, when there is no backend. A missing or
+        # expired one gets a never-used token, so old entries stay unreachable
+        self._generations = TTLCache(maxsize=maxsize, ttl=ttl * 10)
+        self._tokens = itertools.count(1)
+        self._lock = threading.Lock()
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _generation_key(user_id: UUID) -> str:
+        return f"entities:gen:{user_id}"
+
+    @staticmethod
+    def _shared_key(user_id: UUID, generation: int, key: Tuple[Hashable, ...]) -> str:
+        return f"entities:{user_id}:{generation}:" + "|".join(map(str, key))
+
+    def _local_generation(self, user_id: UUID) -> int:
+        generation = self._generations.get(user_id)
+        if generation is None:
+            generation = next(self._tokens)
+            self._generations.set(user_id, generation)
+        return generation
+
+    def _count(self, shared_hit: bool) -> None:
+        with self._lock:
+            if shared_hit:
+                self.shared_hits += 1
+            else:
+                self.shared_misses += 1
+
+    def _loaded(self) -> None:
+        with self._lock:
+            self.loads += 1
+
+    def get(self, user_id: UUID, key: Tuple[Hashable, ...], loader: Callable[[], Any]) -> Any:
+        """Cached value for (user, key), calling loader() on a miss"""
+        if not self.enabled:
+            return loader()
+
+        # Callers may hold the id as a UUID or a string
+        user_id = str(user_id)
+        if self.backend:
+            generation = self.backend.get_counter(self._generation_key(user_id))
+        else:
+            generation = self._local_generation(user_id)
+        local_key = (user_id, generation, key)
+        value = self._local.get(local_key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        if self.backend:
+            shared_key = self._shared_key(user_id, generation, key)
+            blob = self.backend.get(shared_key)
+            self._count(blob is not None)
+            if blob is not None:
+                value = orjson.loads(blob)
+                self._local.set(local_key, value)
+                return value
+
+        value = loader()
+        self._loaded()
+        self._local.set(local_key, value)
+        if self.backend:
+            self.backend.set(shared_key, dumps(value), self.ttl)
+        return value
+
+    async def aget(self, user_id: UUID, key: Tuple[Hashable, ...], loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value for (user, key), awaiting loader() on a miss"""
+        if not self.enabled:
+            return await loader()
+
+        user_id = str(user_id)
+        if self.backend:
+            generation = await self.backend.aget_counter(self._generation_key(user_id))
+        else:
+            generation = self._local_generation(user_id)
+        local_key = (user_id, generation, key)
+        value = self._local.get(local_key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        if self.backend:
+            shared_key = self._shared_key(user_id, generation, key)
+            blob = await self.backend.aget(shared_key)
+            self._count(blob is not None)
+            if blob is not None:
+                value = orjson.loads(blob)
+                self._local.set(local_key, value)
+                return value
+
+        value = await loader()
+        self._loaded()
+        self._local.set(local_key, value)
+        if self.backend:
+            await self.backend.aset(shared_key, dumps(value), self.ttl)
+        return value
+
+    # Write hooks, called by EntityService after each commit
+
+    def invalidate(self, user_id: UUID) -> None:
+        with self._lock:
+            self.invalidations += 1
+        user_id = str(user_id)
+        if self.backend:
+            self.backend.incr(self._generation_key(user_id))
+        else:
+            self._generations.set(user_id, next(self._tokens))
+
+    async def ainvalidate(self, user_id: UUID) -> None:
+        with self._lock:
+            self.invalidations += 1
+        user_id = str(user_id)
+        if self.backend:
+            await self.backend.aincr(self._generation_key(user_id))
+        else:
+            self._generations.set(user_id, next(self._tokens))
+
+    def stats(self) -> dict:
+        local = self._local.stats()
+        # Requests answered by either tier
+        hits = local["hits"] + self.shared_hits
+        total = local["hits"] + local["misses"]
+        return {
+            **local,
+            "shared_backend": type(self.backend).__name__ if self.backend else None,
+            "shared_hits": self.shared_hits,
+            "shared_misses": self.shared_misses,
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+            "overall_hit_ratio": hits / total if total else 0.0,
+        }
+
+
+def _backend() -> Optional[CacheBackend]:
+    if settings.entity_cache_backend == "redis":
+        return RedisCacheBackend(settings.entity_cache_redis_url)
+    if settings.entity_cache_backend == "local":
+        return LocalCacheBackend()
+    return None
+
+
+entity_cache = EntityCache(
+    maxsize=settings.entity_cache_size,
+    ttl=settings.entity_cache_ttl,
+    backend=_backend(),
+    enabled=settings.entity_cache_enabled,
+)
@@ -1,16 +1,33 @@
+from sqlalchemy import select, insert, update, delete, func, literal, any_, bindparam, union_all, case, Select, Insert, Update, Delete, tuple_
+from sqlalchemy.dialects.postgresql import array, ARRAY, UUID as PG_UUID
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 from datetime import datetime, date
 from app.models import Entity, EntityRelation, ContextWindow
-from app.schemas.entity import EntityCreate, EntityUpdate, ContextWindowCreate
+from app.schemas.entity import (
+    EntityCreate, EntityUpdate, ContextWindowCreate,
+    EntityResponse, EntityRelationResponse, ContextWindowResponse
+)
+from app.pagination import encode_cursor, decode_cursor
+from app.serialization import response_columns, result_dicts
+from app.services.dependency_graph import dependency_index, DEPENDENCY_RELATIONS, InvalidDependency
+from app.services.vector_index import vector_store
+from app.services.entity_cache import entity_cache
+from app.services.collection_version import CollectionVersionService, ENTITIES, CONTEXT_WINDOWS
 
 class EntityService:
-    
+    """
+    Entity CRUD. Every method has an async twin prefixed with "a"
+    (create_entity / acreate_entity) sharing the same statements.
+    """
+
+    # Statement and object builders shared by sync and async methods
+
     @staticmethod
-    def create_entity(db: Session, user_id: UUID, entity_data: EntityCreate) -> Entity:
-        """Create a new entity"""
-        entity = Entity(
+    def _entity_values(user_id: UUID, entity_data: EntityCreate) -> dict:
+        return dict(
             user_id=user_id,
             entity_type=entity_data.entity_type,
             title=entity_data.title,
@@ -23,80 +40,548 @@ class EntityService:
             location=entity_data.location,
             estimated_duration=entity_data.estimated_duration,
             status=entity_data.status,
+            blocked_by=entity_data.blocked_by,
             priority=entity_data.priority,
             extra_data=entity_data.extra_data
         )
+
+    @staticmethod
+    def _new_entity(user_id: UUID, entity_data: EntityCreate) -> Entity:
+        return Entity(**EntityService._entity_values(user_id, entity_data))
+
+    @staticmethod
+    def _bulk_create_statement() -> Insert:
+        # Executed with a list of value dicts: batched multi-row INSERT ... RETURNING
+        return insert(Entity).returning(Entity)
+
+    @staticmethod
+    def _bulk_update_statement(user_id: UUID, entity_ids: List[UUID], entity_data: EntityUpdate) -> Update:
+        values = entity_data.model_dump(exclude_unset=True)
+
+        # Handle completion: stamp only rows that weren't already completed
+        if values.get("status") == "completed" and "completed_at" not in values:
+            values["completed_at"] = func.coalesce(Entity.completed_at, func.now())
+
+        return (
+            update(Entity)
+            .where(Entity.user_id == user_id, Entity.id.in_(entity_ids))
+            .values(**values)
+            .returning(Entity)
+        )
+
+    @staticmethod
+    def _bulk_delete_statement(
+        user_id: UUID,
+        entity_ids: Optional[List[UUID]] = None,
+        entity_type: Optional[str] = None,
+        context_tag: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> Delete:
+        if not (entity_ids or entity_type or context_tag or status):
+            raise ValueError("At least one filter is required")
+
+        # Relations go via ON DELETE CASCADE in the database, nothing is loaded
+        query = delete(Entity).where(Entity.user_id == user_id)
+
+        if entity_ids:
+            query = query.where(Entity.id.in_(entity_ids))
+
+        if entity_type:
+            query = query.where(Entity.entity_type == entity_type)
+
+        if context_tag:
+            query = query.where(Entity.context_tags.contains([context_tag]))
+
+        if status:
+            query = query.where(Entity.status == status)
+
+        return query.returning(Entity.id).execution_options(synchronize_session=False)
+
+    @staticmethod
+    def _user_entities_query(
+        user_id: UUID,
+        entity_type: Optional[str] = None,
+        context_tag: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> Select:
+        query = select(Entity).where(Entity.user_id == user_id)
+
+        if entity_type:
+            query = query.where(Entity.entity_type == entity_type)
+
+        if context_tag:
+            query = query.where(Entity.context_tags.contains([context_tag]))
+
+        if status:
+            query = query.where(Entity.status == status)
+
+        return query.order_by(Entity.priority.desc(), Entity.created_at.desc(), Entity.id.desc())
+
+    @staticmethod
+    def _user_entities_page_query(
+        user_id: UUID,
+        entity_type: Optional[str],
+        context_tag: Optional[str],
+        status: Optional[str],
+        limit: int,
+        cursor: Optional[str]
+    ) -> Select:
+        query = EntityService._user_entities_query(user_id, entity_type, context_tag, status)
+
+        # Keyset: continue strictly after the last row of the previous page
+        if cursor:
+            priority, created_at, entity_id = decode_cursor(cursor, int, datetime, UUID)
+            query = query.where(
+                tuple_(Entity.priority, Entity.created_at, Entity.id) < tuple_(priority, created_at, entity_id)
+            )
+
+        # One extra row tells us whether there is a next page
+        return query.limit(limit + 1)
+
+    @staticmethod
+    def _page(entities: List[Entity], limit: int) -> Tuple[List[Entity], Optional[str]]:
+        if len(entities) <= limit:
+            return entities, None
+        entities = entities[:limit]
+        last = entities[-1]
+        return entities, encode_cursor(last.priority, last.created_at, last.id)
+
+    # Row variants select exactly the response schema's columns as plain dicts,
+    # for routes that serialize without building ORM objects or response models
+
+    @staticmethod
+    def _user_entity_rows_page_query(
+        user_id: UUID,
+        entity_type: Optional[str],
+        context_tag: Optional[str],
+        status: Optional[str],
+        limit: int,
+        cursor: Optional[str]
+    ) -> Select:
+        query = EntityService._user_entities_page_query(user_id, entity_type, context_tag, status, limit, cursor)
+        return query.with_only_columns(*response_columns(Entity, EntityResponse))
+
+    @staticmethod
+    def _row_page(rows: List[dict], limit: int) -> Tuple[List[dict], Optional[str]]:
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, encode_cursor(last["priority"], last["created_at"], last["id"])
+
+    @staticmethod
+    def _overview_query(user_id: UUID, status: str, per_tag: int) -> Select:
+        # One row per (entity, tag) with the entity's position in the listing order;
+        # untagged entities count under 'untagged'
+        tags = case(
+            (func.cardinality(Entity.context_tags) > 0, Entity.context_tags),
+            else_=array([literal("untagged")]),
+        )
+        tagged = (
+            select(
+                func.unnest(tags).label("tag"),
+                tags.label("tags"),
+                Entity.title,
+                func.row_number().over(
+                    order_by=(Entity.priority.desc(), Entity.created_at.desc(), Entity.id.desc())
+                ).label("position"),
+            )
+            .where(Entity.user_id == user_id, Entity.status == status)
+            .subquery("tagged")
+        )
+
+        by_tag = dict(partition_by=tagged.c.tag)
+        ranked = select(
+            tagged.c.tag,
+            tagged.c.title,
+            func.count().over(**by_tag).label("total"),
+            func.min(tagged.c.position).over(**by_tag).label("first_position"),
+            # Tags first seen on the same entity keep that entity's tag order
+            func.first_value(func.array_position(tagged.c.tags, tagged.c.tag)).over(
+                order_by=tagged.c.position, **by_tag
+            ).label("first_index"),
+            func.row_number().over(order_by=tagged.c.position, **by_tag).label("rank"),
+        ).subquery("ranked")
+
+        # Tags in order of their first entity, top titles within each
+        return (
+            select(ranked.c.tag, ranked.c.total, ranked.c.title)
+            .where(ranked.c.rank <= per_tag)
+            .order_by(ranked.c.first_position, ranked.c.first_index, ranked.c.rank)
+        )
+
+    @staticmethod
+    def _overview(rows) -> List[Dict]:
+        overview = {}
+        for tag, total, title in rows:
+            overview.setdefault(tag, {"tag": tag, "count": total, "titles": []})["titles"].append(title)
+        return list(overview.values())
+
+    @staticmethod
+    def _entity_by_id_query(entity_id: UUID, user_id: UUID) -> Select:
+        return select(Entity).where(
+            Entity.id == entity_id,
+            Entity.user_id == user_id
+        )
+
+    @staticmethod
+    def _apply_update(entity: Entity, entity_data: EntityUpdate) -> None:
+        update_data = entity_data.model_dump(exclude_unset=True)
+
+        # Handle completion
+        if "status" in update_data and update_data["status"] == "completed" and not entity.completed_at:
+            update_data["completed_at"] = datetime.utcnow()
+
+        for field, value in update_data.items():
+            setattr(entity, field, value)
+
+    @staticmethod
+    def _ready_entities_query(user_id: UUID, entity_ids: List[UUID], limit: int) -> Select:
+        # Status is rechecked in case the cached graph lags another worker's write.
+        # One array parameter rather than one per id: the ready set is unbounded
+        ids = bindparam("ready_ids", entity_ids, type_=ARRAY(PG_UUID(as_uuid=True)))
+        return (
+            select(Entity)
+            .where(Entity.id == any_(ids), Entity.user_id == user_id, Entity.status == "pending")
+            .order_by(Entity.priority.desc(), Entity.due_at.asc().nulls_last(), Entity.created_at, Entity.id)
+            .limit(limit)
+        )
+
+    @staticmethod
+    def _check_relation(graph, parent_id: UUID, child_id: UUID, relation_type: str) -> None:
+        if relation_type in DEPENDENCY_RELATIONS:
+            with graph.lock:
+                if graph.would_cycle(parent_id, child_id):
+                    raise InvalidDependency("Relation would create a dependency cycle")
+
+    @staticmethod
+    def _owned_count_query(user_id: UUID, entity_ids: List[UUID]) -> Select:
+        return select(func.count()).select_from(Entity).where(Entity.user_id == user_id, Entity.id.in_(entity_ids))
+
+    @staticmethod
+    def _check_blocked_by(graph, owned: int, blocked_by: List[UUID], entity_ids: List[UUID]) -> None:
+        if owned != len(blocked_by):
+            raise InvalidDependency("blocked_by references an unknown entity")
+        if graph is not None:
+            with graph.lock:
+                if graph.would_cycle_any(blocked_by, entity_ids):
+                    raise InvalidDependency("blocked_by would create a dependency cycle")
+
+    @staticmethod
+    def _new_blocked_by(entities: List[EntityCreate]) -> List[UUID]:
+        return list({entity_id for e in entities for entity_id in e.blocked_by})
+
+    @staticmethod
+    def _updated_blocked_by(entity_data: EntityUpdate) -> List[UUID]:
+        return list(set(entity_data.blocked_by or ())) if "blocked_by" in entity_data.model_fields_set else []
+
+    @staticmethod
+    def _entity_relations_query(entity_id: UUID) -> Select:
+        return select(EntityRelation).where(
+            (EntityRelation.parent_id == entity_id) | (EntityRelation.child_id == entity_id)
+        )
+
+    @staticmethod
+    def _subgraph_query(
+        root_id: UUID,
+        user_id: UUID,
+        depth: int,
+        relation_types: Optional[List[str]],
+        ancestors: bool
+    ) -> Select:
+        """
+        Recursive CTE walking relations away from root_id, up to depth hops.
+
+        Descendants follow parent -> child, ancestors child -> parent. Only
+        the user's own entities are entered. An edge leading back to a node
+        already on the current path is still returned (flagged as closing a
+        cycle) but never walked past, so cycles terminate.
+        """
+        relations = EntityRelation.__table__
+        entities = Entity.__table__
+        near, far = (
+            (relations.c.child_id, relations.c.parent_id) if ancestors
+            else (relations.c.parent_id, relations.c.child_id)
+        )
+
+        anchor = (
+            select(
+                relations.c.id,
+                relations.c.parent_id,
+                relations.c.child_id,
+                relations.c.relation_type,
+                relations.c.created_at,
+                far.label("node_id"),
+                literal(1).label("depth"),
+                array([near, far]).label("path"),
+                (far == near).label("cycle"),
+            )
+            .join(entities, entities.c.id == far)
+            .where(near == root_id, entities.c.user_id == user_id)
+        )
+        if relation_types:
+            anchor = anchor.where(relations.c.relation_type.in_(relation_types))
+
+        walk = anchor.cte("walk_up" if ancestors else "walk_down", recursive=True)
+        step = (
+            select(
+                relations.c.id,
+                relations.c.parent_id,
+                relations.c.child_id,
+                relations.c.relation_type,
+                relations.c.created_at,
+                far,
+                walk.c.depth + 1,
+                walk.c.path.concat(array([far])),
+                far == any_(walk.c.path),
+            )
+            .join(relations, near == walk.c.node_id)
+            .join(entities, entities.c.id == far)
+            .where(
+                walk.c.depth < depth,
+                entities.c.user_id == user_id,
+                ~walk.c.cycle,
+            )
+        )
+        if relation_types:
+            step = step.where(relations.c.relation_type.in_(relation_types))
+
+        walk = walk.union_all(step)
+        return select(
+            walk.c.id, walk.c.parent_id, walk.c.child_id, walk.c.relation_type, walk.c.created_at
+        )
+
+    @staticmethod
+    def _subgraph_statement(
+        root_id: UUID,
+        user_id: UUID,
+        depth: int,
+        relation_types: Optional[List[str]],
+        direction: str
+    ):
+        walks = []
+        if direction in ("descendants", "both"):
+            walks.append(EntityService._subgraph_query(root_id, user_id, depth, relation_types, ancestors=False))
+        if direction in ("ancestors", "both"):
+            walks.append(EntityService._subgraph_query(root_id, user_id, depth, relation_types, ancestors=True))
+        return walks[0] if len(walks) == 1 else union_all(*walks)
+
+    @staticmethod
+    def _subgraph_result(root_id: UUID, edge_rows, nodes: List[Entity]) -> Optional[dict]:
+        if not any(n.id == root_id for n in nodes):
+            return None
+        # A relation reachable along several paths is returned once
+        edges = {row.id: row._asdict() for row in edge_rows}
+        return {"root_id": root_id, "nodes": nodes, "edges": list(edges.values())}
+
+    @staticmethod
+    def _new_context_window(user_id: UUID, window_data: ContextWindowCreate) -> ContextWindow:
+        return ContextWindow(
+            user_id=user_id,
+            window_type=window_data.window_type,
+            start_time=window_data.start_time,
+            end_time=window_data.end_time,
+            days_of_week=window_data.days_of_week,
+            energy_level=window_data.energy_level,
+            preferred_activities=window_data.preferred_activities,
+            extra_data=window_data.extra_data
+        )
+
+    @staticmethod
+    def _user_context_windows_query(user_id: UUID) -> Select:
+        return select(ContextWindow).where(ContextWindow.user_id == user_id)
+
+    @staticmethod
+    def _user_context_window_rows_query(user_id: UUID) -> Select:
+        query = EntityService._user_context_windows_query(user_id)
+        # A fixed order keeps the body, and so its ETag, stable between reads
+        return query.with_only_columns(*response_columns(ContextWindow, ContextWindowResponse)).order_by(
+            ContextWindow.created_at, ContextWindow.id
+        )
+
+    @staticmethod
+    def _entity_relation_rows_query(entity_id: UUID) -> Select:
+        query = EntityService._entity_relations_query(entity_id)
+        return query.with_only_columns(*response_columns(EntityRelation, EntityRelationResponse))
+
+    # Sync API
+
+    @staticmethod
+    def validate_blocked_by(db: Session, user_id: UUID, blocked_by: List[UUID], entity_ids: Optional[List[UUID]] = None) -> None:
+        """
+        Raise InvalidDependency unless blocked_by names only the user's own
+        entities and, blocking the existing entity_ids, closes no cycle
+        """
+        if not blocked_by:
+            return
+        owned = db.scalar(EntityService._owned_count_query(user_id, blocked_by))
+        graph = dependency_index.get(db, user_id) if entity_ids else None
+        EntityService._check_blocked_by(graph, owned, blocked_by, entity_ids)
+
+    @staticmethod
+    def create_entity(db: Session, user_id: UUID, entity_data: EntityCreate) -> Entity:
+        """Create a new entity"""
+        EntityService.validate_blocked_by(db, user_id, EntityService._new_blocked_by([entity_data]))
+        entity = EntityService._new_entity(user_id, entity_data)
         db.add(entity)
+        CollectionVersionService.bump(db, user_id, ENTITIES)
         db.commit()
         db.refresh(entity)
+        entity_cache.invalidate(user_id)
+        dependency_index.entities_saved(user_id, [entity])
+        vector_store.entities_saved(user_id, [entity])
         return entity
-    
+
     @staticmethod
     def get_user_entities(
-        db: Session, 
+        db: Session,
         user_id: UUID,
         entity_type: Optional[str] = None,
         context_tag: Optional[str] = None,
         status: Optional[str] = None
     ) -> List[Entity]:
         """Get entities with optional filters"""
-        query = db.query(Entity).filter(Entity.user_id == user_id)
-        
-        if entity_type:
-            query = query.filter(Entity.entity_type == entity_type)
-        
-        if context_tag:
-            query = query.filter(Entity.context_tags.contains([context_tag]))
-        
-        if status:
-            query = query.filter(Entity.status == status)
-        
-        return query.order_by(Entity.priority.desc(), Entity.created_at.desc()).all()
-    
+        query = EntityService._user_entities_query(user_id, entity_type, context_tag, status)
+        return db.scalars(query).all()
+
+    @staticmethod
+    def get_user_entities_page(
+        db: Session,
+        user_id: UUID,
+        entity_type: Optional[str] = None,
+        context_tag: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Entity], Optional[str]]:
+        """Get one page of entities and the cursor for the next (None on the last page)"""
+        query = EntityService._user_entities_page_query(user_id, entity_type, context_tag, status, limit, cursor)
+        return EntityService._page(db.scalars(query).all(), limit)
+
+    @staticmethod
+    def get_user_entity_rows_page(
+        db: Session,
+        user_id: UUID,
+        entity_type: Optional[str] = None,
+        context_tag: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        version: Optional[int] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        get_user_entities_page as EntityResponse-shaped dicts; served from entity_cache when possible.
+
+        Pass the ENTITIES collection version read before the call when the
+        page goes out under an ETag built from it: entries are then keyed on
+        that version, so no worker can serve a page older than the tag.
+        """
+        def load():
+            query = EntityService._user_entity_rows_page_query(user_id, entity_type, context_tag, status, limit, cursor)
+            return EntityService._row_page(result_dicts(db.execute(query)), limit)
+
+        key = ("page", version, entity_type, context_tag, status, limit, cursor)
+        return entity_cache.get(user_id, key, load)
+
+    @staticmethod
+    def get_entities_overview(db: Session, user_id: UUID, status: str = "pending", per_tag: int = 5) -> List[Dict]:
+        """Count entities per context tag with the first per_tag titles of each, computed in one query"""
+        def load():
+            return EntityService._overview(db.execute(EntityService._overview_query(user_id, status, per_tag)).all())
+
+        return entity_cache.get(user_id, ("overview", status, per_tag), load)
+
     @staticmethod
     def get_entity_by_id(db: Session, entity_id: UUID, user_id: UUID) -> Optional[Entity]:
         """Get a specific entity"""
-        return db.query(Entity).filter(
-            Entity.id == entity_id,
-            Entity.user_id == user_id
-        ).first()
-    
+        return db.scalars(EntityService._entity_by_id_query(entity_id, user_id)).first()
+
     @staticmethod
     def update_entity(db: Session, entity_id: UUID, user_id: UUID, entity_data: EntityUpdate) -> Entity:
         """Update an entity"""
         entity = EntityService.get_entity_by_id(db, entity_id, user_id)
-        
+
         if not entity:
             raise ValueError("Entity not found")
-        
-        update_data = entity_data.model_dump(exclude_unset=True)
-        
-        # Handle completion
-        if "status" in update_data and update_data["status"] == "completed" and not entity.completed_at:
-            update_data["completed_at"] = datetime.utcnow()
-        
-        for field, value in update_data.items():
-            setattr(entity, field, value)
-        
+
+        EntityService.validate_blocked_by(db, user_id, EntityService._updated_blocked_by(entity_data), [entity_id])
+        EntityService._apply_update(entity, entity_data)
+
+        CollectionVersionService.bump(db, user_id, ENTITIES)
         db.commit()
         db.refresh(entity)
+        entity_cache.invalidate(user_id)
+        dependency_index.entities_saved(user_id, [entity])
+        vector_store.entities_saved(user_id, [entity])
         return entity
-    
+
     @staticmethod
     def delete_entity(db: Session, entity_id: UUID, user_id: UUID) -> bool:
         """Delete an entity"""
         entity = EntityService.get_entity_by_id(db, entity_id, user_id)
-        
+
         if not entity:
             return False
-        
+
         db.delete(entity)
+        CollectionVersionService.bump(db, user_id, ENTITIES)
         db.commit()
+        entity_cache.invalidate(user_id)
+        dependency_index.entities_deleted(user_id, [entity_id])
+        vector_store.entities_deleted(user_id, [entity_id])
         return True
-    
+
+    @staticmethod
+    def bulk_create_entities(db: Session, user_id: UUID, entities: List[EntityCreate]) -> List[Entity]:
+        """Create many entities in one transaction"""
+        EntityService.validate_blocked_by(db, user_id, EntityService._new_blocked_by(entities))
+        rows = [EntityService._entity_values(user_id, e) for e in entities]
+        created = db.scalars(EntityService._bulk_create_statement(), rows).all()
+        CollectionVersionService.bump(db, user_id, ENTITIES)
+        db.commit()
+        entity_cache.invalidate(user_id)
+        dependency_index.entities_saved(user_id, created)
+        vector_store.entities_saved(user_id, created)
+        return created
+
     @staticmethod
-    def create_relation(db: Session, parent_id: UUID, child_id: UUID, relation_type: str) -> EntityRelation:
-        """Create a relationship between entities"""
+    def bulk_update_entities(db: Session, user_id: UUID, entity_ids: List[UUID], entity_data: EntityUpdate) -> List[Entity]:
+        """Apply the same update to many entities with one UPDATE"""
+        EntityService.validate_blocked_by(db, user_id, EntityService._updated_blocked_by(entity_data), entity_ids)
+        updated = db.scalars(EntityService._bulk_update_statement(user_id, entity_ids, entity_data)).all()
+        if updated:
+            CollectionVersionService.bump(db, user_id, ENTITIES)
+        db.commit()
+        entity_cache.invalidate(user_id)
+        dependency_index.entities_saved(user_id, updated)
+        vector_store.entities_saved(user_id, updated)
+        return updated
+
+    @staticmethod
+    def bulk_delete_entities(
+        db: Session,
+        user_id: UUID,
+        entity_ids: Optional[List[UUID]] = None,
+        entity_type: Optional[str] = None,
+        context_tag: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> int:
+        """Delete all entities matching the filters with one DELETE; returns the count"""
+        query = EntityService._bulk_delete_statement(user_id, entity_ids, entity_type, context_tag, status)
+        deleted = db.scalars(query).all()
+        if deleted:
+            CollectionVersionService.bump(db, user_id, ENTITIES)
+        db.commit()
+        entity_cache.invalidate(user_id)
+        dependency_index.entities_deleted(user_id, deleted)
+        vector_store.entities_deleted(user_id, deleted)
+        return len(deleted)
+
+    @staticmethod
+    def create_relation(db: Session, user_id: UUID, parent_id: UUID, child_id: UUID, relation_type: str) -> EntityRelation:
+        """Create a relationship between entities; dependency relations may not form a cycle"""
+        EntityService._check_relation(dependency_index.get(db, user_id), parent_id, child_id, relation_type)
+
         relation = EntityRelation(
             parent_id=parent_id,
             child_id=child_id,
@@ -105,34 +590,315 @@ class EntityService:
         db.add(relation)
         db.commit()
         db.refresh(relation)
+        dependency_index.relation_added(user_id, relation)
         return relation
-    
+
     @staticmethod
     def get_entity_relations(db: Session, entity_id: UUID) -> List[EntityRelation]:
         """Get all relationships for an entity"""
-        return db.query(EntityRelation).filter(
-            (EntityRelation.parent_id == entity_id) | (EntityRelation.child_id == entity_id)
+        return db.scalars(EntityService._entity_relations_query(entity_id)).all()
+
+    @staticmethod
+    def get_entity_relation_rows(db: Session, entity_id: UUID) -> List[dict]:
+        """get_entity_relations as EntityRelationResponse-shaped dicts"""
+        return result_dicts(db.execute(EntityService._entity_relation_rows_query(entity_id)))
+
+    @staticmethod
+    def get_ready_entities(db: Session, user_id: UUID, limit: int = 50) -> List[Entity]:
+        """Get pending entities whose prerequisites are all completed or cancelled"""
+        graph = dependency_index.get(db, user_id)
+        with graph.lock:
+            ready = list(graph.ready)
+        if not ready:
+            return []
+        return db.scalars(EntityService._ready_entities_query(user_id, ready, limit)).all()
+
+    @staticmethod
+    def get_entity_subgraph(
+        db: Session,
+        entity_id: UUID,
+        user_id: UUID,
+        depth: int = 3,
+        relation_types: Optional[List[str]] = None,
+        direction: str = "descendants"
+    ) -> Optional[dict]:
+        """
+        Get the entity's relation subgraph as {"root_id", "nodes", "edges"}.
+        Returns None if the entity doesn't belong to the user.
+        """
+        edge_rows = db.execute(
+            EntityService._subgraph_statement(entity_id, user_id, depth, relation_types, direction)
         ).all()
-    
+        node_ids = {entity_id} | {r.parent_id for r in edge_rows} | {r.child_id for r in edge_rows}
+        nodes = db.scalars(select(Entity).where(Entity.id.in_(node_ids), Entity.user_id == user_id)).all()
+        return EntityService._subgraph_result(entity_id, edge_rows, nodes)
+
     @staticmethod
     def create_context_window(db: Session, user_id: UUID, window_data: ContextWindowCreate) -> ContextWindow:
         """Create a context window"""
-        window = ContextWindow(
-            user_id=user_id,
-            window_type=window_data.window_type,
-            start_time=window_data.start_time,
-            end_time=window_data.end_time,
-            days_of_week=window_data.days_of_week,
-            energy_level=window_data.energy_level,
-            preferred_activities=window_data.preferred_activities,
-            extra_data=window_data.extra_data
-        )
+        window = EntityService._new_context_window(user_id, window_data)
         db.add(window)
+        CollectionVersionService.bump(db, user_id, CONTEXT_WINDOWS)
         db.commit()
         db.refresh(window)
         return window
-    
+
     @staticmethod
     def get_user_context_windows(db: Session, user_id: UUID) -> List[ContextWindow]:
         """Get all context windows for user"""
-        return db.query(ContextWindow).filter(ContextWindow.user_id == user_id).all()
\ No newline at end of file
+        return db.scalars(EntityService._user_context_windows_query(user_id)).all()
+
+    @staticmethod
+    def get_user_context_window_rows(db: Session, user_id: UUID) -> List[dict]:
+        """get_user_context_windows as ContextWindowResponse-shaped dicts"""
+        return result_dicts(db.execute(EntityService._user_context_window_rows_query(user_id)))
+
+    # Async API
+
+    @staticmethod
+    async def avalidate_blocked_by(db: AsyncSession, user_id: UUID, blocked_by: List[UUID], entity_ids: Optional[List[UUID]] = None) -> None:
+        """
+        Raise InvalidDependency unless blocked_by names only the user's own
+        entities and, blocking the existing entity_ids, closes no cycle
+        """
+        if not blocked_by:
+            return
+        owned = await db.scalar(EntityService._owned_count_query(user_id, blocked_by))
+        graph = await dependency_index.aget(db, user_id) if entity_ids else None
+        EntityService._check_blocked_by(graph, owned, blocked_by, entity_ids)
+
+    @staticmethod
+    async def acreate_entity(db: AsyncSession, user_id: UUID, entity_data: EntityCreate) -> Entity:
+        """Create a new entity"""
+        await EntityService.avalidate_blocked_by(db, user_id, EntityService._new_blocked_by([entity_data]))
+        entity = EntityService._new_entity(user_id, entity_data)
+        db.add(entity)
+        await CollectionVersionService.abump(db, user_id, ENTITIES)
+        await db.commit()
+        await db.refresh(entity)
+        await entity_cache.ainvalidate(user_id)
+        dependency_index.entities_saved(user_id, [entity])
+        vector_store.entities_saved(user_id, [entity])
+        return entity
+
+    @staticmethod
+    async def aget_user_entities(
+        db: AsyncSession,
+        user_id: UUID,
+        entity_type: Optional[str] = None,
+        context_tag: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> List[Entity]:
+        """Get entities with optional filters"""
+        query = EntityService._user_entities_query(user_id, entity_type, context_tag, status)
+        return (await db.scalars(query)).all()
+
+    @staticmethod
+    async def aget_user_entities_page(
+        db: AsyncSession,
+        user_id: UUID,
+        entity_type: Optional[str] = None,
+        context_tag: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Entity], Optional[str]]:
+        """Get one page of entities and the cursor for the next (None on the last page)"""
+        query = EntityService._user_entities_page_query(user_id, entity_type, context_tag, status, limit, cursor)
+        return EntityService._page((await db.scalars(query)).all(), limit)
+
+    @staticmethod
+    async def aget_user_entity_rows_page(
+        db: AsyncSession,
+        user_id: UUID,
+        entity_type: Optional[str] = None,
+        context_tag: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        version: Optional[int] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        aget_user_entities_page as EntityResponse-shaped dicts; served from entity_cache when possible.
+
+        Pass the ENTITIES collection version read before the call when the
+        page goes out under an ETag built from it: entries are then keyed on
+        that version, so no worker can serve a page older than the tag.
+        """
+        async def load():
+            query = EntityService._user_entity_rows_page_query(user_id, entity_type, context_tag, status, limit, cursor)
+            return EntityService._row_page(result_dicts(await db.execute(query)), limit)
+
+        key = ("page", version, entity_type, context_tag, status, limit, cursor)
+        return await entity_cache.aget(user_id, key, load)
+
+    @staticmethod
+    async def aget_entities_overview(db: AsyncSession, user_id: UUID, status: str = "pending", per_tag: int = 5) -> List[Dict]:
+        """Count entities per context tag with the first per_tag titles of each, computed in one query"""
+        async def load():
+            rows = (await db.execute(EntityService._overview_query(user_id, status, per_tag))).all()
+            return EntityService._overview(rows)
+
+        return await entity_cache.aget(user_id, ("overview", status, per_tag), load)
+
+    @staticmethod
+    async def aget_entity_by_id(db: AsyncSession, entity_id: UUID, user_id: UUID) -> Optional[Entity]:
+        """Get a specific entity"""
+        return (await db.scalars(EntityService._entity_by_id_query(entity_id, user_id))).first()
+
+    @staticmethod
+    async def aupdate_entity(db: AsyncSession, entity_id: UUID, user_id: UUID, entity_data: EntityUpdate) -> Entity:
+        """Update an entity"""
+        entity = await EntityService.aget_entity_by_id(db, entity_id, user_id)
+
+        if not entity:
+            raise ValueError("Entity not found")
+
+        await EntityService.avalidate_blocked_by(db, user_id, EntityService._updated_blocked_by(entity_data), [entity_id])
+        EntityService._apply_update(entity, entity_data)
+
+        await CollectionVersionService.abump(db, user_id, ENTITIES)
+        await db.commit()
+        await db.refresh(entity)
+        await entity_cache.ainvalidate(user_id)
+        dependency_index.entities_saved(user_id, [entity])
+        vector_store.entities_saved(user_id, [entity])
+        return entity
+
+    @staticmethod
+    async def adelete_entity(db: AsyncSession, entity_id: UUID, user_id: UUID) -> bool:
+        """Delete an entity"""
+        entity = await EntityService.aget_entity_by_id(db, entity_id, user_id)
+
+        if not entity:
+            return False
+
+        await db.delete(entity)
+        await CollectionVersionService.abump(db, user_id, ENTITIES)
+        await db.commit()
+        await entity_cache.ainvalidate(user_id)
+        dependency_index.entities_deleted(user_id, [entity_id])
+        vector_store.entities_deleted(user_id, [entity_id])
+        return True
+
+    @staticmethod
+    async def abulk_create_entities(db: AsyncSession, user_id: UUID, entities: List[EntityCreate]) -> List[Entity]:
+        """Create many entities in one transaction"""
+        await EntityService.avalidate_blocked_by(db, user_id, EntityService._new_blocked_by(entities))
+        rows = [EntityService._entity_values(user_id, e) for e in entities]
+        created = (await db.scalars(EntityService._bulk_create_statement(), rows)).all()
+        await CollectionVersionService.abump(db, user_id, ENTITIES)
+        await db.commit()
+        await entity_cache.ainvalidate(user_id)
+        dependency_index.entities_saved(user_id, created)
+        vector_store.entities_saved(user_id, created)
+        return created
+
+    @staticmethod
+    async def abulk_update_entities(db: AsyncSession, user_id: UUID, entity_ids: List[UUID], entity_data: EntityUpdate) -> List[Entity]:
+        """Apply the same update to many entities with one UPDATE"""
+        await EntityService.avalidate_blocked_by(db, user_id, EntityService._updated_blocked_by(entity_data), entity_ids)
+        updated = (await db.scalars(EntityService._bulk_update_statement(user_id, entity_ids, entity_data))).all()
+        if updated:
+            await CollectionVersionService.abump(db, user_id, ENTITIES)
+        await db.commit()
+        await entity_cache.ainvalidate(user_id)
+        dependency_index.entities_saved(user_id, updated)
+        vector_store.entities_saved(user_id, updated)
+        return updated
+
+    @staticmethod
+    async def abulk_delete_entities(
+        db: AsyncSession,
+        user_id: UUID,
+        entity_ids: Optional[List[UUID]] = None,
+        entity_type: Optional[str] = None,
+        context_tag: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> int:
+        """Delete all entities matching the filters with one DELETE; returns the count"""
+        query = EntityService._bulk_delete_statement(user_id, entity_ids, entity_type, context_tag, status)
+        deleted = (await db.scalars(query)).all()
+        if deleted:
+            await CollectionVersionService.abump(db, user_id, ENTITIES)
+        await db.commit()
+        await entity_cache.ainvalidate(user_id)
+        dependency_index.entities_deleted(user_id, deleted)
+        vector_store.entities_deleted(user_id, deleted)
+        return len(deleted)
+
+    @staticmethod
+    async def acreate_relation(db: AsyncSession, user_id: UUID, parent_id: UUID, child_id: UUID, relation_type: str) -> EntityRelation:
+        """Create a relationship between entities; dependency relations may not form a cycle"""
+        EntityService._check_relation(await dependency_index.aget(db, user_id), parent_id, child_id, relation_type)
+
+        relation = EntityRelation(
+            parent_id=parent_id,
+            child_id=child_id,
+            relation_type=relation_type
+        )
+        db.add(relation)
+        await db.commit()
+        await db.refresh(relation)
+        dependency_index.relation_added(user_id, relation)
+        return relation
+
+    @staticmethod
+    async def aget_entity_relations(db: AsyncSession, entity_id: UUID) -> List[EntityRelation]:
+        """Get all relationships for an entity"""
+        return (await db.scalars(EntityService._entity_relations_query(entity_id))).all()
+
+    @staticmethod
+    async def aget_entity_relation_rows(db: AsyncSession, entity_id: UUID) -> List[dict]:
+        """aget_entity_relations as EntityRelationResponse-shaped dicts"""
+        return result_dicts(await db.execute(EntityService._entity_relation_rows_query(entity_id)))
+
+    @staticmethod
+    async def aget_ready_entities(db: AsyncSession, user_id: UUID, limit: int = 50) -> List[Entity]:
+        """Get pending entities whose prerequisites are all completed or cancelled"""
+        graph = await dependency_index.aget(db, user_id)
+        with graph.lock:
+            ready = list(graph.ready)
+        if not ready:
+            return []
+        return (await db.scalars(EntityService._ready_entities_query(user_id, ready, limit))).all()
+
+    @staticmethod
+    async def aget_entity_subgraph(
+        db: AsyncSession,
+        entity_id: UUID,
+        user_id: UUID,
+        depth: int = 3,
+        relation_types: Optional[List[str]] = None,
+        direction: str = "descendants"
+    ) -> Optional[dict]:
+        """
+        Get the entity's relation subgraph as {"root_id", "nodes", "edges"}.
+        Returns None if the entity doesn't belong to the user.
+        """
+        edge_rows = (await db.execute(
+            EntityService._subgraph_statement(entity_id, user_id, depth, relation_types, direction)
+        )).all()
+        node_ids = {entity_id} | {r.parent_id for r in edge_rows} | {r.child_id for r in edge_rows}
+        nodes = (await db.scalars(select(Entity).where(Entity.id.in_(node_ids), Entity.user_id == user_id))).all()
+        return EntityService._subgraph_result(entity_id, edge_rows, nodes)
+
+    @staticmethod
+    async def acreate_context_window(db: AsyncSession, user_id: UUID, window_data: ContextWindowCreate) -> ContextWindow:
+        """Create a context window"""
+        window = EntityService._new_context_window(user_id, window_data)
+        db.add(window)
+        await CollectionVersionService.abump(db, user_id, CONTEXT_WINDOWS)
+        await db.commit()
+        await db.refresh(window)
+        return window
+
+    @staticmethod
+    async def aget_user_context_windows(db: AsyncSession, user_id: UUID) -> List[ContextWindow]:
+        """Get all context windows for user"""
+        return (await db.scalars(EntityService._user_context_windows_query(user_id))).all()
+
+    @staticmethod
+    async def aget_user_context_window_rows(db: AsyncSession, user_id: UUID) -> List[dict]:
+        """aget_user_context_windows as ContextWindowResponse-shaped dicts"""
+        return result_dicts(await db.execute(EntityService._user_context_window_rows_query(user_id)))
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+from uuid import UUID
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Message
+from app.services.collection_version import CollectionVersionService, MESSAGES
+from app.services.vector_index import vector_store
+
+logger = logging.getLogger(__name__)
+
+# 'sync': own INSERT + COMMIT in the caller's session
+# 'group': queued and written with other messages in one transaction; the caller waits for the commit
+# 'async': queued; the caller returns at once (lost if the process dies before the flush)
+DURABILITY_MODES = ("sync", "group", "async")
+
+_COLUMNS = ("id", "user_id", "role", "content", "extra_data", "created_at")
+
+
+@dataclass
+class _Pending:
+    message: Message
+    done: asyncio.Future = field(repr=False)
+
+
+class MessageWriter:
+    """
+    Per-worker write-behind pipeline for chat messages.
+
+    Queued messages are written by one background task in multi-row
+    INSERTs, one transaction (and one WAL flush) per batch. A batch is
+    written once batch_size messages are waiting or flush_interval has
+    passed since its first message. ids and created_at are assigned at
+    enqueue time, so ordering and keyset cursors don't depend on when the
+    batch lands, and a retried batch is idempotent.
+
+    Readers of a user's history call wait_user() first so they see that
+    user's queued messages (read-your-writes within the worker).
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, queue_size: int, retries: int = 2):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.retries = retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[UUID, Set[asyncio.Future]] = defaultdict(set)
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the flusher on the running event loop (app startup)"""
+        if not self.running:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._task = asyncio.create_task(self._run(), name="message-writer")
+
+    async def aclose(self) -> None:
+        """Stop accepting work and write everything still queued (app shutdown)"""
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info("message writer drained: %d messages in %d batches", self.written, self.batches)
+
+    @staticmethod
+    def _new_message(user_id: UUID, role: str, content: str, extra_data: Optional[dict]) -> Message:
+        return Message(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            role=role,
+            content=content,
+            extra_data=extra_data or {},
+            created_at=datetime.now(timezone.utc),
+        )
+
+    async def write(
+        self,
+        db: AsyncSession,
+        user_id: UUID,
+        role: str,
+        content: str,
+        extra_data: Optional[dict] = None,
+        durability: str = "group"
+    ) -> Message:
+        """
+        Persist a message with the given durability (see DURABILITY_MODES).
+
+        'sync' commits db. Queued modes fall back to an immediate batch of
+        one when the flusher isn't running (scripts, shutdown).
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}")
+
+        message = self._new_message(user_id, role, content, extra_data)
+        if durability == "sync":
+            db.add(message)
+            await CollectionVersionService.abump(db, user_id, MESSAGES)
+            await db.commit()
+            vector_store.messages_added(user_id, [message])
+            return message
+
+        item = _Pending(message, asyncio.get_running_loop().create_future())
+        # Nobody awaits 'async' writes; keep a failure from being reported as unretrieved
+        item.done.add_done_callback(lambda f: f.cancelled() or f.exception())
+        if not self.running:
+            await self._write([item])
+            if durability == "group":
+                item.done.result()
+            return message
+
+        pending = self._pending[user_id]
+        pending.add(item.done)
+        item.done.add_done_callback(lambda f: self._forget(user_id, f))
+        await self._queue.put(item)
+        if durability == "group":
+            await asyncio.shield(item.done)
+        return message
+
+    def _forget(self, user_id: UUID, future: asyncio.Future) -> None:
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            pending.discard(future)
+            if not pending:
+                del self._pending[user_id]
+
+    async def wait_user(self, user_id: UUID) -> None:
+        """Wait until every message queued for the user so far is written (or failed)"""
+        pending = list(self._pending.get(user_id, ()))
+        if pending:
+            await asyncio.gather(*(asyncio.shield(f) for f in pending), return_exceptions=True)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                # Take what is already queued; wait for more only until the deadline
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+        # Drain: anything queued around the close marker still gets written
+        while not self._queue.empty():
+            batch = []
+            while not self._queue.empty() and len(batch) < self.batch_size:
+                item = self._queue.get_nowait()
+                if item is not None:
+                    batch.append(item)
+            if batch:
+                await self._write(batch)
+
+    async def _write(self, batch: List[_Pending]) -> None:
+        rows = [{c: getattr(item.message, c) for c in _COLUMNS} for item in batch]
+        user_ids = list({item.message.user_id for item in batch})
+        # Client-side ids make a retry after an ambiguous commit failure a no-op
+        stmt = insert(Message).values(rows).on_conflict_do_nothing(index_elements=[Message.id])
+
+        for attempt in range(self.retries + 1):
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(stmt)
+                    await CollectionVersionService.abump_many(db, user_ids, MESSAGES)
+                    await db.commit()
+                break
+            except Exception as e:
+                if attempt < self.retries:
+                    logger.warning("message batch of %d failed (attempt %d), retrying: %s", len(batch), attempt + 1, e)
+                    continue
+                self.failed += len(batch)
+                logger.exception("message batch of %d could not be written", len(batch))
+                for item in batch:
+                    if not item.done.done():
+                        item.done.set_exception(e)
+                return
+
+        self.batches += 1
+        self.written += len(batch)
+        by_user = defaultdict(list)
+        for item in batch:
+            by_user[item.message.user_id].append(item.message)
+        for user_id, messages in by_user.items():
+            vector_store.messages_added(user_id, messages)
+        for item in batch:
+            if not item.done.done():
+                item.done.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "written": self.written,
+            "failed": self.failed,
+            "avg_batch": self.written / self.batches if self.batches else 0.0,
+        }
+
+
+message_writer = MessageWriter(
+    batch_size=settings.message_batch_size,
+    flush_interval=settings.message_flush_interval,
+    queue_size=settings.message_queue_size,
+)
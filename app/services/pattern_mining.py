@@ -0,0 +1,311 @@
+import math
+from datetime import datetime
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import numpy as np
+from sqlalchemy import select, delete, func, case, literal, String, Select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models import Entity, PatternEvent, UserPattern
+
+PATTERN_TYPES = ("completion_time", "work_estimation", "context_batching", "procrastination_trigger")
+
+# Bounds on per-user state kept in pattern_data
+MAX_TAGS = 64
+MAX_PAIRS = 200
+
+# Scheduled -> completed spans longer than this aren't treated as work time
+MAX_ACTUAL_SECONDS = 12 * 3600
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+def _tz(name: Optional[str]):
+    try:
+        return ZoneInfo(name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo("UTC")
+
+
+def _confidence(samples: float, half: float) -> float:
+    """0 with no data, 0.5 at `half` samples, approaching 1"""
+    return round(samples / (samples + half), 3)
+
+
+class PatternAccumulator:
+    """
+    One user's pattern statistics. add() folds in a page of completed
+    entity rows with array operations; patterns() renders pattern_data
+    and confidence for every pattern type.
+
+    The statistics are mergeable (histograms, sums, co-occurrence counts)
+    and are stored in pattern_data["stats"] next to the readable insight,
+    so a later run resumes from them instead of rescanning history. Rows
+    with sign -1 subtract exactly what the same row added. Tags are kept
+    in name order, so the result doesn't depend on the order rows arrive.
+    """
+
+    def __init__(self, tz_name: Optional[str] = None, stored: Optional[Dict[str, dict]] = None):
+        self.tz = _tz(tz_name)
+        stored = stored or {}
+
+        completion = stored.get("completion_time", {})
+        self.hours = np.array(completion.get("hours", [0] * 24), dtype=np.int64)
+        self.weekdays = np.array(completion.get("weekdays", [0] * 7), dtype=np.int64)
+
+        estimation = stored.get("work_estimation", {})
+        self.estimates = estimation.get("n", 0)
+        self.log_ratio_sum = estimation.get("log_sum", 0.0)
+        self.log_ratio_sq = estimation.get("log_sq", 0.0)
+        self.underestimates = estimation.get("under", 0)
+
+        batching = stored.get("context_batching", {})
+        self.tags: List[str] = list(batching.get("tags", []))
+        self.tag_index = {tag: i for i, tag in enumerate(self.tags)}
+        self.tag_counts = np.array(batching.get("counts", [0] * len(self.tags)), dtype=np.int64)
+        self.pairs = np.zeros((len(self.tags), len(self.tags)), dtype=np.int64)
+        for i, j, count in batching.get("pairs", []):
+            self.pairs[i, j] = count
+
+        procrastination = stored.get("procrastination_trigger", {})
+        self.with_due = procrastination.get("due", 0)
+        self.late = procrastination.get("late", 0)
+        self.late_seconds = procrastination.get("late_seconds", 0.0)
+        self.tag_due = np.array(procrastination.get("tag_due", [0] * len(self.tags)), dtype=np.int64)
+        self.tag_late = np.array(procrastination.get("tag_late", [0] * len(self.tags)), dtype=np.int64)
+
+    def _reorder_tags(self, order) -> None:
+        self.tags = [self.tags[i] for i in order]
+        self.tag_index = {tag: i for i, tag in enumerate(self.tags)}
+        self.tag_counts = self.tag_counts[order]
+        self.tag_due = self.tag_due[order]
+        self.tag_late = self.tag_late[order]
+        self.pairs = self.pairs[np.ix_(order, order)]
+
+    def _grow_tags(self, tags: Iterable[str]) -> None:
+        new = [t for t in dict.fromkeys(tags) if t not in self.tag_index]
+        if not new:
+            return
+        self.tags.extend(new)
+        pad = len(new)
+        self.tag_counts = np.pad(self.tag_counts, (0, pad))
+        self.tag_due = np.pad(self.tag_due, (0, pad))
+        self.tag_late = np.pad(self.tag_late, (0, pad))
+        self.pairs = np.pad(self.pairs, ((0, pad), (0, pad)))
+        self._reorder_tags(np.argsort(self.tags, kind="stable"))
+
+    def _prune_tags(self) -> None:
+        # Drop tags with no completions left, and keep the most frequent ones so state stays bounded
+        keep = np.flatnonzero(self.tag_counts != 0)
+        if len(keep) > MAX_TAGS:
+            keep = np.sort(keep[np.argsort(-self.tag_counts[keep], kind="stable")[:MAX_TAGS]])
+        if len(keep) < len(self.tags):
+            self._reorder_tags(keep)
+
+    def add(self, rows: Sequence) -> None:
+        """
+        Fold in completed entities. Rows need completed_at, scheduled_at,
+        due_at, estimated_duration, actual_minutes, context_tags and sign
+        (1 to add the completion, -1 to retract it).
+        """
+        if not rows:
+            return
+
+        sign = np.array([r.sign for r in rows], dtype=np.int64)
+        completed = np.array([r.completed_at.timestamp() for r in rows])
+        # UTC offsets only change on hour boundaries: look up each distinct hour once
+        utc_hours, inverse = np.unique(completed // 3600, return_inverse=True)
+        offsets = np.array([
+            datetime.fromtimestamp(h * 3600, self.tz).utcoffset().total_seconds() for h in utc_hours
+        ])
+        local = completed + offsets[inverse]
+        self.hours += np.bincount(((local // 3600) % 24).astype(np.int64), weights=sign, minlength=24).astype(np.int64)
+        # 1970-01-01 was a Thursday
+        self.weekdays += np.bincount((((local // 86400) + 3) % 7).astype(np.int64), weights=sign, minlength=7).astype(np.int64)
+
+        # Estimated vs actual: extra_data["actual_minutes"], else scheduled -> completed
+        estimated = np.array([
+            r.estimated_duration.total_seconds() if r.estimated_duration else np.nan for r in rows
+        ])
+        actual = np.array([
+            r.actual_minutes * 60 if r.actual_minutes is not None
+            else (r.completed_at - r.scheduled_at).total_seconds() if r.scheduled_at else np.nan
+            for r in rows
+        ])
+        valid = (estimated > 0) & (actual > 0) & (actual <= MAX_ACTUAL_SECONDS)
+        if valid.any():
+            log_ratio = np.log(actual[valid] / estimated[valid])
+            valid_sign = sign[valid]
+            self.estimates += int(valid_sign.sum())
+            self.log_ratio_sum += float((valid_sign * log_ratio).sum())
+            self.log_ratio_sq += float((valid_sign * log_ratio ** 2).sum())
+            self.underestimates += int(valid_sign[log_ratio > math.log(1.1)].sum())
+
+        due = np.array([r.due_at.timestamp() if r.due_at else np.nan for r in rows])
+        has_due = ~np.isnan(due)
+        late = has_due & (completed > np.nan_to_num(due, nan=np.inf))
+        self.with_due += int(sign[has_due].sum())
+        self.late += int(sign[late].sum())
+        self.late_seconds += float((sign * (completed - due))[late].sum())
+
+        # Tag multi-hot: counts, co-occurrence and lateness per tag
+        self._grow_tags(tag for r in rows for tag in r.context_tags or ())
+        if self.tags:
+            hot = np.zeros((len(rows), len(self.tags)), dtype=np.int64)
+            for i, r in enumerate(rows):
+                hot[i, [self.tag_index[t] for t in set(r.context_tags or ())]] = 1
+            signed = hot * sign[:, None]
+            self.tag_counts += signed.sum(axis=0)
+            self.pairs += hot.T @ signed
+            self.tag_due += signed[has_due].sum(axis=0)
+            self.tag_late += signed[late].sum(axis=0)
+            self._prune_tags()
+
+    def patterns(self) -> Dict[str, Tuple[dict, float]]:
+        """pattern_type -> (pattern_data, confidence_score)"""
+        completed = int(self.hours.sum())
+        top_hours = [int(h) for h in np.argsort(-self.hours, kind="stable")[:3] if self.hours[h]]
+        top_days = [WEEKDAYS[d] for d in np.argsort(-self.weekdays, kind="stable")[:2] if self.weekdays[d]]
+        completion_time = {
+            "completed": completed,
+            "peak_hours": top_hours,
+            "peak_weekdays": top_days,
+            "stats": {"hours": self.hours.tolist(), "weekdays": self.weekdays.tolist()},
+        }
+
+        n = self.estimates
+        mean = self.log_ratio_sum / n if n else 0.0
+        std = math.sqrt(max(self.log_ratio_sq / n - mean ** 2, 0.0)) if n else 0.0
+        work_estimation = {
+            "samples": n,
+            # Actual time as a multiple of the estimate (geometric mean)
+            "estimate_ratio": round(math.exp(mean), 3) if n else None,
+            "underestimated_share": round(self.underestimates / n, 3) if n else None,
+            "stats": {"n": n, "log_sum": self.log_ratio_sum, "log_sq": self.log_ratio_sq, "under": self.underestimates},
+        }
+
+        upper = np.triu(self.pairs, k=1)
+        flat = np.argsort(-upper, axis=None, kind="stable")[:MAX_PAIRS]
+        pairs = [(int(i), int(j), int(upper[i, j])) for i, j in zip(*np.unravel_index(flat, upper.shape)) if upper[i, j] > 0]
+        context_batching = {
+            "top_tags": [self.tags[i] for i in np.argsort(-self.tag_counts, kind="stable")[:5] if self.tag_counts[i] > 0],
+            "top_pairs": [{"tags": [self.tags[i], self.tags[j]], "count": c} for i, j, c in pairs[:10]],
+            "stats": {"tags": self.tags, "counts": self.tag_counts.tolist(), "pairs": pairs},
+        }
+
+        late_share = np.divide(self.tag_late, self.tag_due, out=np.zeros(len(self.tags)), where=self.tag_due >= 3)
+        procrastination_trigger = {
+            "with_due_date": self.with_due,
+            "late_share": round(self.late / self.with_due, 3) if self.with_due else None,
+            "avg_hours_late": round(self.late_seconds / self.late / 3600, 2) if self.late else None,
+            "late_tags": [
+                {"tag": self.tags[i], "late_share": round(float(late_share[i]), 3), "samples": int(self.tag_due[i])}
+                for i in np.argsort(-late_share, kind="stable")[:5] if late_share[i] > 0
+            ],
+            "stats": {
+                "due": self.with_due, "late": self.late, "late_seconds": self.late_seconds,
+                "tag_due": self.tag_due.tolist(), "tag_late": self.tag_late.tolist(),
+            },
+        }
+
+        return {
+            "completion_time": (completion_time, _confidence(completed, 20)),
+            "work_estimation": (work_estimation, round(_confidence(n, 10) / (1 + std), 3)),
+            "context_batching": (context_batching, _confidence(int(upper.sum()), 20)),
+            "procrastination_trigger": (procrastination_trigger, _confidence(self.with_due, 10)),
+        }
+
+
+def _actual_minutes():
+    # Same as the entities_pattern_events trigger: a non-numeric value counts as missing
+    actual = Entity.extra_data["actual_minutes"]
+    return case((func.jsonb_typeof(actual) == "number", actual.as_float()))
+
+
+def _completed_entities_query(user_ids: List[UUID]) -> Select:
+    """Every counted completion of these users, ordered per user"""
+    return (
+        # user ids as text: parsing a UUID per row dominates fetch time
+        select(
+            Entity.user_id.cast(String).label("user_id"), literal(1).label("sign"), Entity.completed_at, Entity.scheduled_at,
+            Entity.due_at, Entity.estimated_duration, Entity.context_tags, _actual_minutes().label("actual_minutes"),
+        )
+        .where(Entity.user_id.in_(user_ids), Entity.completed_at.isnot(None), Entity.status == "completed")
+        .order_by(Entity.user_id, Entity.completed_at, Entity.id)
+    )
+
+
+def _pattern_events_query(user_ids: List[UUID]) -> Select:
+    """Queued completion changes of these users, ordered per user"""
+    return (
+        select(
+            PatternEvent.user_id.cast(String).label("user_id"), PatternEvent.sign, PatternEvent.completed_at, PatternEvent.scheduled_at,
+            PatternEvent.due_at, PatternEvent.estimated_duration, PatternEvent.context_tags, PatternEvent.actual_minutes,
+        )
+        .where(PatternEvent.user_id.in_(user_ids))
+        .order_by(PatternEvent.user_id, PatternEvent.id)
+    )
+
+
+def mine_users(db: Session, users: Sequence[Tuple[UUID, Optional[str]]], page_size: int = 5000, full: bool = False) -> int:
+    """
+    Update patterns for (user_id, timezone) pairs from their queued pattern_events:
+    completions are added to the stored statistics, and edits, un-completions and
+    deletions of completed entities subtract what they had added. full=True
+    rebuilds from every completed entity instead. Rows are streamed in pages, so
+    memory is bounded by the page size plus per-user statistics. Returns the
+    number of users whose patterns changed.
+    """
+    timezones = {str(user_id): tz for user_id, tz in users}
+    user_ids = [UUID(user_key) for user_key in timezones]
+    # One snapshot for reading and consuming the queue: events committed meanwhile
+    # are invisible to the DELETE below and stay queued for the next run
+    connection = db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    stored: Dict[str, Dict[str, dict]] = {}
+    for pattern in db.scalars(select(UserPattern).where(UserPattern.user_id.in_(user_ids))):
+        stored.setdefault(str(pattern.user_id), {})[pattern.pattern_type] = pattern.pattern_data.get("stats", {})
+
+    accumulators: Dict[str, PatternAccumulator] = {}
+    if full:
+        # Stored patterns are rebuilt even if no completions are left
+        accumulators = {user_key: PatternAccumulator(timezones[user_key]) for user_key in stored}
+        stored = {}
+
+    # Core execution: plain column rows, no ORM loading overhead
+    query = _completed_entities_query(user_ids) if full else _pattern_events_query(user_ids)
+    result = connection.execute(query.execution_options(stream_results=True))
+    for page in result.partitions(page_size):
+        for user_key, rows in groupby(page, key=lambda r: r.user_id):
+            if user_key not in accumulators:
+                accumulators[user_key] = PatternAccumulator(timezones[user_key], stored.get(user_key))
+            accumulators[user_key].add(list(rows))
+    # Consume the events read; a rebuild has counted everything queued in its snapshot
+    db.execute(delete(PatternEvent).where(PatternEvent.user_id.in_(user_ids)))
+
+    upserts = []
+    for user_key, accumulator in accumulators.items():
+        for pattern_type, (pattern_data, confidence) in accumulator.patterns().items():
+            upserts.append({
+                "user_id": UUID(user_key),
+                "pattern_type": pattern_type,
+                "pattern_data": pattern_data,
+                "confidence_score": confidence,
+            })
+
+    if upserts:
+        statement = insert(UserPattern)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[UserPattern.user_id, UserPattern.pattern_type],
+                set_={
+                    "pattern_data": statement.excluded.pattern_data,
+                    "confidence_score": statement.excluded.confidence_score,
+                    "last_updated": func.now(),
+                }
+            ),
+            upserts
+        )
+    db.commit()
+    return len(accumulators)
@@ -0,0 +1,308 @@
+import asyncio
+import bisect
+from datetime import datetime, timedelta, tzinfo
+from typing import List, Optional, Sequence, Tuple
+from uuid import UUID
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import numpy as np
+from sqlalchemy import select, Select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Entity, ContextWindow
+from app.services.dependency_graph import dependency_index, DONE_STATUSES
+
+# Score weights: matching tags dominate, then energy fit, then sooner slots
+TAG_WEIGHT = 1.0
+ENERGY_WEIGHT = 0.5
+EARLINESS_WEIGHT = 0.25
+
+# Tags that want a high-energy window (and should avoid low-energy ones)
+FOCUS_TAGS = {"focus_required", "deep"}
+ENERGY_LEVELS = {"high": 1.0, "medium": 0.0, "low": -1.0}
+
+# Events without an estimated_duration block this much time
+DEFAULT_EVENT_DURATION = timedelta(hours=1)
+
+
+def _merge(intervals: List[Tuple[float, float]]) -> Tuple[List[float], List[float]]:
+    """Sort and merge overlapping intervals; returns parallel start and end lists"""
+    starts, ends = [], []
+    for start, end in sorted(intervals):
+        if starts and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+def window_slots(
+    windows: Sequence,
+    busy: Sequence[Tuple[datetime, datetime]],
+    start: datetime,
+    end: datetime,
+    tz: tzinfo
+) -> List[Tuple[float, float, int]]:
+    """
+    Free time inside context-window occurrences between start and end,
+    as disjoint (start, end, window index) intervals in epoch seconds.
+
+    Occurrences are laid out day by day in the user's timezone; a window
+    ending at or before its start time runs past midnight. Time claimed by
+    an earlier-starting overlapping window, or by busy intervals (fixed
+    events), is cut out.
+    """
+    lo, hi = start.timestamp(), end.timestamp()
+    occurrences = []
+    first_day = start.astimezone(tz).date() - timedelta(days=1)  # Overnight windows from the day before
+    for day in range((end.astimezone(tz).date() - first_day).days + 1):
+        date = first_day + timedelta(days=day)
+        for index, window in enumerate(windows):
+            if window.start_time is None or window.end_time is None:
+                continue
+            if window.days_of_week and date.isoweekday() not in window.days_of_week:
+                continue
+            occ_start = datetime.combine(date, window.start_time, tz)
+            occ_end = datetime.combine(date, window.end_time, tz)
+            if occ_end <= occ_start:
+                occ_end += timedelta(days=1)
+            occ_start, occ_end = max(occ_start.timestamp(), lo), min(occ_end.timestamp(), hi)
+            if occ_start < occ_end:
+                occurrences.append((occ_start, occ_end, index))
+
+    busy_starts, busy_ends = _merge([(s.timestamp(), e.timestamp()) for s, e in busy])
+
+    slots = []
+    claimed = lo
+    for occ_start, occ_end, index in sorted(occurrences):
+        cursor = max(occ_start, claimed)
+        claimed = max(claimed, occ_end)
+        # Busy intervals that could overlap [cursor, occ_end)
+        i = max(bisect.bisect_right(busy_starts, cursor) - 1, 0)
+        while cursor < occ_end:
+            if i < len(busy_starts) and busy_starts[i] < occ_end:
+                if busy_ends[i] <= cursor:
+                    i += 1
+                    continue
+                if busy_starts[i] > cursor:
+                    slots.append((cursor, busy_starts[i], index))
+                cursor = busy_ends[i]
+                i += 1
+            else:
+                slots.append((cursor, occ_end, index))
+                break
+    return slots
+
+
+def plan_schedule(
+    tasks: Sequence,
+    windows: Sequence,
+    busy: Sequence[Tuple[datetime, datetime]],
+    start: datetime,
+    end: datetime,
+    tz: tzinfo,
+    default_duration: timedelta
+) -> dict:
+    """
+    Pack tasks into free context-window time between start and end.
+
+    Tasks are placed earliest deadline first, then by priority, each into
+    the best-scoring slot that still has room for it before its deadline.
+    Windows with preferred_activities only take tasks sharing a tag (untagged
+    tasks go anywhere). Static scores and constraints for every task/slot
+    pair are computed up front as NumPy matrices, so the placement loop is
+    a couple of vector operations per task.
+
+    tasks need id, title, context_tags, estimated_duration, due_at and
+    priority; windows are ContextWindow-like. Returns
+    {"scheduled": [...], "unscheduled": [...]} with times in tz.
+    """
+    slots = window_slots(windows, busy, start, end, tz)
+    n, m = len(tasks), len(slots)
+    if not n:
+        return {"scheduled": [], "unscheduled": []}
+
+    slot_start = np.array([s[0] for s in slots], dtype=float)
+    slot_end = np.array([s[1] for s in slots], dtype=float)
+    slot_window = np.array([s[2] for s in slots], dtype=int)
+
+    default_seconds = default_duration.total_seconds()
+    duration = np.array([
+        t.estimated_duration.total_seconds() if t.estimated_duration else default_seconds for t in tasks
+    ])
+    due = np.array([t.due_at.timestamp() if t.due_at else np.inf for t in tasks])
+    priority = np.array([t.priority or 0 for t in tasks])
+
+    # Multi-hot tags against window preferences
+    vocabulary = {}
+    task_tags = [[vocabulary.setdefault(tag, len(vocabulary)) for tag in t.context_tags or ()] for t in tasks]
+    window_prefs = [[vocabulary.setdefault(a, len(vocabulary)) for a in w.preferred_activities or ()] for w in windows]
+    tag_matrix = np.zeros((n, len(vocabulary)), dtype=np.float32)
+    for i, tags in enumerate(task_tags):
+        tag_matrix[i, tags] = 1
+    pref_matrix = np.zeros((len(windows), len(vocabulary)), dtype=np.float32)
+    for j, prefs in enumerate(window_prefs):
+        pref_matrix[j, prefs] = 1
+    overlap = (tag_matrix @ pref_matrix.T)[:, slot_window]  # (tasks, slots)
+
+    has_tags = tag_matrix.any(axis=1)
+    has_prefs = pref_matrix.any(axis=1)[slot_window]
+    allowed = (overlap > 0) | ~has_tags[:, None] | ~has_prefs[None, :]
+    fits = allowed & (duration[:, None] <= (slot_end - slot_start)[None, :])
+    feasible = fits & (slot_start[None, :] + duration[:, None] <= due[:, None])
+
+    focus = np.array([bool(FOCUS_TAGS.intersection(t.context_tags or ())) for t in tasks], dtype=float)
+    energy = np.array([ENERGY_LEVELS.get(w.energy_level, 0.0) for w in windows])[slot_window]
+    horizon = max(end.timestamp() - start.timestamp(), 1.0)
+    score = (
+        TAG_WEIGHT * overlap
+        + ENERGY_WEIGHT * focus[:, None] * energy[None, :]
+        - EARLINESS_WEIGHT * ((slot_start - start.timestamp()) / horizon)[None, :]
+    )
+    score = np.where(feasible, score, -np.inf)
+
+    # Earliest deadline first, then highest priority, then input order
+    order = np.lexsort((np.arange(n), -priority, due))
+    cursor = slot_start.copy()
+    limit = np.minimum(slot_end[None, :], due[:, None])
+    scheduled, unscheduled = [], []
+
+    for i in order:
+        task = tasks[i]
+        if m:
+            candidates = np.where(cursor + duration[i] <= limit[i], score[i], -np.inf)
+            k = int(np.argmax(candidates))
+        if m and candidates[k] > -np.inf:
+            begin = cursor[k]
+            cursor[k] = begin + duration[i]
+            window = windows[slot_window[k]]
+            scheduled.append({
+                "entity_id": task.id,
+                "title": task.title,
+                "window_id": window.id,
+                "window_type": window.window_type,
+                "start": datetime.fromtimestamp(begin, tz),
+                "end": datetime.fromtimestamp(cursor[k], tz),
+                "score": float(score[i, k]),
+            })
+            continue
+
+        if not allowed[i].any():
+            reason = "no_matching_window"
+        elif not fits[i].any():
+            reason = "too_long"
+        elif not feasible[i].any():
+            reason = "deadline"
+        else:
+            reason = "no_capacity"
+        unscheduled.append({"entity_id": task.id, "title": task.title, "reason": reason})
+
+    scheduled.sort(key=lambda item: item["start"])
+    return {"scheduled": scheduled, "unscheduled": unscheduled}
+
+
+def _user_tz(name: Optional[str]) -> tzinfo:
+    try:
+        return ZoneInfo(name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo("UTC")
+
+
+class ScheduleService:
+    """
+    Builds schedule plans from a user's context windows and pending
+    entities. Plans are computed, not stored.
+    """
+
+    @staticmethod
+    def _windows_query(user_id: UUID) -> Select:
+        return select(ContextWindow).where(ContextWindow.user_id == user_id).order_by(ContextWindow.created_at)
+
+    @staticmethod
+    def _tasks_query(user_id: UUID, entity_types: List[str]) -> Select:
+        return select(
+            Entity.id, Entity.title, Entity.context_tags, Entity.estimated_duration,
+            Entity.due_at, Entity.priority
+        ).where(
+            Entity.user_id == user_id,
+            Entity.status == "pending",
+            Entity.scheduled_at.is_(None),
+            Entity.entity_type.in_(entity_types)
+        ).order_by(Entity.priority.desc(), Entity.created_at, Entity.id)
+
+    @staticmethod
+    def _busy_query(user_id: UUID, start: datetime, end: datetime) -> Select:
+        # Anything with a fixed time occupies it; a day of lookback catches long events
+        return select(Entity.scheduled_at, Entity.estimated_duration).where(
+            Entity.user_id == user_id,
+            Entity.scheduled_at >= start - timedelta(days=1),
+            Entity.scheduled_at < end,
+            Entity.status.notin_(DONE_STATUSES)
+        )
+
+    @staticmethod
+    def _horizon(start: Optional[datetime], days: int, timezone: Optional[str]) -> Tuple[datetime, datetime, tzinfo]:
+        # Naive start times are read in the user's timezone
+        tz = _user_tz(timezone)
+        if start is None:
+            start = datetime.now(tz)
+        elif start.tzinfo is None:
+            start = start.replace(tzinfo=tz)
+        return start, start + timedelta(days=days), tz
+
+    @staticmethod
+    def _plan(tasks, windows, busy_rows, start, end, tz, default_duration, ready=None) -> dict:
+        if ready is not None:
+            tasks = [t for t in tasks if t.id in ready]
+        busy = [(s, s + (d or DEFAULT_EVENT_DURATION)) for s, d in busy_rows]
+        plan = plan_schedule(tasks, windows, busy, start, end, tz, default_duration)
+        return {"start": start.astimezone(tz), "end": end.astimezone(tz), **plan}
+
+    @staticmethod
+    def plan(
+        db: Session,
+        user_id: UUID,
+        timezone: Optional[str],
+        start: Optional[datetime],
+        days: int,
+        entity_types: List[str],
+        default_duration: timedelta,
+        ready_only: bool = False
+    ) -> dict:
+        """Plan pending entities into context windows from start (default now) for the given number of days"""
+        start, end, tz = ScheduleService._horizon(start, days, timezone)
+        windows = db.scalars(ScheduleService._windows_query(user_id)).all()
+        tasks = db.execute(ScheduleService._tasks_query(user_id, entity_types)).all()
+        busy_rows = db.execute(ScheduleService._busy_query(user_id, start, end)).all()
+        ready = None
+        if ready_only:
+            graph = dependency_index.get(db, user_id)
+            with graph.lock:
+                ready = set(graph.ready)
+        return ScheduleService._plan(tasks, windows, busy_rows, start, end, tz, default_duration, ready)
+
+    @staticmethod
+    async def aplan(
+        db: AsyncSession,
+        user_id: UUID,
+        timezone: Optional[str],
+        start: Optional[datetime],
+        days: int,
+        entity_types: List[str],
+        default_duration: timedelta,
+        ready_only: bool = False
+    ) -> dict:
+        """Plan pending entities into context windows from start (default now) for the given number of days"""
+        start, end, tz = ScheduleService._horizon(start, days, timezone)
+        windows = (await db.scalars(ScheduleService._windows_query(user_id))).all()
+        tasks = (await db.execute(ScheduleService._tasks_query(user_id, entity_types))).all()
+        busy_rows = (await db.execute(ScheduleService._busy_query(user_id, start, end))).all()
+        ready = None
+        if ready_only:
+            graph = await dependency_index.aget(db, user_id)
+            with graph.lock:
+                ready = set(graph.ready)
+        # Packing thousands of tasks takes long enough to stall every other request on the loop
+        return await asyncio.to_thread(
+            ScheduleService._plan, tasks, windows, busy_rows, start, end, tz, default_duration, ready
+        )
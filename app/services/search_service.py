@@ -0,0 +1,118 @@
+from sqlalchemy import select, func, literal, null, union_all, tuple_, String, Select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Sequence, Tuple
+from uuid import UUID
+from datetime import datetime
+from app.models import Entity, Message
+from app.pagination import encode_cursor, decode_cursor
+
+# Must match the configuration of the generated search_vector columns
+SEARCH_CONFIG = "english"
+
+# Matched terms are wrapped in <b></b>; up to two fragments per hit
+HEADLINE_OPTIONS = "StartSel=<b>, StopSel=</b>, MaxFragments=2, MaxWords=20, MinWords=5"
+
+SEARCH_KINDS = ("entities", "messages")
+
+
+class SearchService:
+    """
+    Full-text search over a user's entities and chat messages, backed by
+    the generated search_vector columns and their (user_id, search_vector)
+    GIN indexes.
+    """
+
+    @staticmethod
+    def _search_query(user_id: UUID, q: str, kinds: Sequence[str], limit: int, cursor: Optional[str]) -> Select:
+        # websearch syntax: "quoted phrases", -exclusions, OR
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        after = decode_cursor(cursor, float, datetime, UUID) if cursor else None
+
+        parts = []
+        if "entities" in kinds:
+            # Normalisation 32 maps ranks into 0..1
+            rank = func.ts_rank_cd(Entity.search_vector, query, 32)
+            part = select(
+                literal("entity").label("kind"),
+                Entity.id.label("id"),
+                Entity.title.label("title"),
+                Entity.entity_type.label("entity_type"),
+                Entity.status.label("status"),
+                null().cast(String).label("role"),
+                func.concat_ws(" ", Entity.title, Entity.description).label("document"),
+                Entity.created_at.label("created_at"),
+                rank.label("rank"),
+            ).where(Entity.user_id == user_id, Entity.search_vector.op("@@")(query))
+            if after:
+                part = part.where(tuple_(rank, Entity.created_at, Entity.id) < tuple_(*after))
+            parts.append(part)
+
+        if "messages" in kinds:
+            rank = func.ts_rank_cd(Message.search_vector, query, 32)
+            part = select(
+                literal("message").label("kind"),
+                Message.id.label("id"),
+                null().cast(String).label("title"),
+                null().cast(String).label("entity_type"),
+                null().cast(String).label("status"),
+                Message.role.label("role"),
+                Message.content.label("document"),
+                Message.created_at.label("created_at"),
+                rank.label("rank"),
+            ).where(Message.user_id == user_id, Message.search_vector.op("@@")(query))
+            if after:
+                part = part.where(tuple_(rank, Message.created_at, Message.id) < tuple_(*after))
+            parts.append(part)
+
+        hits = (parts[0] if len(parts) == 1 else union_all(*parts)).subquery("hits")
+
+        # Best matches first; one extra row tells us whether there is a next page
+        page = (
+            select(hits)
+            .order_by(hits.c.rank.desc(), hits.c.created_at.desc(), hits.c.id.desc())
+            .limit(limit + 1)
+            .subquery("page")
+        )
+
+        # Headlines are costly, so only the page's rows get one
+        return select(
+            page.c.kind, page.c.id, page.c.title, page.c.entity_type, page.c.status, page.c.role,
+            page.c.created_at, page.c.rank,
+            func.ts_headline(SEARCH_CONFIG, page.c.document, query, HEADLINE_OPTIONS).label("headline"),
+        ).order_by(page.c.rank.desc(), page.c.created_at.desc(), page.c.id.desc())
+
+    @staticmethod
+    def _page(rows, limit: int) -> Tuple[List[dict], Optional[str]]:
+        hits = [row._asdict() for row in rows]
+        if len(hits) <= limit:
+            return hits, None
+        hits = hits[:limit]
+        last = hits[-1]
+        return hits, encode_cursor(last["rank"], last["created_at"], last["id"])
+
+    @staticmethod
+    def search(
+        db: Session,
+        user_id: UUID,
+        q: str,
+        kinds: Sequence[str] = SEARCH_KINDS,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Search entities and/or messages; returns ranked hits and the cursor for the next page"""
+        rows = db.execute(SearchService._search_query(user_id, q, kinds, limit, cursor)).all()
+        return SearchService._page(rows, limit)
+
+    @staticmethod
+    async def asearch(
+        db: AsyncSession,
+        user_id: UUID,
+        q: str,
+        kinds: Sequence[str] = SEARCH_KINDS,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Search entities and/or messages; returns ranked hits and the cursor for the next page"""
+        rows = (await db.execute(SearchService._search_query(user_id, q, kinds, limit, cursor))).all()
+        return SearchService._page(rows, limit)
@@ -0,0 +1,391 @@
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+import numpy as np
+from sqlalchemy import select, Select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import TTLCache
+from app.config import settings
+from app.embeddings import Embedder, get_embedder
+from app.models import Entity, Message
+
+
+class VectorIndex:
+    """
+    In-memory cosine-similarity index over normalised vectors.
+
+    Search is exact (one matrix-vector product plus argpartition) until
+    ann_threshold vectors, then an IVF index is trained: vectors are
+    bucketed by nearest k-means centroid and a query only scores the
+    nprobe closest buckets. Adds and removes are O(1) apart from the
+    occasional retrain when the index has doubled since the last one.
+    """
+
+    def __init__(self, dim: int, ann_threshold: int = 20000, nprobe: int = 8):
+        self.dim = dim
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self.keys: List[Hashable] = []
+        self.payloads: List[dict] = []
+        self._rows: Dict[Hashable, int] = {}
+        self._vectors = np.zeros((64, dim), dtype=np.float32)
+        # IVF state; None while searching exactly
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._assign: List[int] = []
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def ann(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by vectors and centroids, spare capacity included"""
+        return self._vectors.nbytes + (self._centroids.nbytes if self.ann else 0)
+
+    def _reserve(self, n: int) -> None:
+        # Grow by half at a time: doubling leaves up to half of a large index unused
+        capacity = len(self._vectors)
+        if n > capacity:
+            vectors = np.zeros((max(n, capacity + capacity // 2), self.dim), dtype=np.float32)
+            vectors[:len(self.keys)] = self._vectors[:len(self.keys)]
+            self._vectors = vectors
+
+    def add(self, keys: Sequence[Hashable], vectors: np.ndarray, payloads: Sequence[dict]) -> None:
+        """Insert or replace vectors by key"""
+        self._reserve(len(self.keys) + sum(1 for key in set(keys) if key not in self._rows))
+        for key, vector, payload in zip(keys, vectors, payloads):
+            row = self._rows.get(key)
+            if row is not None:
+                self._vectors[row] = vector
+                self.payloads[row] = payload
+                if self.ann:
+                    self._move(row, self._nearest(vector))
+                continue
+
+            row = len(self.keys)
+            self._vectors[row] = vector
+            self._rows[key] = row
+            self.keys.append(key)
+            self.payloads.append(payload)
+            if self.ann:
+                bucket = self._nearest(vector)
+                self._assign.append(bucket)
+                self._lists[bucket].append(row)
+
+        if len(self) >= self.ann_threshold and len(self) >= 2 * self._trained_size:
+            self.train()
+
+    def remove(self, keys: Iterable[Hashable]) -> None:
+        for key in keys:
+            row = self._rows.pop(key, None)
+            if row is None:
+                continue
+
+            # Swap the last row into the hole
+            last = len(self.keys) - 1
+            if self.ann:
+                self._lists[self._assign[row]].remove(row)
+            if row != last:
+                self._vectors[row] = self._vectors[last]
+                self.keys[row] = self.keys[last]
+                self.payloads[row] = self.payloads[last]
+                self._rows[self.keys[row]] = row
+                if self.ann:
+                    bucket = self._assign[last]
+                    self._lists[bucket][self._lists[bucket].index(last)] = row
+                    self._assign[row] = bucket
+            self.keys.pop()
+            self.payloads.pop()
+            if self.ann:
+                self._assign.pop()
+
+    def _nearest(self, vector: np.ndarray) -> int:
+        return int(np.argmax(self._centroids @ vector))
+
+    def _move(self, row: int, bucket: int) -> None:
+        self._lists[self._assign[row]].remove(row)
+        self._lists[bucket].append(row)
+        self._assign[row] = bucket
+
+    def train(self, iterations: int = 8, seed: int = 0) -> None:
+        """(Re)build the IVF buckets with spherical k-means on a sample"""
+        n = len(self)
+        vectors = self._vectors[:n]
+        nlist = max(int(np.sqrt(n)), 1)
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(n, size=min(n, nlist * 40), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.where(norms == 0, 1, norms), centroids)
+
+        # Assign in blocks to bound the temporary score matrix
+        assign = np.concatenate([
+            np.argmax(vectors[i:i + 8192] @ centroids.T, axis=1) for i in range(0, n, 8192)
+        ])
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+        self._centroids = centroids
+        self._assign = assign.tolist()
+        self._lists = [order[bounds[c]:bounds[c + 1]].tolist() for c in range(nlist)]
+        self._trained_size = n
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        exclude: Optional[Set[Hashable]] = None,
+        exact: bool = False
+    ) -> List[Tuple[Hashable, float, dict]]:
+        """Top-k (key, cosine similarity, payload), best first"""
+        n = len(self)
+        if not n:
+            return []
+
+        if self.ann and not exact:
+            buckets = np.argsort(-(self._centroids @ query))[:self.nprobe]
+            rows = np.fromiter(
+                (row for bucket in buckets for row in self._lists[bucket]), dtype=np.int64
+            )
+            scores = self._vectors[rows] @ query
+        else:
+            rows = None
+            scores = self._vectors[:n] @ query
+
+        # Over-fetch so excluded keys don't leave the result short
+        want = min(k + len(exclude or ()), len(scores))
+        if not want:
+            return []
+        top = np.argpartition(-scores, want - 1)[:want]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            row = int(rows[i]) if rows is not None else int(i)
+            key = self.keys[row]
+            if exclude and key in exclude:
+                continue
+            results.append((key, float(scores[i]), self.payloads[row]))
+            if len(results) == k:
+                break
+        return results
+
+
+@dataclass(eq=False)
+class _UserIndex:
+    index: VectorIndex
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # key -> (text, payload) still to embed; None marks a removal
+    pending: Dict[Hashable, Optional[tuple]] = field(default_factory=dict)
+    # Set by invalidate() while the index is still being built: don't publish it
+    stale: bool = False
+
+
+class VectorStore:
+    """
+    Per-worker, per-user VectorIndexes over entity titles/descriptions and
+    message content. An index is built on first search for a user; writes
+    only queue texts, which are embedded in one batch before the next
+    search, so the write path never waits on the embedder. The cache is
+    bounded by the bytes of its indexes' vectors, least recently used first.
+
+    An index being built is registered before its rows are read, so writes
+    committed while it loads are queued on it too (applying one twice is
+    harmless). In asearch, embedding large batches, building and searching
+    (which may retrain the IVF buckets) run in a worker thread.
+    """
+
+    def __init__(self, embedder: Optional[Embedder] = None, max_bytes: int = 256 * 1024 * 1024, ttl: float = 600.0):
+        self._embedder = embedder
+        # Bounded by vector memory, not user count: one index can be 1000x another
+        self._indexes = TTLCache(maxsize=max_bytes, ttl=ttl, weigh=lambda entry: entry.index.nbytes)
+        self._building: Dict[UUID, List[_UserIndex]] = {}
+        self._building_lock = threading.Lock()
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = get_embedder()
+        return self._embedder
+
+    @staticmethod
+    def entity_payload(entity) -> Tuple[Tuple[str, UUID], str, dict]:
+        text = entity.title if not entity.description else f"{entity.title}: {entity.description}"
+        payload = {
+            "kind": "entity", "id": entity.id, "entity_type": entity.entity_type,
+            "status": entity.status, "text": text, "created_at": entity.created_at,
+        }
+        return ("entity", entity.id), text, payload
+
+    @staticmethod
+    def message_payload(message) -> Tuple[Tuple[str, UUID], str, dict]:
+        payload = {
+            "kind": "message", "id": message.id, "role": message.role,
+            "text": message.content, "created_at": message.created_at,
+        }
+        return ("message", message.id), message.content, payload
+
+    @staticmethod
+    def _entities_query(user_id: UUID) -> Select:
+        return select(
+            Entity.id, Entity.title, Entity.description, Entity.entity_type, Entity.status, Entity.created_at
+        ).where(Entity.user_id == user_id)
+
+    @staticmethod
+    def _messages_query(user_id: UUID) -> Select:
+        # Newest messages only; very old chat falls out of recall
+        return (
+            select(Message.id, Message.role, Message.content, Message.created_at)
+            .where(Message.user_id == user_id)
+            .order_by(Message.created_at.desc())
+            .limit(settings.vector_index_max_messages)
+        )
+
+    def _start_build(self, user_id: UUID) -> _UserIndex:
+        entry = _UserIndex(VectorIndex(
+            self.embedder.dim,
+            ann_threshold=settings.vector_index_ann_threshold,
+            nprobe=settings.vector_index_nprobe,
+        ))
+        with self._building_lock:
+            self._building.setdefault(user_id, []).append(entry)
+        return entry
+
+    def _end_build(self, user_id: UUID, entry: _UserIndex) -> None:
+        with self._building_lock:
+            building = self._building.get(user_id, [])
+            if entry in building:
+                building.remove(entry)
+            if not building:
+                self._building.pop(user_id, None)
+
+    def _entries(self, user_id: UUID) -> List[_UserIndex]:
+        """The cached index plus any being built: every place a write must be queued"""
+        entry = self._indexes.get(user_id)
+        with self._building_lock:
+            building = list(self._building.get(user_id, ()))
+        return ([entry] if entry is not None else []) + building
+
+    def _items(self, entity_rows, message_rows) -> list:
+        return [self.entity_payload(r) for r in entity_rows] + [self.message_payload(r) for r in message_rows]
+
+    @staticmethod
+    def _apply(entry: _UserIndex, items: list, vectors: np.ndarray) -> None:
+        if items:
+            entry.index.add([key for key, _, _ in items], vectors, [payload for _, _, payload in items])
+
+    @staticmethod
+    def _take_pending(entry: _UserIndex) -> Tuple[list, list]:
+        with entry.lock:
+            pending, entry.pending = entry.pending, {}
+        removed = [key for key, item in pending.items() if item is None]
+        added = [(key, *item) for key, item in pending.items() if item is not None]
+        return removed, added
+
+    def _finish(self, user_id: UUID, entry: _UserIndex, items: list, vectors: np.ndarray) -> _UserIndex:
+        self._apply(entry, items, vectors)
+        # Keep an index another request built (and may have queued writes to) meanwhile
+        existing = self._indexes.get(user_id)
+        if existing is not None:
+            return existing
+        if not entry.stale:
+            self._indexes.set(user_id, entry)
+        return entry
+
+    def _search(self, user_id: UUID, entry: _UserIndex, removed: list, added: list, vectors, query_vector, k, exclude) -> list:
+        with entry.lock:
+            entry.index.remove(removed)
+            self._apply(entry, added, vectors)
+            results = [
+                {**payload, "score": score}
+                for _, score, payload in entry.index.search(query_vector, k, exclude=exclude)
+            ]
+        if added:
+            self._indexes.reweigh(user_id)
+        return results
+
+    def search(self, db: Session, user_id: UUID, text: str, k: int = 5, exclude: Optional[Set] = None) -> List[dict]:
+        """Top-k entities/messages most similar to text, best first, each with a score"""
+        entry = self._indexes.get(user_id)
+        if entry is None:
+            building = self._start_build(user_id)
+            try:
+                items = self._items(
+                    db.execute(self._entities_query(user_id)).all(),
+                    db.execute(self._messages_query(user_id)).all(),
+                )
+                entry = self._finish(user_id, building, items, self.embedder.embed([t for _, t, _ in items]))
+            finally:
+                self._end_build(user_id, building)
+
+        removed, added = self._take_pending(entry)
+        texts = [t for _, t, _ in added] + [text]
+        vectors = self.embedder.embed(texts)
+        return self._search(user_id, entry, removed, added, vectors[:-1], vectors[-1], k, exclude)
+
+    async def asearch(self, db: AsyncSession, user_id: UUID, text: str, k: int = 5, exclude: Optional[Set] = None) -> List[dict]:
+        """Top-k entities/messages most similar to text, best first, each with a score"""
+        entry = self._indexes.get(user_id)
+        if entry is None:
+            building = self._start_build(user_id)
+            try:
+                items = self._items(
+                    (await db.execute(self._entities_query(user_id))).all(),
+                    (await db.execute(self._messages_query(user_id))).all(),
+                )
+                vectors = await self.embedder.aembed([t for _, t, _ in items])
+                entry = await asyncio.to_thread(self._finish, user_id, building, items, vectors)
+            finally:
+                self._end_build(user_id, building)
+
+        removed, added = self._take_pending(entry)
+        texts = [t for _, t, _ in added] + [text]
+        vectors = await self.embedder.aembed(texts)
+        return await asyncio.to_thread(self._search, user_id, entry, removed, added, vectors[:-1], vectors[-1], k, exclude)
+
+    # Write hooks: only indexes in memory or being built are touched, others load fresh
+
+    def _queue(self, user_id: UUID, items: Iterable[tuple]) -> None:
+        items = list(items)
+        for entry in self._entries(user_id):
+            with entry.lock:
+                for key, text, payload in items:
+                    entry.pending[key] = (text, payload)
+
+    def entities_saved(self, user_id: UUID, entities: Iterable[Entity]) -> None:
+        self._queue(user_id, (self.entity_payload(e) for e in entities))
+
+    def messages_added(self, user_id: UUID, messages: Iterable[Message]) -> None:
+        self._queue(user_id, (self.message_payload(m) for m in messages))
+
+    def entities_deleted(self, user_id: UUID, entity_ids: Iterable[UUID]) -> None:
+        entity_ids = list(entity_ids)
+        for entry in self._entries(user_id):
+            with entry.lock:
+                for entity_id in entity_ids:
+                    entry.pending[("entity", entity_id)] = None
+
+    def invalidate(self, user_id: UUID) -> None:
+        self._indexes.pop(user_id)
+        with self._building_lock:
+            for entry in self._building.get(user_id, ()):
+                entry.stale = True
+
+    def stats(self) -> dict:
+        return self._indexes.stats()
+
+
+vector_store = VectorStore(max_bytes=settings.vector_index_max_bytes, ttl=settings.vector_index_ttl)
@@ -0,0 +1,200 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-SQL-Profile"
+
+# Bind placeholders of the psycopg2 and asyncpg dialects, and the lists an
+# expanding IN renders, so one statement shape matches whatever its parameters
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|\$\d+")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    shape = _PLACEHOLDER.sub("?", statement)
+    shape = _PLACEHOLDER_LIST.sub("?, ...", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryProfile:
+    """Statements executed within one request (or one profile() block)"""
+
+    def __init__(self):
+        self.statements: List[Tuple[str, float]] = []
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements.append((statement, seconds))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(seconds for _, seconds in self.statements) * 1000
+
+    def shapes(self) -> Counter:
+        return Counter(statement_shape(statement) for statement, _ in self.statements)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Shapes executed at least threshold times, most frequent first (likely N+1)"""
+        return [(shape, n) for shape, n in self.shapes().most_common() if n >= threshold]
+
+    def summary(self, threshold: int) -> str:
+        return f"queries={self.count}, time_ms={self.total_ms:.1f}, repeated={len(self.repeated(threshold))}"
+
+
+_current: ContextVar[Optional[QueryProfile]] = ContextVar("sql_profile", default=None)
+
+# Engines with the recording hooks, and assert_max_queries blocks collecting request profiles
+_instrumented: Set[int] = set()
+_observers: List[List[Tuple[str, QueryProfile]]] = []
+_lock = threading.Lock()
+
+
+def install(*engines) -> None:
+    """Record statements of these engines into the active profile (idempotent)"""
+    for engine in engines:
+        sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+        with _lock:
+            if id(sync_engine) in _instrumented:
+                continue
+            _instrumented.add(id(sync_engine))
+        event.listen(sync_engine, "before_cursor_execute", _before)
+        event.listen(sync_engine, "after_cursor_execute", _after)
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._profiler_started = time.perf_counter()
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    started = getattr(context, "_profiler_started", None)
+    if profile is not None and started is not None:
+        profile.record(statement, time.perf_counter() - started)
+
+
+@contextmanager
+def profile() -> Iterator[QueryProfile]:
+    """Record the statements run in this context (this task, or this thread) into a profile"""
+    current = QueryProfile()
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+
+
+class SQLProfilerMiddleware:
+    """
+    Opt-in (sql_profiler_enabled) per-request SQL profiler.
+
+    Records every statement a request runs, adds an X-SQL-Profile header
+    with the totals and logs one line per request. Statement shapes run
+    sql_profiler_repeat_threshold or more times are flagged as likely N+1
+    patterns. The header is written when the response starts, so for a
+    streaming response it covers the queries made before the first chunk;
+    the log line covers the whole request.
+
+    Passes requests straight through when disabled and no
+    assert_max_queries() block is active.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not (settings.sql_profiler_enabled or _observers):
+            await self.app(scope, receive, send)
+            return
+
+        threshold = settings.sql_profiler_repeat_threshold
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(PROFILE_HEADER, current.summary(threshold))
+            await send(message)
+
+        with profile() as current:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                self._report(scope, status_code, current, threshold)
+
+    @staticmethod
+    def _report(scope: Scope, status_code: int, current: QueryProfile, threshold: int) -> None:
+        route = scope.get("route")
+        path = getattr(route, "path", None) or scope["path"]
+        endpoint = f"{scope['method']} {path}"
+        with _lock:
+            for observer in _observers:
+                observer.append((endpoint, current))
+
+        repeated = current.repeated(threshold)
+        logger.info(
+            "sql profile endpoint=%s status=%d queries=%d time_ms=%.1f repeated=%d",
+            endpoint, status_code, current.count, current.total_ms, len(repeated)
+        )
+        for shape, n in repeated:
+            logger.warning("possible N+1 endpoint=%s count=%d statement=%s", endpoint, n, shape[:300])
+
+
+@contextmanager
+def assert_max_queries(max_queries: int, max_repeats: Optional[int] = None) -> Iterator[List[Tuple[str, QueryProfile]]]:
+    """
+    Fail if any request handled inside the block runs more than max_queries
+    statements, or (with max_repeats) any one statement shape more than
+    max_repeats times. For use in tests:
+
+        with assert_max_queries(4, max_repeats=1):
+            client.get("/api/v1/entities", headers=auth)
+
+    Requests are profiled by SQLProfilerMiddleware, whatever thread or loop
+    serves them. Statements run directly in the block (a service call, no
+    request) are checked as one more profile.
+    """
+    from app.database import engine, async_engine
+    install(engine, async_engine)
+
+    requests: List[Tuple[str, QueryProfile]] = []
+    with _lock:
+        _observers.append(requests)
+    try:
+        with profile() as direct:
+            yield requests
+    finally:
+        with _lock:
+            _observers.remove(requests)
+
+    checked = requests + ([("<direct>", direct)] if direct.count else [])
+    failures = []
+    for endpoint, current in checked:
+        if current.count > max_queries:
+            failures.append(f"{endpoint}: {current.count} queries (max {max_queries})")
+        if max_repeats is not None:
+            for shape, n in current.repeated(max_repeats + 1):
+                failures.append(f"{endpoint}: {n}x {shape[:200]} (max {max_repeats})")
+    if failures:
+        details = "\n".join(
+            f"  {endpoint}:\n" + "\n".join(f"    {statement_shape(s)[:200]}" for s, _ in current.statements)
+            for endpoint, current in checked
+        )
+        raise AssertionError("Query budget exceeded:\n" + "\n".join(failures) + "\nStatements:\n" + details)
@@ -0,0 +1,94 @@
+"""
+Benchmark per-turn agent overhead: building the mentor agent on every chat
+turn versus reusing the one cached by AgentRegistry.
+
+Both paths run the same turns through the graph with the deterministic fake
+chat model (zero latency, see app/agent/fake_llm.py), so the difference is
+the per-turn setup. Setup is measured twice:
+
+- before: a new ChatOpenAI client (with its own HTTP connection pools),
+  bind_tools and StateGraph compile on every turn, as chat_with_mentor did
+- after: mentor_registry.get(), a dict lookup
+
+No requests reach the provider (no network needed), so the TLS handshake
+a fresh client pays on its first real call is not part of these numbers;
+in production it comes on top of the "before" cost.
+
+Usage:
+    python scripts/bench_agent_setup.py [--turns 200]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI
+from app.agent.fake_llm import FakeChatModel
+from app.agent.mentor import SYSTEM_PROMPT, create_mentor_agent
+from app.agent.registry import AgentRegistry
+
+PROMPTS = ["What should I work on now?", "Plan my week", "How is it going?", "Thanks!"]
+
+
+def setup_before() -> object:
+    llm = ChatOpenAI(model="gpt-4o-mini", api_key="sk-bench", temperature=0.7)
+    return create_mentor_agent(llm)
+
+
+def timed(fn, turns: int) -> list:
+    timings = []
+    for _ in range(turns):
+        began = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - began) * 1000)
+    return timings
+
+
+async def run_turns(get_agent, turns: int) -> list:
+    # No tools bound to the fake replies (tool_call_ratio=0), so no database is touched
+    timings = []
+    for i in range(turns):
+        began = time.perf_counter()
+        agent = get_agent()
+        messages = [SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content=PROMPTS[i % len(PROMPTS)])]
+        await agent.ainvoke({"messages": messages})
+        timings.append((time.perf_counter() - began) * 1000)
+    return timings
+
+
+def report(label: str, timings: list) -> float:
+    median = statistics.median(timings)
+    print(f"  {label:<34} median {median:8.3f} ms   p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:8.3f} ms")
+    return median
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    fake = FakeChatModel(latency=0.0, tool_call_ratio=0.0)
+    registry = AgentRegistry(create_mentor_agent)
+    registry.warm_up()
+
+    print(f"setup only, {args.turns} turns")
+    before = report("before (ChatOpenAI + compile)", timed(setup_before, args.turns))
+    after = report("after (registry.get)", timed(registry.get, args.turns))
+    print(f"  saved {before - after:.3f} ms per turn")
+
+    print(f"\nfull turn with a zero-latency fake LLM, {args.turns} turns")
+    before = report("before (compile per turn)", asyncio.run(run_turns(lambda: create_mentor_agent(fake), args.turns)))
+    cached = create_mentor_agent(fake)
+    after = report("after (cached graph)", asyncio.run(run_turns(lambda: cached, args.turns)))
+    print(f"  saved {before - after:.3f} ms per turn ({(1 - after / before) * 100:.0f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
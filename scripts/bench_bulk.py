@@ -0,0 +1,136 @@
+"""
+Benchmark the bulk entity endpoints against the equivalent single calls.
+
+For --items entities (at most 1000, the bulk limit) it times, through the
+app in-process (httpx ASGI transport, no server needed):
+
+- create: N x POST /entities      vs one POST /entities/bulk
+- update: N x PUT /entities/id    vs one PATCH /entities/bulk (completing them)
+- delete: N x DELETE /entities/id vs one DELETE /entities/bulk?context_tag=...
+
+Calls are sequential, as a client syncing its items would make them, so
+the single-call numbers are per-item round trips plus a commit each. The
+benchmark user is deleted at the end.
+
+Usage:
+    python scripts/bench_bulk.py [--items 1000]
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import httpx
+from sqlalchemy import delete, insert
+from app.auth import create_access_token
+from app.database import SessionLocal, async_engine
+from app.main import app
+from app.models import User
+from app.schemas.entity import BULK_MAX_ITEMS
+
+BASE = "/api/v1/entities"
+TAG = "bench-bulk"
+
+
+def create_user() -> uuid.UUID:
+    user_id = uuid.uuid4()
+    with SessionLocal() as db:
+        db.execute(insert(User), [{"id": user_id, "email": f"bench-bulk-{user_id.hex[:12]}@example.com", "password_hash": "-"}])
+        db.commit()
+    return user_id
+
+
+def delete_user(user_id: uuid.UUID) -> None:
+    with SessionLocal() as db:
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+
+
+def check(response: httpx.Response, expected: int) -> httpx.Response:
+    if response.status_code != expected:
+        raise SystemExit(f"{response.request.method} {response.request.url.path}: {response.status_code} {response.text[:200]}")
+    return response
+
+
+async def timed(coro) -> tuple:
+    began = time.perf_counter()
+    result = await coro
+    return result, time.perf_counter() - began
+
+
+async def singles(client: httpx.AsyncClient, items: list) -> tuple:
+    async def create():
+        return [check(await client.post(BASE, json=item), 201).json()["id"] for item in items]
+
+    async def update(ids):
+        for entity_id in ids:
+            check(await client.put(f"{BASE}/{entity_id}", json={"status": "completed"}), 200)
+
+    async def remove(ids):
+        for entity_id in ids:
+            check(await client.delete(f"{BASE}/{entity_id}"), 204)
+
+    ids, create_s = await timed(create())
+    _, update_s = await timed(update(ids))
+    _, delete_s = await timed(remove(ids))
+    return create_s, update_s, delete_s
+
+
+async def bulk(client: httpx.AsyncClient, items: list) -> tuple:
+    async def create():
+        return [e["id"] for e in check(await client.post(f"{BASE}/bulk", json={"entities": items}), 201).json()]
+
+    async def update(ids):
+        check(await client.patch(f"{BASE}/bulk", json={"ids": ids, "changes": {"status": "completed"}}), 200)
+
+    async def remove():
+        deleted = check(await client.delete(f"{BASE}/bulk", params={"context_tag": TAG}), 200).json()["deleted"]
+        assert deleted == len(items), deleted
+
+    ids, create_s = await timed(create())
+    _, update_s = await timed(update(ids))
+    _, delete_s = await timed(remove())
+    return create_s, update_s, delete_s
+
+
+async def bench(user_id: uuid.UUID, n: int) -> None:
+    items = [{"entity_type": "task", "title": f"Synced item {i}", "context_tags": [TAG], "priority": i % 4} for i in range(n)]
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}"}
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=120) as client:
+            # Warm up connections and caches with a round of each
+            await bulk(client, items[:10])
+            single = await singles(client, items)
+            batched = await bulk(client, items)
+    finally:
+        await async_engine.dispose()
+
+    print(f"{n} entities, sequential calls")
+    print(f"  {'operation':<10} {'single calls':>13} {'bulk call':>11} {'speedup':>8}")
+    for name, s, b in zip(["create", "update", "delete"], single, batched):
+        print(f"  {name:<10} {s * 1000:11.0f}ms {b * 1000:9.1f}ms {s / b:7.1f}x")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=BULK_MAX_ITEMS)
+    args = parser.parse_args()
+    if not 10 <= args.items <= BULK_MAX_ITEMS:
+        parser.error(f"--items must be between 10 and {BULK_MAX_ITEMS}")
+
+    user_id = create_user()
+    try:
+        asyncio.run(bench(user_id, args.items))
+    finally:
+        delete_user(user_id)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Benchmark login throughput under concurrent load.
+
+Drives POST /api/v1/auth/login in-process (httpx ASGI transport, no server
+needed) with --concurrency clients, while a probe requests GET /health
+every few milliseconds to show how much bcrypt starves unrelated requests.
+Each mode runs the same logins with bcrypt placed differently:
+
+- inline: on the event loop, as a sync hash call inside an async route
+- thread: in the request threadpool, as the original sync routes did
+- pool: in the bounded bcrypt process pool (app/passwords.py)
+
+bcrypt cost is settings.bcrypt_rounds; set BCRYPT_ROUNDS=12 for production
+numbers. Seeded users are deleted at the end.
+
+Usage:
+    python scripts/bench_login.py [--users 20] [--logins 200] [--concurrency 16] [--modes inline,thread,pool]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import httpx
+from sqlalchemy import delete, insert
+from app.config import settings
+from app.database import SessionLocal, async_engine
+from app.main import app
+from app.models import User
+from app.passwords import hash_password, password_pool
+
+PASSWORD = "bench-password"
+
+
+async def _run_inline(fn, *args):
+    return fn(*args)
+
+
+async def _run_thread(fn, *args):
+    return await asyncio.to_thread(fn, *args)
+
+
+RUNNERS = {"inline": _run_inline, "thread": _run_thread, "pool": None}
+
+
+def seed(run_id: str, users: int) -> list:
+    password_hash = hash_password(PASSWORD)
+    emails = [f"bench-login-{run_id}-{i}@example.com" for i in range(users)]
+    with SessionLocal() as db:
+        db.execute(insert(User), [{"id": uuid.uuid4(), "email": email, "password_hash": password_hash} for email in emails])
+        db.commit()
+    return emails
+
+
+def cleanup(run_id: str) -> None:
+    with SessionLocal() as db:
+        db.execute(delete(User).where(User.email.like(f"bench-login-{run_id}-%")))
+        db.commit()
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def run_mode(client: httpx.AsyncClient, emails: list, logins: int, concurrency: int) -> dict:
+    login_ms, health_ms, statuses = [], [], []
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+
+    async def login(i: int) -> None:
+        async with semaphore:
+            began = time.perf_counter()
+            response = await client.post("/api/v1/auth/login", json={"email": emails[i % len(emails)], "password": PASSWORD})
+            login_ms.append((time.perf_counter() - began) * 1000)
+            statuses.append(response.status_code)
+
+    async def probe() -> None:
+        while not done.is_set():
+            began = time.perf_counter()
+            await client.get("/health")
+            health_ms.append((time.perf_counter() - began) * 1000)
+            await asyncio.sleep(0.005)
+
+    prober = asyncio.create_task(probe())
+    began = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(logins)))
+    elapsed = time.perf_counter() - began
+    done.set()
+    await prober
+
+    return {
+        "throughput": logins / elapsed,
+        "ok": statuses.count(200),
+        "busy": statuses.count(503),
+        "login_p50": statistics.median(login_ms),
+        "login_p95": percentile(login_ms, 0.95),
+        "health_p50": statistics.median(health_ms),
+        "health_max": max(health_ms),
+    }
+
+
+async def bench(emails: list, modes: list, logins: int, concurrency: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for mode in modes:
+                runner = RUNNERS[mode]
+                if runner is not None:
+                    password_pool._run = runner
+                try:
+                    # Warm up: pool processes, DB connections
+                    await client.post("/api/v1/auth/login", json={"email": emails[0], "password": PASSWORD})
+                    results[mode] = await run_mode(client, emails, logins, concurrency)
+                finally:
+                    password_pool.__dict__.pop("_run", None)
+    finally:
+        password_pool.shutdown()
+        await async_engine.dispose()
+
+    print(f"{logins} logins, concurrency {concurrency}, bcrypt rounds {settings.bcrypt_rounds}, "
+          f"pool {password_pool.workers} workers / {password_pool.max_pending} pending")
+    print(f"  {'mode':<8} {'logins/s':>9} {'ok':>5} {'503':>5} {'login p50':>10} {'p95':>8} {'/health p50':>12} {'max':>8}")
+    for mode, r in results.items():
+        print(
+            f"  {mode:<8} {r['throughput']:9.1f} {r['ok']:5d} {r['busy']:5d} {r['login_p50']:8.1f}ms "
+            f"{r['login_p95']:6.1f}ms {r['health_p50']:10.1f}ms {r['health_max']:6.1f}ms"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--modes", default="inline,thread,pool")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in RUNNERS]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)}")
+
+    run_id = uuid.uuid4().hex[:8]
+    emails = seed(run_id, args.users)
+    try:
+        asyncio.run(bench(emails, modes, args.logins, args.concurrency))
+    finally:
+        cleanup(run_id)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
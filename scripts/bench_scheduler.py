@@ -0,0 +1,93 @@
+"""
+Benchmark the context-window scheduler on synthetic users.
+
+Builds users with many pending tasks and context windows in memory (no
+database needed) and times plan_schedule over a horizon.
+
+Usage:
+    python scripts/bench_scheduler.py [--users 5] [--tasks 5000] [--windows 50] [--days 7]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time as timer
+import uuid
+from datetime import datetime, time, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.services.scheduler import plan_schedule
+
+TAGS = ["work", "home", "town", "health", "social", "focus_required", "errand", "call", "email", "deep"]
+WINDOW_TYPES = ["work_hours", "morning_routine", "evening_wind_down", "weekend", "focus_block"]
+
+
+def synthetic_user(rng: random.Random, n_tasks: int, n_windows: int, start: datetime, days: int):
+    windows = []
+    for _ in range(n_windows):
+        begin = rng.randrange(6 * 60, 21 * 60, 15)
+        length = rng.choice([30, 60, 90, 120, 180, 240])
+        end = min(begin + length, 23 * 60 + 45)
+        windows.append(SimpleNamespace(
+            id=uuid.uuid4(),
+            window_type=rng.choice(WINDOW_TYPES),
+            start_time=time(begin // 60, begin % 60),
+            end_time=time(end // 60, end % 60),
+            days_of_week=sorted(rng.sample(range(1, 8), rng.randint(1, 7))),
+            energy_level=rng.choice(["high", "medium", "low", None]),
+            preferred_activities=rng.sample(TAGS, rng.randint(0, 3)),
+        ))
+
+    tasks = []
+    for i in range(n_tasks):
+        tasks.append(SimpleNamespace(
+            id=uuid.uuid4(),
+            title=f"Task {i}",
+            context_tags=rng.sample(TAGS, rng.randint(0, 3)),
+            estimated_duration=timedelta(minutes=rng.choice([10, 15, 30, 45, 60, 120])) if rng.random() < 0.8 else None,
+            due_at=start + timedelta(hours=rng.uniform(1, days * 24 * 1.5)) if rng.random() < 0.4 else None,
+            priority=rng.randint(0, 3),
+        ))
+
+    busy = []
+    for _ in range(days * 3):
+        begin = start + timedelta(minutes=rng.randrange(0, days * 24 * 60, 15))
+        busy.append((begin, begin + timedelta(minutes=rng.choice([30, 60, 90]))))
+
+    return tasks, windows, busy
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--windows", type=int, default=50)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = datetime(2025, 1, 6, 8, 0, tzinfo=timezone.utc)
+    end = start + timedelta(days=args.days)
+
+    timings = []
+    for _ in range(args.users):
+        tasks, windows, busy = synthetic_user(rng, args.tasks, args.windows, start, args.days)
+        began = timer.perf_counter()
+        plan = plan_schedule(tasks, windows, busy, start, end, timezone.utc, timedelta(minutes=30))
+        timings.append(timer.perf_counter() - began)
+        print(
+            f"{len(tasks)} tasks, {len(windows)} windows: {len(plan['scheduled'])} scheduled, "
+            f"{len(plan['unscheduled'])} unscheduled in {timings[-1] * 1000:.0f} ms"
+        )
+
+    print(f"median {statistics.median(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Benchmark response serialization for entity listings.
+
+Serializes the same synthetic entities two ways (no database needed):
+
+- default: ORM objects validated into EntityPage, then jsonable_encoder and
+  json.dumps, as FastAPI does for a response_model route
+- fast: EntityResponse-shaped dicts, as the row queries return them,
+  rendered by ORJSONResponse
+
+and checks that both produce the same bytes.
+
+Usage:
+    python scripts/bench_serialization.py [--entities 10000] [--repeat 5]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.encoders import jsonable_encoder
+from app.models import Entity
+from app.schemas.entity import EntityPage, EntityResponse
+from app.serialization import ORJSONResponse
+
+TAGS = ["work", "home", "town", "health", "social", "focus_required", "errand", "call"]
+
+
+def synthetic_rows(rng: random.Random, n: int) -> list:
+    user_id = uuid.uuid4()
+    now = datetime(2025, 1, 6, 8, 0, tzinfo=timezone.utc)
+    rows = []
+    for i in range(n):
+        rows.append({
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "entity_type": rng.choice(["task", "event", "goal", "note"]),
+            "title": f"Entity {i}",
+            "description": "Some longer description of the entity " * rng.randint(0, 3) or None,
+            "scheduled_at": now + timedelta(hours=rng.randint(0, 500)) if rng.random() < 0.3 else None,
+            "due_at": now + timedelta(hours=rng.randint(0, 500)) if rng.random() < 0.5 else None,
+            "period_start": date(2025, 1, 1) if rng.random() < 0.1 else None,
+            "period_end": None,
+            "context_tags": rng.sample(TAGS, rng.randint(0, 3)),
+            "location": None,
+            "estimated_duration": timedelta(minutes=rng.choice([15, 30, 90])) if rng.random() < 0.7 else None,
+            "status": "pending",
+            "completed_at": None,
+            "blocked_by": [uuid.uuid4() for _ in range(rng.randint(0, 2))],
+            "priority": rng.randint(0, 3),
+            "extra_data": {"source": "bench", "score": rng.random(), "labels": ["a", "b"]},
+            "created_at": now - timedelta(seconds=i),
+            "updated_at": None,
+        })
+    return rows
+
+
+def default_path(entities: list) -> bytes:
+    page = EntityPage.model_validate({"entities": entities, "next_cursor": None})
+    return json.dumps(jsonable_encoder(page), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fast_path(rows: list) -> bytes:
+    return ORJSONResponse({"entities": rows, "next_cursor": None}).body
+
+
+def best_of(repeat: int, fn, arg) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        body = fn(arg)
+        timings.append(time.perf_counter() - began)
+    return min(timings), body
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entities", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(random.Random(args.seed), args.entities)
+    entities = [Entity(**row) for row in rows]
+    assert list(rows[0]) == list(EntityResponse.model_fields)
+
+    slow_s, slow_body = best_of(args.repeat, default_path, entities)
+    fast_s, fast_body = best_of(args.repeat, fast_path, rows)
+    if slow_body != fast_body:
+        print("MISMATCH: the two paths produced different JSON")
+        return 1
+
+    print(f"{args.entities} entities, {len(fast_body) / 1e6:.1f} MB")
+    print(f"  default (validate + jsonable_encoder): {slow_s * 1000:.0f} ms")
+    print(f"  fast (rows + orjson):                  {fast_s * 1000:.0f} ms")
+    print(f"  speedup {slow_s / fast_s:.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Benchmark the in-process vector index on a synthetic corpus.
+
+Embeds generated task-like texts with the hashing embedder (no database or
+network needed), then compares exact search against the IVF approximate
+search: recall@k of the approximate results and per-query latency.
+
+Usage:
+    python scripts/bench_vector_index.py [--sizes 10000 100000] [--queries 200] [--k 10] [--nprobe 8]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.embeddings import HashingEmbedder
+from app.services.vector_index import VectorIndex
+
+VERBS = ["call", "email", "buy", "fix", "plan", "review", "write", "book", "clean", "finish", "read", "pay"]
+OBJECTS = [
+    "dentist", "landlord", "groceries", "bike", "quarterly report", "flights", "garage", "thesis chapter",
+    "insurance", "birthday gift", "car service", "tax return", "team offsite", "gym membership", "blog post",
+]
+QUALIFIERS = ["before friday", "this weekend", "after work", "tomorrow morning", "for mum", "with alex", "asap", ""]
+
+
+def synthetic_texts(rng: random.Random, n: int) -> list:
+    return [
+        f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(QUALIFIERS)} {rng.choice(OBJECTS)} #{rng.randrange(n)}"
+        for _ in range(n)
+    ]
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def bench(size: int, args, embedder: HashingEmbedder, rng: random.Random) -> None:
+    texts = synthetic_texts(rng, size)
+    began = time.perf_counter()
+    vectors = embedder.embed(texts)
+    embed_s = time.perf_counter() - began
+
+    # Threshold 0 forces the IVF path regardless of size
+    index = VectorIndex(embedder.dim, ann_threshold=0, nprobe=args.nprobe)
+    began = time.perf_counter()
+    index.add(list(range(size)), vectors, [{} for _ in range(size)])
+    index.train()
+    build_s = time.perf_counter() - began
+
+    queries = embedder.embed(synthetic_texts(rng, args.queries))
+    exact_ms, ann_ms, recalls = [], [], []
+    for query in queries:
+        began = time.perf_counter()
+        truth = index.search(query, args.k, exact=True)
+        exact_ms.append((time.perf_counter() - began) * 1000)
+
+        began = time.perf_counter()
+        approx = index.search(query, args.k)
+        ann_ms.append((time.perf_counter() - began) * 1000)
+
+        recalls.append(len({key for key, _, _ in truth} & {key for key, _, _ in approx}) / args.k)
+
+    print(f"{size} vectors: embed {embed_s:.2f} s, add+train {build_s:.2f} s")
+    for name, timings in (("exact", exact_ms), ("ivf", ann_ms)):
+        print(
+            f"  {name:5} p50 {percentile(timings, 0.5):.2f} ms  p95 {percentile(timings, 0.95):.2f} ms"
+        )
+    print(f"  ivf recall@{args.k} {statistics.mean(recalls):.3f} (nprobe {args.nprobe})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    embedder = HashingEmbedder(args.dim)
+    for size in args.sizes:
+        bench(size, args, embedder, rng)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Check that EntityService queries are served by indexes.
+
+Seeds a synthetic dataset inside a transaction, ANALYZEs it, EXPLAINs every
+EntityService read query and asserts the target table is reached only
+through the indexes meant for that query shape, never a sequential scan. Everything is rolled back at the end,
+so it is safe to point at a development database.
+
+Usage:
+    python scripts/check_query_plans.py [--users 200] [--entities-per-user 250]
+"""
+import argparse
+import sys
+import uuid
+from pathlib import Path
+from typing import Sequence
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from app.database import engine
+from app.pagination import encode_cursor
+from app.services.entity_service import EntityService
+from app.services.search_service import SearchService
+
+INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+# Any of these serves a bare user_id = ... predicate; which one the planner
+# picks depends on the ANALYZE sample
+USER_ENTITY_INDEXES = (
+    "ix_entities_user_priority_created", "ix_entities_user_status_priority_created",
+    "ix_entities_user_type_priority_created", "ix_entities_user_search_vector",
+)
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) wrapper that keeps SQLAlchemy's bind handling"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+SEED_SQL = [
+    """
+    INSERT INTO users (id, email, password_hash)
+    SELECT gen_random_uuid(), 'plan-check-' || g || '@example.com', 'x'
+    FROM generate_series(1, :users) g
+    """,
+    """
+    INSERT INTO entities (id, user_id, entity_type, title, description, context_tags,
+                          status, priority, blocked_by, extra_data, created_at)
+    SELECT gen_random_uuid(), u.id,
+           (ARRAY['task','event','goal','milestone','note'])[1 + g % 5],
+           'Entity ' || g, 'Seeded entity ' || g,
+           ARRAY[(ARRAY['work','home','town','health','social','focus_required'])[1 + g % 6],
+                 (ARRAY['errand','call','email','deep','quick'])[1 + g % 5]],
+           (ARRAY['pending','active','completed','blocked','cancelled'])[1 + g % 5],
+           g % 4, '{}', '{}', now() - (g || ' minutes')::interval
+    FROM users u, generate_series(1, :per_user) g
+    WHERE u.email LIKE 'plan-check-%'
+    """,
+    """
+    INSERT INTO entity_relations (id, parent_id, child_id, relation_type)
+    SELECT gen_random_uuid(), p.id, c.id, 'subtask'
+    FROM (SELECT id, user_id, row_number() OVER (PARTITION BY user_id ORDER BY id) rn FROM entities) p
+    JOIN (SELECT id, user_id, row_number() OVER (PARTITION BY user_id ORDER BY id) rn FROM entities) c
+      ON c.user_id = p.user_id AND c.rn = p.rn + 1
+    """,
+    """
+    INSERT INTO context_windows (id, user_id, window_type, days_of_week, preferred_activities, extra_data)
+    SELECT gen_random_uuid(), u.id, 'work_hours', ARRAY[1,2,3,4,5], ARRAY['work'], '{}'
+    FROM users u, generate_series(1, 3) g
+    WHERE u.email LIKE 'plan-check-%'
+    """,
+    """
+    INSERT INTO messages (id, user_id, role, content, created_at)
+    SELECT gen_random_uuid(), u.id, (ARRAY['user','assistant'])[1 + g % 2],
+           'Message ' || g || ' about ' || (ARRAY['groceries','dentist','report','gym'])[1 + g % 4],
+           now() - (g || ' minutes')::interval
+    FROM users u, generate_series(1, :per_user) g
+    WHERE u.email LIKE 'plan-check-%'
+    """,
+]
+
+
+def _plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def _uses_expected_indexes(plan: dict, table: str, expected: Sequence[str]) -> bool:
+    scans = [
+        n for n in _plan_nodes(plan)
+        if n.get("Relation Name") == table or n.get("Index Name", "").startswith(("ix_" + table, table + "_"))
+    ]
+    seq = any(n["Node Type"] == "Seq Scan" for n in scans)
+    used = {n["Index Name"] for n in scans if n["Node Type"] in INDEX_NODES}
+    return not seq and bool(used) and used <= set(expected)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--entities-per-user", type=int, default=250)
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            for sql in SEED_SQL:
+                conn.execute(text(sql), {"users": args.users, "per_user": args.entities_per_user})
+            conn.execute(text("ANALYZE users, entities, entity_relations, context_windows, messages"))
+
+            user_id, entity_id, priority, created_at = conn.execute(text(
+                "SELECT e.user_id, e.id, e.priority, e.created_at FROM entities e "
+                "JOIN users u ON u.id = e.user_id WHERE u.email LIKE 'plan-check-%' LIMIT 1"
+            )).one()
+            cursor = encode_cursor(priority, created_at, entity_id)
+
+            checks = [
+                ("entities page", "entities", ["ix_entities_user_priority_created"],
+                 EntityService._user_entities_page_query(user_id, None, None, None, 50, None)),
+                ("entities page after cursor", "entities", ["ix_entities_user_priority_created"],
+                 EntityService._user_entities_page_query(user_id, None, None, None, 50, cursor)),
+                ("entities by status", "entities", ["ix_entities_user_status_priority_created"],
+                 EntityService._user_entities_page_query(user_id, None, None, "pending", 50, None)),
+                ("entities by type", "entities", ["ix_entities_user_type_priority_created"],
+                 EntityService._user_entities_page_query(user_id, "task", None, None, 50, None)),
+                # Tags are filtered within the user's rows
+                ("entities by context tag", "entities", USER_ENTITY_INDEXES,
+                 EntityService._user_entities_page_query(user_id, None, "health", None, 50, None)),
+                ("all entities with status", "entities", ["ix_entities_user_status_priority_created"],
+                 EntityService._user_entities_query(user_id, status="pending")),
+                ("entities overview", "entities", ["ix_entities_user_status_priority_created"],
+                 EntityService._overview_query(user_id, "pending", 5)),
+                ("entity by id", "entities", ["entities_pkey"],
+                 EntityService._entity_by_id_query(entity_id, user_id)),
+                ("entity relations", "entity_relations", ["ix_entity_relations_parent_id", "ix_entity_relations_child_id"],
+                 EntityService._entity_relations_query(entity_id)),
+                ("context windows", "context_windows", ["ix_context_windows_user_id"],
+                 EntityService._user_context_windows_query(user_id)),
+                ("entity search", "entities", ["ix_entities_user_search_vector"],
+                 SearchService._search_query(user_id, "entity 17", ["entities"], 20, None)),
+                ("message search", "messages", ["ix_messages_user_search_vector"],
+                 SearchService._search_query(user_id, "message 17", ["messages"], 20, None)),
+            ]
+
+            failures = 0
+            session = Session(bind=conn)
+            for name, table, expected, statement in checks:
+                plan = session.execute(Explain(statement)).scalar()[0]["Plan"]
+                ok = _uses_expected_indexes(plan, table, expected)
+                nodes = ", ".join(
+                    n["Node Type"] + (f" ({n['Index Name']})" if "Index Name" in n else "")
+                    for n in _plan_nodes(plan)
+                )
+                print(f"{'OK  ' if ok else 'FAIL'} {name}: {nodes}" + ("" if ok else f" (expected {', '.join(expected)})"))
+                failures += not ok
+        finally:
+            trans.rollback()
+
+    if failures:
+        print(f"{failures} queries are not using their expected indexes")
+        return 1
+    print("All queries use their expected indexes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,457 @@
+"""
+End-to-end HTTP load test against a local server with a stubbed LLM.
+
+Seeds users, entities and chat messages straight into the database, boots
+the app under uvicorn with llm_provider=fake (deterministic replies, tool
+calls and configurable latency, see app/agent/fake_llm.py), then drives a
+weighted mix of requests from concurrent virtual users and reports
+throughput and p50/p95/p99 latency per endpoint. Seeded users are deleted
+at the end unless --keep is given.
+
+Point it at an already running server with --base-url instead; it must use
+the same DATABASE_URL (for seeding) and, to keep chat turns cheap and
+deterministic, LLM_PROVIDER=fake. Run with a production-like environment:
+ENVIRONMENT=development echoes every SQL statement.
+
+Results can be saved and compared against a previous run:
+
+    python scripts/loadtest.py --duration 60 --save baseline.json
+    # ...change something...
+    python scripts/loadtest.py --duration 60 --compare baseline.json
+
+Usage:
+    python scripts/loadtest.py [--users 20] [--entities-per-user 200]
+        [--messages-per-user 50] [--concurrency 20] [--duration 30]
+        [--warmup 5] [--mix list=25,chat=5,...] [--llm-latency 0.5]
+        [--tool-call-ratio 0.5] [--workers 1] [--seed 0]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import httpx
+from sqlalchemy import delete, insert
+from app.database import SessionLocal
+from app.models import Entity, Message, User
+from app.passwords import hash_password
+
+PASSWORD = "loadtest-password"
+TAGS = ["work", "home", "town", "health", "social", "focus_required", "errand", "call"]
+WORDS = ["report", "dentist", "groceries", "gym", "invoice", "meeting", "plan", "review", "call", "email"]
+PROMPTS = [
+    "What should I work on now?",
+    "Add a task to call the dentist tomorrow",
+    "Plan my week around the report deadline",
+    "Search for anything about groceries",
+    "I finished the gym session, what's next?",
+    "Give me an overview of my tasks",
+    "Remind me to review the invoice",
+    "How is my progress on the meeting prep?",
+]
+
+DEFAULT_MIX = "list=25,get=15,create=8,update=8,delete=4,ready=8,search=8,history=10,me=5,login=2,chat=5,stream=2"
+
+
+@dataclass
+class VirtualUser:
+    email: str
+    entity_ids: List[str]
+    token: str = ""
+    created: List[str] = field(default_factory=list)
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+# Seeding
+
+def seed(run_id: str, users: int, entities_per_user: int, messages_per_user: int, rng: random.Random) -> List[VirtualUser]:
+    """Insert users with entities and message history; returns them with their entity ids"""
+    password_hash = hash_password(PASSWORD)  # bcrypt once, shared by every seeded user
+    now = datetime.now(timezone.utc)
+    seeded = []
+    with SessionLocal() as db:
+        for i in range(users):
+            user_id = uuid.uuid4()
+            email = f"loadtest-{run_id}-{i}@example.com"
+            db.execute(insert(User), [{"id": user_id, "email": email, "password_hash": password_hash, "name": f"Load {i}", "timezone": "UTC"}])
+
+            entities = [
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": user_id,
+                    "entity_type": rng.choice(["task", "task", "task", "event", "goal", "note"]),
+                    "title": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {j}",
+                    "description": f"Seeded {rng.choice(WORDS)} item" if rng.random() < 0.5 else None,
+                    "due_at": now + timedelta(hours=rng.randint(-48, 500)) if rng.random() < 0.5 else None,
+                    "context_tags": rng.sample(TAGS, rng.randint(0, 3)),
+                    "status": rng.choice(["pending"] * 6 + ["active", "completed", "blocked"]),
+                    "priority": rng.randint(0, 3),
+                    "blocked_by": [],
+                    "extra_data": {},
+                    "created_at": now - timedelta(minutes=j),
+                }
+                for j in range(entities_per_user)
+            ]
+            if entities:
+                db.execute(insert(Entity), entities)
+
+            messages = [
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": user_id,
+                    "role": "user" if j % 2 == 0 else "assistant",
+                    "content": rng.choice(PROMPTS) if j % 2 == 0 else f"Sure, let's look at the {rng.choice(WORDS)}.",
+                    "extra_data": {},
+                    "created_at": now - timedelta(minutes=messages_per_user - j),
+                }
+                for j in range(messages_per_user)
+            ]
+            if messages:
+                db.execute(insert(Message), messages)
+
+            seeded.append(VirtualUser(email=email, entity_ids=[str(e["id"]) for e in entities]))
+        db.commit()
+    return seeded
+
+
+def cleanup(run_id: str) -> None:
+    with SessionLocal() as db:
+        # Entities, messages and the rest go with the user (ON DELETE CASCADE)
+        db.execute(delete(User).where(User.email.like(f"loadtest-{run_id}-%")))
+        db.commit()
+
+
+# Server
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, workers: int, llm_latency: float, tool_call_ratio: float) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY": str(llm_latency),
+        "FAKE_LLM_TOOL_CALL_RATIO": str(tool_call_ratio),
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=Path(__file__).resolve().parents[1],
+        env=env,
+    )
+
+
+async def wait_healthy(base_url: str, server: Optional[subprocess.Popen], timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if server is not None and server.poll() is not None:
+                raise RuntimeError(f"server exited with code {server.returncode} during startup")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not become healthy within {timeout:.0f}s")
+
+
+# Workload
+
+async def op_login(client, user, rng):
+    r = await client.post("/api/v1/auth/login", json={"email": user.email, "password": PASSWORD})
+    if r.status_code == 200:
+        user.token = r.json()["access_token"]
+    return "POST /auth/login", r
+
+
+async def op_me(client, user, rng):
+    return "GET /auth/me", await client.get("/api/v1/auth/me", headers=user.headers)
+
+
+async def op_list(client, user, rng):
+    params = {"limit": 50}
+    if rng.random() < 0.3:
+        params["context_tag"] = rng.choice(TAGS)
+    return "GET /entities", await client.get("/api/v1/entities", headers=user.headers, params=params)
+
+
+async def op_get(client, user, rng):
+    entity_id = rng.choice(user.entity_ids)
+    return "GET /entities/{id}", await client.get(f"/api/v1/entities/{entity_id}", headers=user.headers)
+
+
+async def op_create(client, user, rng):
+    body = {
+        "entity_type": "task",
+        "title": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)}",
+        "context_tags": rng.sample(TAGS, 2),
+        "priority": rng.randint(0, 3),
+    }
+    r = await client.post("/api/v1/entities", headers=user.headers, json=body)
+    if r.status_code == 201:
+        user.created.append(r.json()["id"])
+    return "POST /entities", r
+
+
+async def op_update(client, user, rng):
+    entity_id = rng.choice(user.created or user.entity_ids)
+    body = {"priority": rng.randint(0, 3)}
+    return "PUT /entities/{id}", await client.put(f"/api/v1/entities/{entity_id}", headers=user.headers, json=body)
+
+
+async def op_delete(client, user, rng):
+    # Only entities this run created, so seeded ones stay valid for get/update
+    if not user.created:
+        return await op_create(client, user, rng)
+    entity_id = user.created.pop(rng.randrange(len(user.created)))
+    return "DELETE /entities/{id}", await client.delete(f"/api/v1/entities/{entity_id}", headers=user.headers)
+
+
+async def op_ready(client, user, rng):
+    return "GET /entities/ready", await client.get("/api/v1/entities/ready", headers=user.headers)
+
+
+async def op_search(client, user, rng):
+    return "GET /search", await client.get("/api/v1/search", headers=user.headers, params={"q": rng.choice(WORDS)})
+
+
+async def op_history(client, user, rng):
+    return "GET /chat/history", await client.get("/api/v1/chat/history", headers=user.headers, params={"limit": 50})
+
+
+async def op_chat(client, user, rng):
+    return "POST /chat", await client.post("/api/v1/chat", headers=user.headers, json={"message": rng.choice(PROMPTS)})
+
+
+async def op_stream(client, user, rng):
+    # The body is read in full, so this is time to the last event
+    return "POST /chat/stream", await client.post("/api/v1/chat/stream", headers=user.headers, json={"message": rng.choice(PROMPTS)})
+
+
+OPERATIONS = {
+    "login": op_login, "me": op_me, "list": op_list, "get": op_get, "create": op_create,
+    "update": op_update, "delete": op_delete, "ready": op_ready, "search": op_search,
+    "history": op_history, "chat": op_chat, "stream": op_stream,
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise SystemExit(f"unknown operation in --mix: {name} (choose from {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.recording = False
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def record(self, endpoint: str, ms: float, ok: bool) -> None:
+        if not self.recording:
+            return
+        self.latencies[endpoint].append(ms)
+        if not ok:
+            self.errors[endpoint] += 1
+
+
+async def virtual_user(client, users, mix, rng, recorder, deadline) -> None:
+    names, weights = list(mix), list(mix.values())
+    while time.monotonic() < deadline:
+        user = rng.choice(users)
+        operation = OPERATIONS[rng.choices(names, weights)[0]]
+        began = time.perf_counter()
+        try:
+            endpoint, response = await operation(client, user, rng)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            endpoint, ok = operation.__name__, False
+        recorder.record(endpoint, (time.perf_counter() - began) * 1000, ok)
+
+
+async def drive(base_url: str, users: List[VirtualUser], args) -> Recorder:
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    recorder = Recorder()
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        # Everyone logs in once up front (bcrypt), outside the measurement
+        for user in users:
+            _, response = await op_login(client, user, None)
+            response.raise_for_status()
+
+        loop_start = time.monotonic()
+        deadline = loop_start + args.warmup + args.duration
+        rngs = [random.Random(args.seed * 1000 + i) for i in range(args.concurrency)]
+        tasks = [asyncio.create_task(virtual_user(client, users, mix, rng, recorder, deadline)) for rng in rngs]
+
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+        recorder.started = time.monotonic()
+        await asyncio.gather(*tasks)
+        recorder.elapsed = time.monotonic() - recorder.started
+    return recorder
+
+
+# Reporting
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(values: List[float], errors: int, elapsed: float) -> dict:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "rps": len(values) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(values) / len(values) if values else 0.0,
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1] if values else 0.0,
+    }
+
+
+def build_report(recorder: Recorder, args) -> dict:
+    endpoints = {
+        endpoint: summarize(values, recorder.errors[endpoint], recorder.elapsed)
+        for endpoint, values in sorted(recorder.latencies.items())
+    }
+    everything = [ms for values in recorder.latencies.values() for ms in values]
+    return {
+        "config": {
+            "users": args.users, "entities_per_user": args.entities_per_user,
+            "messages_per_user": args.messages_per_user, "concurrency": args.concurrency,
+            "duration": args.duration, "mix": args.mix, "llm_latency": args.llm_latency,
+            "tool_call_ratio": args.tool_call_ratio, "workers": args.workers, "seed": args.seed,
+        },
+        "elapsed_s": recorder.elapsed,
+        "total": summarize(everything, sum(recorder.errors.values()), recorder.elapsed),
+        "endpoints": endpoints,
+    }
+
+
+def print_report(report: dict, baseline: Optional[dict]) -> None:
+    header = f"{'endpoint':<24}{'count':>8}{'err':>6}{'rps':>9}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["total"])]
+    for endpoint, s in rows:
+        print(
+            f"{endpoint:<24}{s['count']:>8}{s['errors']:>6}{s['rps']:>9.1f}{s['mean_ms']:>9.1f}"
+            f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}"
+        )
+    print("(latencies in ms)")
+
+    if baseline is None:
+        return
+    if baseline.get("config") != report["config"]:
+        print("\nnote: baseline was run with a different configuration")
+    print(f"\n{'vs baseline':<24}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    base_rows = {**baseline["endpoints"], "TOTAL": baseline["total"]}
+
+    def delta(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    for endpoint, s in rows:
+        b = base_rows.get(endpoint)
+        if b is None:
+            print(f"{endpoint:<24}{'(new)':>10}")
+            continue
+        print(
+            f"{endpoint:<24}{delta(s['rps'], b['rps']):>10}{delta(s['p50_ms'], b['p50_ms']):>10}"
+            f"{delta(s['p95_ms'], b['p95_ms']):>10}{delta(s['p99_ms'], b['p99_ms']):>10}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="Target a running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--entities-per-user", type=int, default=200)
+    parser.add_argument("--messages-per-user", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before that")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Operation weights, name=weight,...")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fake LLM seconds per call")
+    parser.add_argument("--tool-call-ratio", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Write the report as JSON")
+    parser.add_argument("--compare", help="JSON report of a previous run to compare against")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded users")
+    args = parser.parse_args()
+    parse_mix(args.mix)  # Fail on a bad mix before seeding
+
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    rng = random.Random(args.seed)
+    run_id = uuid.uuid4().hex[:8]
+
+    began = time.perf_counter()
+    users = seed(run_id, args.users, args.entities_per_user, args.messages_per_user, rng)
+    print(f"seeded {args.users} users x {args.entities_per_user} entities, {args.messages_per_user} messages "
+          f"in {time.perf_counter() - began:.1f}s (run {run_id})")
+
+    server = None
+    try:
+        base_url = args.base_url
+        if base_url is None:
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            server = start_server(port, args.workers, args.llm_latency, args.tool_call_ratio)
+        asyncio.run(wait_healthy(base_url, server))
+
+        print(f"driving {base_url}: {args.concurrency} virtual users, {args.warmup:.0f}s warm-up + {args.duration:.0f}s")
+        recorder = asyncio.run(drive(base_url, users, args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        if not args.keep:
+            cleanup(run_id)
+
+    report = build_report(recorder, args)
+    print()
+    print_report(report, baseline)
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2))
+        print(f"\nsaved {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
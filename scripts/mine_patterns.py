@@ -0,0 +1,84 @@
+"""
+Mine UserPatterns from completed entities.
+
+Users are read in keyset-ordered chunks and handed to a process pool; each
+worker folds the chunk's queued pattern_events (completions, and retractions
+of edited, un-completed or deleted ones) into the users' pattern statistics
+and upserts user_patterns. Only a bounded
+number of chunks is in flight, so memory stays flat however many users
+there are.
+
+Usage:
+    python scripts/mine_patterns.py [--workers N] [--chunk-size 500] [--page-size 5000] [--full]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import select
+from app.database import engine, SessionLocal
+from app.models import User
+from app.services.pattern_mining import mine_users
+
+
+def _init_worker():
+    # Don't reuse connections inherited from the parent process
+    engine.dispose(close=False)
+
+
+def _mine_chunk(users, page_size: int, full: bool) -> int:
+    with SessionLocal() as db:
+        return mine_users(db, users, page_size=page_size, full=full)
+
+
+def _user_chunks(chunk_size: int):
+    last_id = None
+    with SessionLocal() as db:
+        while True:
+            query = select(User.id, User.timezone).order_by(User.id).limit(chunk_size)
+            if last_id is not None:
+                query = query.where(User.id > last_id)
+            chunk = [tuple(row) for row in db.execute(query)]
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1][0]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=500, help="Users per task")
+    parser.add_argument("--page-size", type=int, default=5000, help="Rows fetched per round trip")
+    parser.add_argument("--full", action="store_true", help="Ignore stored statistics and rebuild from all completed entities")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    users = updated = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+        pending = {}
+        for chunk in _user_chunks(args.chunk_size):
+            # Backpressure: at most two chunks per worker in flight
+            while len(pending) >= args.workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    updated += future.result()
+                    users += pending.pop(future)
+            pending[pool.submit(_mine_chunk, chunk, args.page_size, args.full)] = len(chunk)
+
+        for future in wait(pending).done:
+            updated += future.result()
+            users += pending[future]
+
+    print(f"{users} users scanned, {updated} updated in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Shared fixtures. The tests run against the database in DATABASE_URL (with
+migrations applied); every user they create is deleted afterwards, which
+cascades to everything the user owns.
+"""
+import uuid
+import pytest
+from sqlalchemy import delete, text
+from app.database import SessionLocal, engine, async_engine
+from app.models import User
+from app.passwords import hash_password
+from app.sql_profiler import assert_max_queries
+
+PASSWORD = "test-password"
+
+
+def _database_available() -> bool:
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
+if not _database_available():
+    pytest.skip("DATABASE_URL is not reachable", allow_module_level=True)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def dispose_async_engine(anyio_backend):
+    """Close pooled asyncpg connections, which belong to this test's event loop"""
+    yield
+    await async_engine.dispose()
+
+
+@pytest.fixture
+def make_user():
+    """Factory inserting users (password PASSWORD); all are removed at teardown"""
+    created = []
+    password_hash = hash_password(PASSWORD)
+
+    def make(**fields) -> User:
+        user_id = uuid.uuid4()
+        with SessionLocal() as db:
+            user = User(id=user_id, email=f"test-{user_id.hex[:12]}@example.com", password_hash=password_hash, **fields)
+            db.add(user)
+            db.commit()
+            db.refresh(user)
+            db.expunge(user)
+        created.append(user_id)
+        return user
+
+    yield make
+    with SessionLocal() as db:
+        db.execute(delete(User).where(User.id.in_(created)))
+        db.commit()
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+        # Pooled asyncpg connections belong to the client's event loop
+        test_client.portal.call(async_engine.dispose)
+
+
+@pytest.fixture
+def login(client):
+    """Log a user in through /auth/login; returns its Authorization headers"""
+    def login_as(user: User) -> dict:
+        response = client.post("/api/v1/auth/login", json={"email": user.email, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return login_as
+
+
+@pytest.fixture
+def auth_headers(login, make_user):
+    """Authorization headers of a fresh user"""
+    return login(make_user())
+
+
+@pytest.fixture
+def max_queries():
+    """
+    The SQL profiler's query budget assertion:
+
+        def test_listing(client, auth_headers, max_queries):
+            with max_queries(2):
+                client.get("/api/v1/entities", headers=auth_headers)
+    """
+    return assert_max_queries
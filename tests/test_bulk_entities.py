@@ -0,0 +1,19 @@
+"""Bulk entity endpoints"""
+
+
+def test_bulk_update_requires_changes(client, auth_headers):
+    created = client.post("/api/v1/entities/bulk", headers=auth_headers, json={"entities": [
+        {"entity_type": "task", "title": f"task {i}"} for i in range(3)
+    ]}).json()
+    ids = [entity["id"] for entity in created]
+    etag = client.get("/api/v1/entities", headers=auth_headers).headers["etag"]
+
+    response = client.patch("/api/v1/entities/bulk", headers=auth_headers, json={"ids": ids, "changes": {}})
+    assert response.status_code == 422
+    unchanged = client.get("/api/v1/entities", headers={**auth_headers, "If-None-Match": etag})
+    assert unchanged.status_code == 304
+
+    response = client.patch("/api/v1/entities/bulk", headers=auth_headers, json={"ids": ids, "changes": {"status": "completed"}})
+    assert response.status_code == 200
+    assert all(e["status"] == "completed" and e["completed_at"] for e in response.json())
+    assert client.get("/api/v1/entities", headers={**auth_headers, "If-None-Match": etag}).status_code == 200
@@ -0,0 +1,73 @@
+"""Dependency graph cache consistency and blocked_by validation"""
+from app.database import SessionLocal
+from app.schemas.entity import EntityCreate
+from app.services.dependency_graph import DependencyIndex, dependency_index
+from app.services.entity_service import EntityService
+
+
+def _create(db, user_id, title, **fields):
+    return EntityService.create_entity(db, user_id, EntityCreate(entity_type="task", title=title, **fields))
+
+
+def test_write_during_graph_load_is_not_lost(make_user, monkeypatch):
+    user = make_user()
+    dependency_index.invalidate(user.id)
+    original_build = DependencyIndex._build
+    written = []
+
+    def build_after_concurrent_write(self, user_id, build, entity_rows, relation_rows):
+        # Another request commits once this load has read its rows
+        if not written:
+            with SessionLocal() as other:
+                written.append(_create(other, user_id, "written mid-load").id)
+        return original_build(self, user_id, build, entity_rows, relation_rows)
+
+    monkeypatch.setattr(DependencyIndex, "_build", build_after_concurrent_write)
+    with SessionLocal() as db:
+        _create(db, user.id, "existing")
+        dependency_index.invalidate(user.id)
+        dependency_index.get(db, user.id)
+        monkeypatch.undo()
+
+        graph = dependency_index.get(db, user.id)
+        with graph.lock:
+            assert written[0] in graph.ready
+        assert written[0] in {e.id for e in EntityService.get_ready_entities(db, user.id)}
+
+
+def test_blocked_by_must_be_own_entities(make_user, client, login):
+    owner, other = make_user(), make_user()
+    with SessionLocal() as db:
+        foreign = _create(db, other.id, "someone else's")
+    headers = login(owner)
+
+    response = client.post("/api/v1/entities", headers=headers, json={
+        "entity_type": "task", "title": "sneaky", "blocked_by": [str(foreign.id)]
+    })
+    assert response.status_code == 409
+    response = client.post("/api/v1/entities/bulk", headers=headers, json={"entities": [
+        {"entity_type": "task", "title": "sneaky", "blocked_by": [str(foreign.id)]}
+    ]})
+    assert response.status_code == 409
+
+
+def test_blocked_by_cycles_are_rejected(make_user, client, login):
+    headers = login(make_user())
+    first = client.post("/api/v1/entities", headers=headers, json={"entity_type": "task", "title": "first"}).json()
+    second = client.post("/api/v1/entities", headers=headers, json={
+        "entity_type": "task", "title": "second", "blocked_by": [first["id"]]
+    })
+    assert second.status_code == 201
+    second = second.json()
+
+    for body in ({"blocked_by": [second["id"]]}, {"blocked_by": [first["id"]]}):
+        response = client.put(f"/api/v1/entities/{first['id']}", headers=headers, json=body)
+        assert response.status_code == 409, body
+    response = client.patch("/api/v1/entities/bulk", headers=headers, json={
+        "ids": [first["id"]], "changes": {"blocked_by": [second["id"]]}
+    })
+    assert response.status_code == 409
+
+    # Clearing blocked_by is always allowed
+    response = client.put(f"/api/v1/entities/{second['id']}", headers=headers, json={"blocked_by": []})
+    assert response.status_code == 200
@@ -0,0 +1,53 @@
+"""The entities overview costs one query, with a row count independent of how many entities there are"""
+from sqlalchemy import insert
+from app.database import SessionLocal, engine
+from app.models import Entity
+from app.services.entity_cache import entity_cache
+from app.services.entity_service import EntityService
+from app import sql_profiler
+
+TAGS = ["home", "work", "errands", "calls"]
+PER_TAG = 5
+
+
+def _add_entities(user_id, count: int, offset: int = 0) -> None:
+    with SessionLocal() as db:
+        db.execute(insert(Entity), [
+            {
+                "user_id": user_id,
+                "entity_type": "task",
+                "title": f"task {offset + i}",
+                "context_tags": [TAGS[i % len(TAGS)], TAGS[(i + 1) % len(TAGS)]],
+                "priority": i % 4,
+                "status": "pending",
+            }
+            for i in range(count)
+        ])
+        db.commit()
+
+
+def _measure(user_id):
+    with SessionLocal() as db, sql_profiler.profile() as profile:
+        overview = EntityService.get_entities_overview(db, user_id, per_tag=PER_TAG)
+    with SessionLocal() as db:
+        rows = db.execute(EntityService._overview_query(user_id, "pending", PER_TAG)).all()
+    return overview, profile.count, len(rows)
+
+
+def test_overview_is_one_query_and_bounded_rows(make_user, monkeypatch):
+    monkeypatch.setattr(entity_cache, "enabled", False)
+    sql_profiler.install(engine)
+    user = make_user()
+
+    _add_entities(user.id, 40)
+    small, small_queries, small_rows = _measure(user.id)
+
+    _add_entities(user.id, 2000, offset=40)
+    large, large_queries, large_rows = _measure(user.id)
+
+    assert small_queries == large_queries == 1
+    assert small_rows == large_rows == len(TAGS) * PER_TAG
+    assert {group["tag"] for group in large} == set(TAGS)
+    # Every task carries two of the four tags, so each tag counts half of them
+    assert all(group["count"] == 2040 // 2 for group in large)
+    assert all(len(group["titles"]) == PER_TAG for group in small + large)
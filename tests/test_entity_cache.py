@@ -0,0 +1,35 @@
+"""Entity listings served from the shared cache tier"""
+import orjson
+from app.cache import LocalCacheBackend, TTLCache
+from app.services.entity_cache import entity_cache
+
+
+class RecordingBackend(LocalCacheBackend):
+    def __init__(self):
+        super().__init__()
+        self.blobs = []
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.blobs.append(value)
+        super().set(key, value, ttl)
+
+
+def test_shared_tier_stores_json_and_serves_identical_pages(client, auth_headers, monkeypatch):
+    backend = RecordingBackend()
+    monkeypatch.setattr(entity_cache, "enabled", True)
+    monkeypatch.setattr(entity_cache, "backend", backend)
+    created = client.post("/api/v1/entities", headers=auth_headers, json={
+        "entity_type": "task", "title": "cached", "context_tags": ["home"],
+        "due_at": "2030-01-02T03:04:05Z", "estimated_duration": "1h 30m",
+    })
+    assert created.status_code == 201
+
+    loaded = client.get("/api/v1/entities", headers=auth_headers)
+    assert backend.blobs and all(orjson.loads(blob) for blob in backend.blobs)
+
+    # A worker without the page in its own tier gets it from the shared one
+    monkeypatch.setattr(entity_cache, "_local", TTLCache(maxsize=10, ttl=entity_cache.ttl))
+    hits = entity_cache.shared_hits
+    shared = client.get("/api/v1/entities", headers=auth_headers)
+    assert entity_cache.shared_hits == hits + 1
+    assert shared.content == loaded.content
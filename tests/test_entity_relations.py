@@ -0,0 +1,21 @@
+"""Relation routes only expose the caller's own entities"""
+
+
+def test_relations_of_another_users_entity_are_not_found(client, auth_headers, login, make_user):
+    created = client.post("/api/v1/entities/bulk", headers=auth_headers, json={"entities": [
+        {"entity_type": "goal", "title": "Run a marathon"},
+        {"entity_type": "task", "title": "Buy running shoes"},
+    ]}).json()
+    parent, child = (entity["id"] for entity in created)
+    response = client.post("/api/v1/entities/relations", headers=auth_headers, json={
+        "parent_id": parent, "child_id": child, "relation_type": "subtask"
+    })
+    assert response.status_code == 201
+
+    own = client.get(f"/api/v1/entities/{parent}/relations", headers=auth_headers)
+    assert own.status_code == 200
+    assert [(r["parent_id"], r["child_id"]) for r in own.json()] == [(parent, child)]
+
+    other_headers = login(make_user())
+    for path in (f"/api/v1/entities/{parent}/relations", f"/api/v1/entities/{parent}/graph"):
+        assert client.get(path, headers=other_headers).status_code == 404
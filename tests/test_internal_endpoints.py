@@ -0,0 +1,28 @@
+"""Operator endpoints are closed unless an internal token is configured"""
+import pytest
+from app.config import settings
+
+PATHS = ["/internal/pool", "/metrics"]
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_hidden_without_token(client, monkeypatch, path):
+    monkeypatch.setattr(settings, "internal_token", "")
+    assert client.get(path).status_code == 404
+    assert client.get(path, headers={"X-Internal-Token": ""}).status_code == 404
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_token_required(client, monkeypatch, path):
+    monkeypatch.setattr(settings, "internal_token", "s3cret")
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={"X-Internal-Token": "wrong"}).status_code == 403
+    assert client.get(path, headers={"X-Internal-Token": "s3cret"}).status_code == 200
+
+
+def test_metrics_exposition(client, monkeypatch):
+    monkeypatch.setattr(settings, "internal_token", "s3cret")
+    client.get("/health")
+    response = client.get("/metrics", headers={"X-Internal-Token": "s3cret"})
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "http_request_duration_seconds_count" in response.text
@@ -0,0 +1,120 @@
+"""Incremental pattern mining matches mining all history from scratch"""
+import random
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, select, update, delete, func
+from app.database import SessionLocal
+from app.models import Entity, PatternEvent, UserPattern
+from app.services.pattern_mining import PatternAccumulator, _completed_entities_query, mine_users
+
+TZ = "Europe/Berlin"
+TAGS = ["home", "work", "focus_required", "calls", "town"]
+START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def _rounded(value):
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, dict):
+        return {k: _rounded(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_rounded(v) for v in value]
+    return value
+
+
+def _completed_rows(rng, user_id, count):
+    rows = []
+    for _ in range(count):
+        completed_at = START + timedelta(hours=rng.randrange(24 * 60), minutes=rng.randrange(60))
+        rows.append({
+            "user_id": user_id, "entity_type": "task", "title": "t", "status": "completed",
+            "completed_at": completed_at,
+            "scheduled_at": completed_at - timedelta(minutes=rng.randrange(10, 240)) if rng.random() < 0.6 else None,
+            "due_at": completed_at + timedelta(hours=rng.randrange(-48, 48)) if rng.random() < 0.7 else None,
+            "estimated_duration": timedelta(minutes=rng.choice([15, 30, 60, 90])) if rng.random() < 0.7 else None,
+            "context_tags": rng.sample(TAGS, rng.randrange(len(TAGS))),
+            "extra_data": {"actual_minutes": rng.randrange(5, 120)} if rng.random() < 0.3 else {},
+        })
+    return rows
+
+
+def _mine(user_id):
+    with SessionLocal() as db:
+        mine_users(db, [(user_id, TZ)])
+
+
+def _assert_matches_scratch(user_id):
+    with SessionLocal() as db:
+        stored = {
+            p.pattern_type: (p.pattern_data, p.confidence_score)
+            for p in db.scalars(select(UserPattern).where(UserPattern.user_id == user_id))
+        }
+        scratch = PatternAccumulator(TZ)
+        scratch.add(db.execute(_completed_entities_query([user_id])).all())
+        assert db.scalar(select(func.count()).select_from(PatternEvent).where(PatternEvent.user_id == user_id)) == 0
+    assert _rounded(stored) == _rounded(scratch.patterns())
+
+
+def test_incremental_mining_matches_scratch(make_user):
+    rng = random.Random(7)
+    user = make_user(timezone=TZ)
+    with SessionLocal() as db:
+        db.execute(insert(Entity), _completed_rows(rng, user.id, 40) + [
+            {"user_id": user.id, "entity_type": "task", "title": "open", "status": "pending", "context_tags": ["home"]},
+            # Not a number: counts as missing rather than failing the write
+            {**_completed_rows(rng, user.id, 1)[0], "extra_data": {"actual_minutes": "a while"}},
+        ])
+        db.commit()
+    _mine(user.id)
+    _assert_matches_scratch(user.id)
+
+    # A completion that commits after a run which started later than its completed_at
+    with SessionLocal() as late:
+        late.execute(
+            update(Entity).where(Entity.user_id == user.id, Entity.status == "pending")
+            .values(status="completed", completed_at=START, context_tags=["home", "late_tag"])
+        )
+        _mine(user.id)
+        late.commit()
+    _mine(user.id)
+    _assert_matches_scratch(user.id)
+
+    with SessionLocal() as db:
+        ids = db.scalars(select(Entity.id).where(Entity.user_id == user.id).order_by(Entity.id)).all()
+        # Backdated, re-tagged, un-completed and deleted completions, and an old one inserted now
+        db.execute(update(Entity).where(Entity.id == ids[0]).values(completed_at=START - timedelta(days=30)))
+        db.execute(update(Entity).where(Entity.id == ids[1]).values(context_tags=["brand_new"], due_at=None))
+        db.execute(update(Entity).where(Entity.id.in_(ids[2:6])).values(status="pending", completed_at=None))
+        db.execute(delete(Entity).where(Entity.id.in_(ids[6:10])))
+        db.execute(update(Entity).where(Entity.id == ids[10]).values(title="renamed"))
+        db.execute(insert(Entity), _completed_rows(rng, user.id, 5))
+        db.commit()
+    _mine(user.id)
+    _assert_matches_scratch(user.id)
+
+    # Un-completing everything leaves empty patterns, not stale ones
+    with SessionLocal() as db:
+        db.execute(update(Entity).where(Entity.user_id == user.id).values(status="pending", completed_at=None))
+        db.commit()
+    _mine(user.id)
+    _assert_matches_scratch(user.id)
+    with SessionLocal() as db:
+        completion = db.scalar(select(UserPattern.pattern_data).where(
+            UserPattern.user_id == user.id, UserPattern.pattern_type == "completion_time"
+        ))
+    assert completion["completed"] == 0 and completion["stats"]["hours"] == [0] * 24
+
+
+def test_full_rebuild_matches_incremental(make_user):
+    rng = random.Random(11)
+    user = make_user(timezone=TZ)
+    with SessionLocal() as db:
+        db.execute(insert(Entity), _completed_rows(rng, user.id, 30))
+        db.commit()
+    _mine(user.id)
+    with SessionLocal() as db:
+        incremental = {p.pattern_type: p.pattern_data for p in db.scalars(select(UserPattern).where(UserPattern.user_id == user.id))}
+        mine_users(db, [(user.id, TZ)], page_size=7, full=True)
+    with SessionLocal() as db:
+        rebuilt = {p.pattern_type: p.pattern_data for p in db.scalars(select(UserPattern).where(UserPattern.user_id == user.id))}
+    assert _rounded(rebuilt) == _rounded(incremental)
+    _assert_matches_scratch(user.id)
@@ -0,0 +1,72 @@
+"""Query budgets of the hot endpoints: a fixed number of statements however much data the user has"""
+import uuid
+import pytest
+from sqlalchemy import insert
+from app.database import SessionLocal
+from app.models import Message, User
+from app.sql_profiler import PROFILE_HEADER
+
+ENTITIES = 30
+
+
+@pytest.fixture
+def seeded(client, auth_headers):
+    """A user with ENTITIES tasks, a chain of subtask relations and a chat history"""
+    user_id = uuid.UUID(client.get("/api/v1/auth/me", headers=auth_headers).json()["id"])
+    created = client.post("/api/v1/entities/bulk", headers=auth_headers, json={"entities": [
+        {"entity_type": "task", "title": f"write report part {i}", "context_tags": ["work"]}
+        for i in range(ENTITIES)
+    ]})
+    assert created.status_code == 201, created.text
+    ids = [entity["id"] for entity in created.json()]
+    for parent, child in zip(ids, ids[1:]):
+        response = client.post("/api/v1/entities/relations", headers=auth_headers, json={
+            "parent_id": parent, "child_id": child, "relation_type": "subtask"
+        })
+        assert response.status_code == 201, response.text
+    with SessionLocal() as db:
+        db.execute(insert(Message), [
+            {"user_id": user_id, "role": "user" if i % 2 == 0 else "assistant", "content": f"report progress {i}"}
+            for i in range(ENTITIES)
+        ])
+        db.commit()
+    return ids
+
+
+@pytest.mark.parametrize("path, budget", [
+    ("/api/v1/entities?limit=50", 2),
+    ("/api/v1/entities/ready", 1),
+    ("/api/v1/entities/context-windows", 2),
+    ("/api/v1/chat/history?limit=50", 2),
+    ("/api/v1/search?q=report", 1),
+])
+def test_listing_budgets(client, auth_headers, seeded, max_queries, path, budget):
+    with max_queries(budget, max_repeats=1) as requests:
+        response = client.get(path, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert [endpoint for endpoint, _ in requests] == [f"GET {path.split('?')[0]}"]
+
+
+def test_entity_routes_budgets(client, auth_headers, seeded, max_queries):
+    entity_id = seeded[0]
+    with max_queries(2, max_repeats=1):
+        assert client.get(f"/api/v1/entities/{entity_id}", headers=auth_headers).status_code == 200
+        assert client.get(f"/api/v1/entities/{entity_id}/relations", headers=auth_headers).status_code == 200
+        graph = client.get(f"/api/v1/entities/{entity_id}/graph?depth=20", headers=auth_headers)
+    assert graph.status_code == 200
+    assert len(graph.json()["nodes"]) == min(ENTITIES, 21)
+
+
+def test_profile_header_is_added(client, auth_headers, max_queries):
+    with max_queries(10):
+        response = client.get("/api/v1/entities", headers=auth_headers)
+    assert response.headers[PROFILE_HEADER].startswith("queries=")
+
+
+def test_lazy_loading_loop_is_caught(make_user, max_queries):
+    users = [make_user() for _ in range(5)]
+    with pytest.raises(AssertionError, match="Query budget exceeded"):
+        with max_queries(10, max_repeats=2):
+            with SessionLocal() as db:
+                for user in db.query(User).filter(User.id.in_([u.id for u in users])):
+                    len(user.entities)
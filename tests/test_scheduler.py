@@ -0,0 +1,25 @@
+"""Schedule planning from the async API"""
+import threading
+from datetime import timedelta
+import pytest
+from app.database import AsyncSessionLocal
+from app.services.scheduler import ScheduleService
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_aplan_packs_off_the_event_loop(make_user, dispose_async_engine, monkeypatch):
+    user = make_user()
+    original_plan = ScheduleService._plan
+    threads = []
+
+    def recording_plan(*args):
+        threads.append(threading.get_ident())
+        return original_plan(*args)
+
+    monkeypatch.setattr(ScheduleService, "_plan", staticmethod(recording_plan))
+    async with AsyncSessionLocal() as db:
+        plan = await ScheduleService.aplan(db, user.id, "UTC", None, 7, ["task"], timedelta(minutes=30), ready_only=True)
+
+    assert threads and threads[0] != threading.get_ident()
+    assert "start" in plan and "end" in plan
@@ -0,0 +1,116 @@
+"""Concurrent agent runs in one worker never see each other's session or user"""
+import asyncio
+import random
+from typing import Any, List
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from sqlalchemy import insert
+from app.agent.mentor import create_mentor_agent
+from app.agent.tools import agent_config
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models import Entity
+
+pytestmark = pytest.mark.anyio
+
+USERS = 8
+RUNS_PER_USER = 25
+
+
+class OverviewModel(BaseChatModel):
+    """Calls get_entities_overview, then replies with the tool output verbatim; sleeps randomly to interleave runs"""
+
+    @property
+    def _llm_type(self) -> str:
+        return "overview-test"
+
+    def bind_tools(self, tools, **kwargs: Any) -> "OverviewModel":
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(random.uniform(0, 0.01))
+        last = messages[-1]
+        if isinstance(last, ToolMessage):
+            message = AIMessage(content=str(last.content))
+        else:
+            message = AIMessage(content="", tool_calls=[
+                {"name": "get_entities_overview", "args": {}, "id": f"call_{id(messages)}", "type": "tool_call"}
+            ])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class ParallelToolsModel(BaseChatModel):
+    """Asks for several tools in one AI message, which ToolNode runs concurrently, then stops"""
+
+    @property
+    def _llm_type(self) -> str:
+        return "parallel-tools-test"
+
+    def bind_tools(self, tools, **kwargs: Any) -> "ParallelToolsModel":
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if isinstance(messages[-1], ToolMessage):
+            message = AIMessage(content="done")
+        else:
+            calls = [("get_ready_tasks", {}), ("search", {"query": "marker"}), ("get_entities_overview", {}), ("search", {"query": "home"})]
+            message = AIMessage(content="", tool_calls=[
+                {"name": name, "args": args, "id": f"call_{i}", "type": "tool_call"} for i, (name, args) in enumerate(calls)
+            ])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+async def test_concurrent_runs_only_see_their_own_user(make_user, dispose_async_engine):
+    users = [make_user() for _ in range(USERS)]
+    markers = {user.id: f"marker-{user.id.hex[:10]}" for user in users}
+    with SessionLocal() as db:
+        db.execute(insert(Entity), [
+            {"user_id": user.id, "entity_type": "task", "title": markers[user.id], "context_tags": ["home"], "status": "pending"}
+            for user in users
+        ])
+        db.commit()
+
+    agent = create_mentor_agent(OverviewModel())
+
+    async def run(user_id):
+        # One session per run, as chat_with_mentor opens one per request
+        async with AsyncSessionLocal() as db:
+            result = await agent.ainvoke({"messages": [("user", "overview please")]}, agent_config(db, user_id))
+        return user_id, result["messages"][-1].content
+
+    runs = [user.id for user in users] * RUNS_PER_USER
+    random.shuffle(runs)
+    results = await asyncio.gather(*(run(user_id) for user_id in runs))
+
+    for user_id, reply in results:
+        assert markers[user_id] in reply
+        leaked = [m for other, m in markers.items() if other != user_id and m in reply]
+        assert not leaked, f"run for {user_id} saw {leaked}"
+
+
+async def test_parallel_tool_calls_share_the_run_session(make_user, dispose_async_engine):
+    user = make_user()
+    with SessionLocal() as db:
+        db.execute(insert(Entity), [
+            {"user_id": user.id, "entity_type": "task", "title": f"marker task {i}", "context_tags": ["home"], "status": "pending"}
+            for i in range(3)
+        ])
+        db.commit()
+
+    agent = create_mentor_agent(ParallelToolsModel())
+    async with AsyncSessionLocal() as db:
+        result = await agent.ainvoke({"messages": [("user", "what now?")]}, agent_config(db, user.id))
+
+    tool_messages = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+    assert len(tool_messages) == 4
+    for message in tool_messages:
+        assert message.status == "success", message.content
+        assert not message.content.startswith("Error"), message.content
+    assert "marker task" in tool_messages[0].content
@@ -0,0 +1,36 @@
+"""Per-worker vector index cache is bounded by vector memory"""
+import uuid
+from sqlalchemy import insert
+from app.database import SessionLocal
+from app.embeddings import HashingEmbedder
+from app.models import Entity
+from app.services.vector_index import VectorStore
+
+DIM = 64
+
+
+def test_cache_is_bounded_by_vector_bytes(make_user):
+    heavy, light = make_user(), make_user()
+    with SessionLocal() as db:
+        db.execute(insert(Entity), [
+            {"user_id": user.id, "entity_type": "task", "title": f"task {i}", "status": "pending"}
+            for user, count in ((heavy, 3000), (light, 200)) for i in range(count)
+        ])
+        db.commit()
+
+    # Room for the heavy user's vectors, or many light ones, not both
+    store = VectorStore(HashingEmbedder(DIM), max_bytes=3100 * DIM * 4)
+    with SessionLocal() as db:
+        assert store.search(db, light.id, "task 3")
+        assert store.search(db, heavy.id, "task 3")
+        stats = store.stats()
+        assert stats["size"] == 1 and 3000 * DIM * 4 <= stats["weight"] <= stats["maxsize"]
+
+        # Growth from queued writes counts too: past the budget, the index is evicted
+        store.entities_saved(heavy.id, [
+            Entity(id=uuid.uuid4(), user_id=heavy.id, entity_type="task", title=f"new {i}", status="pending")
+            for i in range(800)
+        ])
+        assert store.search(db, heavy.id, "new 3")
+        stats = store.stats()
+        assert stats["size"] == 0 and stats["weight"] == 0